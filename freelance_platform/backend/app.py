@@ -1,10 +1,16 @@
+import click
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 
+import db_profiles
 from config import Config
 from models import db
+from services import (
+    search_index, autocomplete_index, email_outbox, payment_state_store, payment_reconciler, deposit_initiation,
+    payout_batcher, job_match_fanout, admin_broadcast_service, background_workers
+)
 
 # Import routes
 from routes.auth import auth_bp
@@ -12,16 +18,30 @@ from routes.marketplace import marketplace_bp
 from routes.profiles import profiles_bp
 from routes.payments import payments_bp
 from routes.admin import admin_bp
+from routes.events import events_bp
+from routes.notification_routes import notification_routes
+from routes.search_routes import search_routes
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
     # Initialize extensions
+    db_profiles.configure(app)
     db.init_app(app)
+    db_profiles.init_app(app, db)
     jwt = JWTManager(app)
     migrate = Migrate(app, db)
     CORS(app)
+    search_index.init_app(app)
+    autocomplete_index.init_app(app)
+    email_outbox.init_app(app)
+    payment_state_store.init_app(app)
+    payment_reconciler.init_app(app)
+    deposit_initiation.init_app(app)
+    payout_batcher.init_app(app)
+    job_match_fanout.init_app(app)
+    admin_broadcast_service.init_app(app)
 
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -29,11 +49,135 @@ def create_app(config_class=Config):
     app.register_blueprint(profiles_bp, url_prefix='/api/profiles')
     app.register_blueprint(payments_bp, url_prefix='/api/payments')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(events_bp, url_prefix='/api/events')
+    app.register_blueprint(notification_routes, url_prefix='/api/v2/notifications')
+    app.register_blueprint(search_routes, url_prefix='/api/v2/search')
 
     @app.route('/')
     def index():
         return {'message': 'Welcome to the Freelance Platform API'}
 
+    @app.cli.command('check-db')
+    def check_db():
+        """Show the effective database settings and any problems with them."""
+        with app.app_context():
+            settings, problems = db_profiles.self_check(db.engine, app.config)
+        for name, value in settings.items():
+            print(f"{name}: {value}")
+        for problem in problems:
+            print(f"WARNING: {problem}")
+
+    @app.cli.command('refresh-admin-stats')
+    def refresh_admin_stats():
+        """Recompute the admin dashboard stats snapshot (run from cron)."""
+        from services.admin_stats_service import AdminStatsService
+        snapshot = AdminStatsService.refresh_snapshot()
+        print(f"Admin stats snapshot refreshed at {snapshot.computed_at.isoformat()}")
+
+    @app.cli.command('recompute-user-stats')
+    def recompute_user_stats():
+        """Recompute user rating and job counters from reviews and jobs."""
+        from services.user_stats_service import UserStatsService
+        UserStatsService.recompute_all()
+        print("User stats recomputed")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Rebuild full-text search documents for all users and jobs."""
+        search_index.rebuild_search_index()
+        print(f"Search index rebuilt ({search_index.get_search_index().name})")
+
+    @app.cli.command('run-workers')
+    @click.option('--only', multiple=True, type=click.Choice(list(background_workers.WORKERS)),
+                  help='Run only these workers (repeatable).')
+    def run_workers(only):
+        """Run the background workers (email outbox, ...) until stopped."""
+        background_workers.run_workers(app, only or None)
+
+    @app.cli.command('send-emails')
+    @click.option('--once', is_flag=True, help='Deliver one batch and exit.')
+    def send_emails(once):
+        """Deliver queued emails from the outbox."""
+        worker = email_outbox.EmailOutboxWorker(app)
+        if once:
+            print(f"Processed {worker.run_once()} queued emails")
+        else:
+            worker.run()
+
+    @app.cli.command('notify-job-matches')
+    @click.option('--once', is_flag=True, help='Process one batch of fan-outs and exit.')
+    def notify_job_matches(once):
+        """Notify the freelancers matching newly posted jobs."""
+        worker = job_match_fanout.JobMatchFanOutWorker(app)
+        if once:
+            print(f"Processed {worker.run_once()} job match fan-outs")
+        else:
+            worker.run()
+
+    @app.cli.command('send-broadcasts')
+    @click.option('--once', is_flag=True, help='Deliver queued broadcasts once and exit.')
+    def send_broadcasts(once):
+        """Deliver queued admin broadcasts and resume interrupted ones."""
+        worker = admin_broadcast_service.AdminBroadcastWorker(app)
+        if once:
+            print(f"Processed {worker.run_once()} broadcasts")
+        else:
+            worker.run()
+
+    @app.cli.command('evict-payment-states')
+    def evict_payment_states():
+        """Delete settled provider payment states older than PAYMENT_STATE_TTL_SECONDS."""
+        removed = payment_state_store.get_payment_state_store().evict_settled()
+        print(f"Evicted {removed} settled payment states")
+
+    @app.cli.command('reconcile-payments')
+    @click.option('--once', is_flag=True, help='Make one pass over pending payments and exit.')
+    def reconcile_payments(once):
+        """Settle pending deposits by checking their status with the provider."""
+        reconciler = payment_reconciler.create_reconciler(app)
+        if reconciler is None:
+            print("ORANGE_MONEY_LIVE is not set; nothing to reconcile against the mock provider")
+            return
+        if once:
+            checked = settled = 0
+            while True:
+                batch_checked, batch_settled = reconciler.run_once()
+                checked += batch_checked
+                settled += batch_settled
+                if reconciler.last_id == 0:
+                    break
+            print(f"Checked {checked} pending payments, {settled} settled")
+        else:
+            reconciler.run()
+
+    @app.cli.command('initiate-deposits')
+    @click.option('--once', is_flag=True, help='Submit one batch and exit.')
+    def initiate_deposits(once):
+        """Submit queued deposits to the payment provider."""
+        worker = deposit_initiation.DepositInitiationWorker(app)
+        if once:
+            print(f"Processed {worker.run_once()} queued deposits")
+        else:
+            worker.run()
+
+    @app.cli.command('process-payouts')
+    @click.option('--once', is_flag=True, help='Batch and submit pending payouts once and exit.')
+    def process_payouts(once):
+        """Pay out released transactions in per-freelancer transfers."""
+        batcher = payout_batcher.PayoutBatcher(app)
+        if once:
+            batched, submitted = batcher.run_once()
+            print(f"Batched {batched} payouts, submitted {submitted} transfers")
+        else:
+            batcher.run()
+
+    @app.cli.command('requeue-payouts')
+    @click.argument('transfer_ids', nargs=-1, type=int, required=True)
+    def requeue_payouts(transfer_ids):
+        """Send failed or unconfirmed payout transfers back to the queue."""
+        requeued = payout_batcher.requeue_transfers(transfer_ids)
+        print(f"Requeued {len(requeued)} payout transfers: {', '.join(map(str, requeued)) or 'none'}")
+
     return app
 
 if __name__ == '__main__':
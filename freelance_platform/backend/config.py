@@ -9,6 +9,26 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///freelance_platform.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Engine options come from a database profile (see db_profiles.py): 'auto' picks
+    # 'postgresql' or 'sqlite' from the URI; 'default' leaves SQLAlchemy's defaults
+    DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE') or 'auto'
+    # Log the effective settings (pragmas, pool sizes) at startup and warn on mismatches
+    DATABASE_SELF_CHECK = os.environ.get('DATABASE_SELF_CHECK', 'true').lower() == 'true'
+    # PostgreSQL: connections this app may hold in total, split across the Gunicorn workers
+    # in GUNICORN_CONFIG_PATH; each worker keeps one per request thread plus
+    # DB_BACKGROUND_CONNECTIONS for its background workers and can overflow into the rest
+    GUNICORN_CONFIG_PATH = os.environ.get('GUNICORN_CONFIG_PATH') or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn_config.py')
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 90))
+    DB_BACKGROUND_CONNECTIONS = int(os.environ.get('DB_BACKGROUND_CONNECTIONS', 2))
+    DB_POOL_TIMEOUT_SECONDS = int(os.environ.get('DB_POOL_TIMEOUT_SECONDS', 10))
+    DB_POOL_RECYCLE_SECONDS = int(os.environ.get('DB_POOL_RECYCLE_SECONDS', 1800))
+    # SQLite: pragmas set on every connection
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    
     # JWT configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
@@ -18,6 +38,60 @@ class Config:
     ORANGE_MONEY_API_KEY = os.environ.get('ORANGE_MONEY_API_KEY') or 'your-orange-money-api-key'
     ORANGE_MONEY_API_SECRET = os.environ.get('ORANGE_MONEY_API_SECRET') or 'your-orange-money-api-secret'
     ORANGE_MONEY_MERCHANT_ID = os.environ.get('ORANGE_MONEY_MERCHANT_ID') or 'your-orange-money-merchant-id'
+    ORANGE_MONEY_API_URL = os.environ.get('ORANGE_MONEY_API_URL') or 'https://api.orange.com/orange-money-webpay'
+    # Call the Orange Money API instead of the built-in mock
+    ORANGE_MONEY_LIVE = os.environ.get('ORANGE_MONEY_LIVE', 'false').lower() == 'true'
+    
+    # Payment provider HTTP clients: timeouts (seconds), retries and circuit breaker.
+    # Worst case a call holds a worker for about (connect + read) * (retries + 1).
+    PROVIDER_HTTP_CONNECT_TIMEOUT = float(os.environ.get('PROVIDER_HTTP_CONNECT_TIMEOUT', 3.05))
+    PROVIDER_HTTP_READ_TIMEOUT = float(os.environ.get('PROVIDER_HTTP_READ_TIMEOUT', 10))
+    PROVIDER_HTTP_MAX_RETRIES = int(os.environ.get('PROVIDER_HTTP_MAX_RETRIES', 2))
+    PROVIDER_HTTP_POOL_SIZE = int(os.environ.get('PROVIDER_HTTP_POOL_SIZE', 10))
+    PROVIDER_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('PROVIDER_CIRCUIT_FAILURE_THRESHOLD', 5))
+    PROVIDER_CIRCUIT_RESET_SECONDS = int(os.environ.get('PROVIDER_CIRCUIT_RESET_SECONDS', 30))
+    # Refresh cached provider access tokens this many seconds before they expire
+    PROVIDER_TOKEN_REFRESH_MARGIN = int(os.environ.get('PROVIDER_TOKEN_REFRESH_MARGIN', 60))
+    
+    # Provider payment state store: 'sql' (application database) or 'sqlite' (local file
+    # shared by the workers on one host), and how long settled entries are kept (seconds)
+    PAYMENT_STATE_BACKEND = os.environ.get('PAYMENT_STATE_BACKEND') or 'sql'
+    PAYMENT_STATE_SQLITE_PATH = os.environ.get('PAYMENT_STATE_SQLITE_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'instance', 'payment_state.db')
+    PAYMENT_STATE_TTL_SECONDS = int(os.environ.get('PAYMENT_STATE_TTL_SECONDS', 7 * 24 * 3600))
+    
+    # Payment reconciler: pending deposits older than the grace period (seconds) are checked
+    # with the provider in batches, CONCURRENCY at a time (keep within PROVIDER_HTTP_POOL_SIZE)
+    PAYMENT_RECONCILE_BATCH_SIZE = int(os.environ.get('PAYMENT_RECONCILE_BATCH_SIZE', 100))
+    PAYMENT_RECONCILE_CONCURRENCY = int(os.environ.get('PAYMENT_RECONCILE_CONCURRENCY', 8))
+    PAYMENT_RECONCILE_MIN_AGE_SECONDS = int(os.environ.get('PAYMENT_RECONCILE_MIN_AGE_SECONDS', 120))
+    PAYMENT_RECONCILE_INTERVAL_SECONDS = int(os.environ.get('PAYMENT_RECONCILE_INTERVAL_SECONDS', 60))
+    # Unsettled checks back off from the interval up to MAX_BACKOFF; after MAX_ATTEMPTS checks or
+    # MAX_AGE (seconds) the deposit is flagged for manual review. Runs only with ORANGE_MONEY_LIVE.
+    PAYMENT_RECONCILE_MAX_ATTEMPTS = int(os.environ.get('PAYMENT_RECONCILE_MAX_ATTEMPTS', 10))
+    PAYMENT_RECONCILE_MAX_AGE_SECONDS = int(os.environ.get('PAYMENT_RECONCILE_MAX_AGE_SECONDS', 2 * 24 * 3600))
+    PAYMENT_RECONCILE_MAX_BACKOFF_SECONDS = int(os.environ.get('PAYMENT_RECONCILE_MAX_BACKOFF_SECONDS', 3600))
+    # Run the reconciler as a thread inside the web process instead of `flask reconcile-payments`
+    PAYMENT_RECONCILER_THREAD = os.environ.get('PAYMENT_RECONCILER_THREAD', 'false').lower() == 'true'
+    
+    # Deposit initiation worker: batch size, attempts for requests that never reached the
+    # provider, idle poll interval (seconds)
+    DEPOSIT_INITIATION_BATCH_SIZE = int(os.environ.get('DEPOSIT_INITIATION_BATCH_SIZE', 20))
+    DEPOSIT_INITIATION_MAX_ATTEMPTS = int(os.environ.get('DEPOSIT_INITIATION_MAX_ATTEMPTS', 3))
+    DEPOSIT_INITIATION_POLL_SECONDS = int(os.environ.get('DEPOSIT_INITIATION_POLL_SECONDS', 5))
+    # Run the initiation worker as a thread inside the web process instead of `flask initiate-deposits`
+    DEPOSIT_INITIATION_WORKER_THREAD = os.environ.get('DEPOSIT_INITIATION_WORKER_THREAD', 'false').lower() == 'true'
+    
+    # Payout batcher: payouts released within one interval (seconds) are paid as one transfer
+    # per freelancer; transfers per bulk provider call; attempts for calls that never reached it
+    PAYOUT_BATCH_INTERVAL_SECONDS = int(os.environ.get('PAYOUT_BATCH_INTERVAL_SECONDS', 300))
+    PAYOUT_PROVIDER_BATCH_SIZE = int(os.environ.get('PAYOUT_PROVIDER_BATCH_SIZE', 100))
+    PAYOUT_MAX_ATTEMPTS = int(os.environ.get('PAYOUT_MAX_ATTEMPTS', 5))
+    # Run the payout batcher as a thread inside the web process instead of `flask process-payouts`
+    PAYOUT_WORKER_THREAD = os.environ.get('PAYOUT_WORKER_THREAD', 'false').lower() == 'true'
+    
+    # Frontend base URL used for links in emails
+    FRONTEND_URL = os.environ.get('FRONTEND_URL') or 'http://localhost:3000'
     
     # Upload configuration
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
@@ -25,3 +99,59 @@ class Config:
     
     # Platform fee percentage (e.g., 10%)
     PLATFORM_FEE_PERCENTAGE = 10
+    
+    # Admin dashboard stats snapshot max age in seconds (0 = always compute live)
+    ADMIN_STATS_SNAPSHOT_MAX_AGE = int(os.environ.get('ADMIN_STATS_SNAPSHOT_MAX_AGE', 300))
+    
+    # Full-text search backend: 'auto' (match the database), 'postgresql', 'sqlite' or 'like'
+    SEARCH_INDEX_BACKEND = os.environ.get('SEARCH_INDEX_BACKEND') or 'auto'
+    
+    # Autocomplete suggestion index: snapshot shared by all workers and how often it is rebuilt (seconds)
+    AUTOCOMPLETE_SNAPSHOT_PATH = os.environ.get('AUTOCOMPLETE_SNAPSHOT_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'instance', 'autocomplete.snapshot')
+    AUTOCOMPLETE_REFRESH_SECONDS = int(os.environ.get('AUTOCOMPLETE_REFRESH_SECONDS', 600))
+    
+    # How long a worker trusts its copy of a cache version before re-reading it (seconds)
+    CACHE_VERSION_CHECK_SECONDS = int(os.environ.get('CACHE_VERSION_CHECK_SECONDS', 5))
+    
+    # Outgoing mail (SMTP)
+    MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'localhost'
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() == 'true'
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'FreelancePro SL <noreply@freelanceprosl.com>'
+    MAIL_TIMEOUT = int(os.environ.get('MAIL_TIMEOUT', 30))
+    
+    # Email outbox worker: batch size, delivery attempts before giving up, idle poll interval (seconds)
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 50))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+    EMAIL_OUTBOX_POLL_SECONDS = int(os.environ.get('EMAIL_OUTBOX_POLL_SECONDS', 5))
+    # Run the outbox worker as a thread inside the web process instead of `flask send-emails`
+    EMAIL_OUTBOX_WORKER_THREAD = os.environ.get('EMAIL_OUTBOX_WORKER_THREAD', 'false').lower() == 'true'
+    
+    # Admin broadcast worker: idle poll interval for abandoned broadcasts (seconds)
+    ADMIN_BROADCAST_POLL_SECONDS = int(os.environ.get('ADMIN_BROADCAST_POLL_SECONDS', 5))
+    # Run the broadcast worker as a thread inside the web process instead of `flask send-broadcasts`
+    ADMIN_BROADCAST_WORKER_THREAD = os.environ.get('ADMIN_BROADCAST_WORKER_THREAD', 'false').lower() == 'true'
+
+    # Job match fan-out worker: fan-outs claimed per poll, attempts before giving up,
+    # idle poll interval (seconds)
+    JOB_MATCH_BATCH_SIZE = int(os.environ.get('JOB_MATCH_BATCH_SIZE', 5))
+    JOB_MATCH_MAX_ATTEMPTS = int(os.environ.get('JOB_MATCH_MAX_ATTEMPTS', 5))
+    JOB_MATCH_POLL_SECONDS = int(os.environ.get('JOB_MATCH_POLL_SECONDS', 5))
+    # Run the fan-out worker as a thread inside the web process instead of `flask notify-job-matches`
+    JOB_MATCH_WORKER_THREAD = os.environ.get('JOB_MATCH_WORKER_THREAD', 'false').lower() == 'true'
+    
+    # Server-Sent Events: keepalive interval and how long one stream stays open before
+    # the client reconnects (keep below the Gunicorn timeout when running sync workers)
+    EVENT_STREAM_HEARTBEAT_SECONDS = int(os.environ.get('EVENT_STREAM_HEARTBEAT_SECONDS', 15))
+    EVENT_STREAM_MAX_SECONDS = int(os.environ.get('EVENT_STREAM_MAX_SECONDS', 90))
+    # 'auto' serves streams only under gevent workers (others answer 503 and clients
+    # long-poll instead); 'true' or 'false' to force. Stream tickets expire after (seconds)
+    EVENT_STREAM_ENABLED = (os.environ.get('EVENT_STREAM_ENABLED') or 'auto').lower()
+    EVENT_STREAM_TICKET_SECONDS = int(os.environ.get('EVENT_STREAM_TICKET_SECONDS', 60))
+    # How often open streams and long-polls check the user_events table (seconds),
+    # and how long events are kept for clients to catch up (pruned by `flask run-workers`)
+    EVENT_STREAM_POLL_SECONDS = float(os.environ.get('EVENT_STREAM_POLL_SECONDS', 1))
+    EVENT_STREAM_RETENTION_SECONDS = int(os.environ.get('EVENT_STREAM_RETENTION_SECONDS', 86400))
@@ -0,0 +1,146 @@
+import logging
+import os
+import runpy
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ('postgresql', 'sqlite', 'default')
+
+def resolve_profile(config):
+    """
+    DATABASE_PROFILE, or for 'auto' the profile matching SQLALCHEMY_DATABASE_URI
+    """
+    profile = config.get('DATABASE_PROFILE', 'auto')
+    if profile == 'auto':
+        backend = make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+        profile = backend if backend in PROFILES else 'default'
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE '{profile}'")
+    return profile
+
+def gunicorn_settings(path):
+    """
+    Worker class, processes and threads per process from gunicorn_config.py
+    (GUNICORN_* environment variables apply as they do when Gunicorn loads it)
+    """
+    settings = runpy.run_path(path) if path and os.path.exists(path) else {}
+    return {
+        'worker_class': settings.get('worker_class', 'sync'),
+        'workers': int(settings.get('workers', 1)),
+        'threads': int(settings.get('threads', 1)),
+        'worker_connections': int(settings.get('worker_connections', 1000))
+    }
+
+def postgresql_pool_options(config):
+    """
+    Size each process's pool so every Gunicorn worker fits in DB_MAX_CONNECTIONS:
+    one connection per request thread plus DB_BACKGROUND_CONNECTIONS for the
+    in-process workers, overflowing into what is left of the worker's share.
+    """
+    server = gunicorn_settings(config.get('GUNICORN_CONFIG_PATH'))
+    share = max(1, config.get('DB_MAX_CONNECTIONS', 90) // server['workers'])
+    if server['worker_class'] == 'gevent':
+        # Greenlets are only bounded by worker_connections; let the pool be the bound
+        pool_size = min(server['worker_connections'], share)
+    else:
+        pool_size = min(server['threads'] + config.get('DB_BACKGROUND_CONNECTIONS', 2), share)
+    return {
+        'pool_size': pool_size,
+        'max_overflow': share - pool_size,
+        'pool_timeout': config.get('DB_POOL_TIMEOUT_SECONDS', 10),
+        'pool_recycle': config.get('DB_POOL_RECYCLE_SECONDS', 1800),
+        'pool_pre_ping': True
+    }
+
+def configure(app):
+    """
+    Fill SQLALCHEMY_ENGINE_OPTIONS from the database profile; call before
+    db.init_app(). Options set explicitly in the config take precedence.
+    """
+    profile = resolve_profile(app.config)
+    options = postgresql_pool_options(app.config) if profile == 'postgresql' else {}
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    app.config['DATABASE_PROFILE'] = profile
+
+def sqlite_pragmas(config):
+    return {
+        'journal_mode': config.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': config.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    }
+
+def apply_sqlite_pragmas(engine, config):
+    """
+    Set the profile's pragmas on every new connection of a SQLite engine
+    """
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def self_check(engine, config):
+    """
+    Read back the effective database settings. Returns (settings, problems).
+    """
+    profile = config['DATABASE_PROFILE']
+    settings = {'profile': profile, 'dialect': engine.dialect.name, 'pool': type(engine.pool).__name__}
+    problems = []
+
+    with engine.connect() as connection:
+        if profile == 'sqlite':
+            for name, expected in sqlite_pragmas(config).items():
+                actual = connection.execute(text(f"PRAGMA {name}")).scalar()
+                if name == 'synchronous':
+                    actual = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}.get(actual, actual)
+                settings[name] = actual
+                if str(actual).upper() != str(expected).upper():
+                    # In-memory databases can't use WAL and ignore mmap
+                    if engine.url.database in (None, '', ':memory:') and name in ('journal_mode', 'mmap_size'):
+                        continue
+                    problems.append(f"PRAGMA {name} is {actual}, expected {expected}")
+        elif profile == 'postgresql':
+            server = gunicorn_settings(config.get('GUNICORN_CONFIG_PATH'))
+            options = config['SQLALCHEMY_ENGINE_OPTIONS']
+            per_worker = options.get('pool_size', 5) + options.get('max_overflow', 10)
+            max_connections = int(connection.execute(text("SHOW max_connections")).scalar())
+            settings.update({
+                'workers': server['workers'],
+                'pool_size': options.get('pool_size'),
+                'max_overflow': options.get('max_overflow'),
+                'max_connections': max_connections
+            })
+            if per_worker * server['workers'] > max_connections:
+                problems.append(
+                    f"{server['workers']} workers x {per_worker} connections exceeds "
+                    f"max_connections ({max_connections})")
+
+    return settings, problems
+
+def init_app(app, db):
+    """
+    Install the profile's connection hooks and log the self-check. Call right
+    after db.init_app(), before anything connects.
+    """
+    with app.app_context():
+        if app.config['DATABASE_PROFILE'] == 'sqlite':
+            apply_sqlite_pragmas(db.engine, app.config)
+
+        if not app.config.get('DATABASE_SELF_CHECK', True):
+            return
+        try:
+            settings, problems = self_check(db.engine, app.config)
+        except Exception as e:
+            logger.warning(f"Database self-check failed: {e}")
+            return
+    logger.info(f"Database settings: {settings}")
+    for problem in problems:
+        logger.warning(f"Database self-check: {problem}")
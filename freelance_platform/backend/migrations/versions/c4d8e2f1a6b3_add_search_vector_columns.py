@@ -0,0 +1,35 @@
+"""Add full-text search_vector columns on users and jobs (PostgreSQL)
+
+Revision ID: c4d8e2f1a6b3
+Revises: a7e3c5b1d2f9
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+from sqlalchemy.sql import text
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e2f1a6b3'
+down_revision = 'a7e3c5b1d2f9'
+branch_labels = None
+depends_on = None
+
+TABLES = ('users', 'jobs')
+
+
+def upgrade():
+    # SQLite keeps its FTS5 tables outside the schema; they are created at startup
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in TABLES:
+        op.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+        op.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table}_search_vector ON {table} USING gin (search_vector)"))
+    # Documents for existing rows are filled in by the app on its next start
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in TABLES:
+        op.execute(text(f"DROP INDEX IF EXISTS idx_{table}_search_vector"))
+        op.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector"))
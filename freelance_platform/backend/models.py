@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.hybrid import hybrid_property
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import enum
@@ -10,6 +12,14 @@ db = SQLAlchemy()
 # Association table for user skills
 user_skills = db.Table('user_skills',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
+    db.Column('skill_id', db.Integer, db.ForeignKey('skills.id'), primary_key=True),
+    # Lookup by skill (the primary key only serves lookups by user)
+    db.Index('ix_user_skills_skill_id_user_id', 'skill_id', 'user_id')
+)
+
+# Association table for the skills a job requires
+job_skills = db.Table('job_skills',
+    db.Column('job_id', db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True),
     db.Column('skill_id', db.Integer, db.ForeignKey('skills.id'), primary_key=True)
 )
 
@@ -30,6 +40,21 @@ class TransactionStatus(enum.Enum):
     FAILED = 'failed'
     REFUNDED = 'refunded'
 
+class NotificationType(enum.Enum):
+    # Values are what the frontend keys its notification icons on
+    WELCOME = 'WELCOME'
+    ACCOUNT_VERIFIED = 'ACCOUNT_VERIFIED'
+    PASSWORD_RESET = 'PASSWORD_RESET'
+    NEW_MESSAGE = 'NEW_MESSAGE'
+    NEW_PROPOSAL = 'NEW_PROPOSAL'
+    JOB_AWARDED = 'JOB_AWARDED'
+    PAYMENT_INITIATED = 'PAYMENT_INITIATED'
+    PAYMENT_COMPLETED = 'PAYMENT_COMPLETED'
+    PAYMENT_FAILED = 'PAYMENT_FAILED'
+    NEW_JOB_MATCH = 'NEW_JOB_MATCH'
+    NEW_REVIEW = 'NEW_REVIEW'
+    JOB_COMPLETED = 'JOB_COMPLETED'
+
 def generate_tracking_id():
     chars = string.ascii_uppercase + string.digits
     return 'FPSL-' + ''.join(random.choice(chars) for _ in range(6))
@@ -70,6 +95,16 @@ class User(db.Model):
     is_suspended = db.Column(db.Boolean, default=False)
     is_disabled = db.Column(db.Boolean, default=False)
     
+    # Denormalized counters, maintained on write (see UserStatsService)
+    avg_rating = db.Column(db.Float, index=True)
+    rating_count = db.Column(db.Integer, default=0, nullable=False)
+    jobs_completed = db.Column(db.Integer, default=0, nullable=False, index=True)
+    jobs_posted = db.Column(db.Integer, default=0, nullable=False, index=True)
+    # Maintained by NotificationService
+    unread_notifications = db.Column(db.Integer, default=0, nullable=False)
+    # Email opt-outs by kind ('job_matches', 'messages', ...); None = everything on
+    notification_preferences = db.Column(db.JSON)
+    
     # Relationships
     skills = db.relationship('Skill', secondary=user_skills, backref='users')
     freelancer_jobs = db.relationship('Job', backref='freelancer', foreign_keys='Job.freelancer_id')
@@ -83,11 +118,17 @@ class User(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
-    @property
-    def is_active_profile(self):
+    # Fields returned by to_dict(fields='card') for list views
+    CARD_FIELDS = (
+        'id', 'tracking_id', 'username', 'role', 'first_name', 'last_name', 'title',
+        'location', 'bio', 'profile_picture', 'contact_email', 'whatsapp_number',
+        'hourly_rate', 'pricing_type', 'availability', 'avg_rating', 'rating_count',
+        'jobs_completed', 'is_active_profile', 'days_remaining_in_trial', 'skills'
+    )
+
+    def is_active_at(self, now):
         if self.is_disabled or self.is_suspended:
             return False
-        now = datetime.utcnow()
         if self.trial_end_date and now <= self.trial_end_date:
             return True
         if self.subscription_end_date and now <= self.subscription_end_date:
@@ -96,15 +137,46 @@ class User(db.Model):
             return True
         return False
 
-    @property
-    def days_remaining_in_trial(self):
+    @hybrid_property
+    def is_active_profile(self):
+        return self.is_active_at(datetime.utcnow())
+
+    @is_active_profile.expression
+    def is_active_profile(cls):
+        # SQL form of is_active_at() so the check can run in a WHERE clause
+        now = datetime.utcnow()
+        return and_(
+            or_(cls.is_disabled.is_(None), cls.is_disabled == False),
+            or_(cls.is_suspended.is_(None), cls.is_suspended == False),
+            or_(
+                cls.trial_end_date >= now,
+                cls.subscription_end_date >= now,
+                cls.subscription_status == 'ACTIVE'
+            )
+        )
+
+    def trial_days_remaining_at(self, now):
         if not self.trial_end_date:
             return 0
-        delta = self.trial_end_date - datetime.utcnow()
+        delta = self.trial_end_date - now
         return max(0, delta.days)
 
-    def to_dict(self):
-        return {
+    @property
+    def days_remaining_in_trial(self):
+        return self.trial_days_remaining_at(datetime.utcnow())
+
+    def to_dict(self, fields='full', now=None, skills=None):
+        """
+        Serialize the user. `fields` is 'full' or 'card' (see CARD_FIELDS);
+        `now` and pre-loaded `skills` names let list serializers share one
+        timestamp and one skills query across a whole page.
+        """
+        if now is None:
+            now = datetime.utcnow()
+        if skills is None:
+            skills = [skill.name for skill in self.skills]
+
+        data = {
             'id': self.id,
             'tracking_id': self.tracking_id or '',
             'username': self.username,
@@ -128,13 +200,21 @@ class User(db.Model):
             'subscription_end_date': self.subscription_end_date.isoformat() if self.subscription_end_date else None,
             'is_suspended': self.is_suspended,
             'is_disabled': self.is_disabled,
-            'is_active_profile': self.is_active_profile,
-            'days_remaining_in_trial': self.days_remaining_in_trial,
-            'skills': [skill.name for skill in self.skills],
+            'is_active_profile': self.is_active_at(now),
+            'days_remaining_in_trial': self.trial_days_remaining_at(now),
+            'avg_rating': self.avg_rating,
+            'rating_count': self.rating_count or 0,
+            'jobs_completed': self.jobs_completed or 0,
+            'jobs_posted': self.jobs_posted or 0,
+            'skills': skills,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
 
+        if fields == 'card':
+            return {field: data[field] for field in self.CARD_FIELDS}
+        return data
+
 class Skill(db.Model):
     __tablename__ = 'skills'
     
@@ -157,9 +237,15 @@ class Job(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
+    skills = db.relationship('Skill', secondary=job_skills)
     proposals = db.relationship('Proposal', backref='job')
     transactions = db.relationship('Transaction', backref='job')
     
+    # Keyset pagination index for the job feed
+    __table_args__ = (
+        db.Index('ix_jobs_created_at_id', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -187,6 +273,10 @@ class Proposal(db.Model):
     
     # Relationships
     freelancer = db.relationship('User', backref='proposals')
+    
+    __table_args__ = (
+        db.Index('ix_proposals_job_id_created_at', 'job_id', 'created_at'),
+    )
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
@@ -206,6 +296,12 @@ class Transaction(db.Model):
     # Relationships
     payer = db.relationship('User', foreign_keys=[payer_id])
     payee = db.relationship('User', foreign_keys=[payee_id])
+    
+    __table_args__ = (
+        db.Index('ix_transactions_created_at_id', 'created_at', 'id'),
+        db.Index('ix_transactions_payer_id', 'payer_id'),
+        db.Index('ix_transactions_payee_id', 'payee_id'),
+    )
 
 class Review(db.Model):
     __tablename__ = 'reviews'
@@ -235,6 +331,12 @@ class AdminMessage(db.Model):
     sender = db.relationship('User', foreign_keys=[sender_id])
     recipient = db.relationship('User', foreign_keys=[recipient_id])
 
+    # Recipient inbox (keyset by created_at, id) and unread counts
+    __table_args__ = (
+        db.Index('ix_admin_messages_recipient_id_created_at', 'recipient_id', 'created_at', 'id'),
+        db.Index('ix_admin_messages_recipient_id_is_read', 'recipient_id', 'is_read'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -248,3 +350,342 @@ class AdminMessage(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+class Notification(db.Model):
+    __tablename__ = 'notifications'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    type = db.Column(db.Enum(NotificationType), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
+    read_at = db.Column(db.DateTime)
+    reference_id = db.Column(db.Integer)
+    reference_type = db.Column(db.String(32))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # User's notification list (newest first) and unread lookups
+    __table_args__ = (
+        db.Index('ix_notifications_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_notifications_user_id_is_read', 'user_id', 'is_read'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'type': self.type.value,
+            'message': self.message,
+            'is_read': self.is_read,
+            'read_at': self.read_at.isoformat() if self.read_at else None,
+            'reference_id': self.reference_id,
+            'reference_type': self.reference_type,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class UserEvent(db.Model):
+    __tablename__ = 'user_events'
+
+    # Events pushed to a user's event streams and long-polls; the id is the
+    # client's resume cursor, so every web and worker process shares one feed
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    event_type = db.Column(db.String(32), nullable=False)
+    data = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_user_events_user_id_id', 'user_id', 'id'),
+        db.Index('ix_user_events_created_at', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {'id': self.id, 'event': self.event_type, 'data': self.data}
+
+class AdminBroadcast(db.Model):
+    __tablename__ = 'admin_broadcasts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    subject = db.Column(db.String(256), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    role = db.Column(db.Enum(UserRole))  # None = every role
+    status_filter = db.Column(db.String(16))  # see AdminBroadcastService.USER_STATUSES
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, running, completed, failed
+    total_recipients = db.Column(db.Integer, nullable=False, default=0)
+    messages_created = db.Column(db.Integer, nullable=False, default=0)
+    emails_queued = db.Column(db.Integer, nullable=False, default=0)
+    # Progress and claim of the worker delivering it, so an interrupted broadcast resumes
+    last_recipient_id = db.Column(db.Integer, nullable=False, default=0)
+    claim_token = db.Column(db.String(36))
+    claimed_until = db.Column(db.DateTime)
+    error_message = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sender_id': self.sender_id,
+            'subject': self.subject,
+            'role': self.role.value if self.role else None,
+            'status_filter': self.status_filter,
+            'status': self.status,
+            'total_recipients': self.total_recipients,
+            'messages_created': self.messages_created,
+            'emails_queued': self.emails_queued,
+            'error_message': self.error_message,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'
+
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ProviderToken(db.Model):
+    __tablename__ = 'provider_tokens'
+
+    provider = db.Column(db.String(32), primary_key=True)
+    access_token = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PaymentState(db.Model):
+    __tablename__ = 'payment_states'
+
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(32), nullable=False)
+    provider_transaction_id = db.Column(db.String(128), nullable=False)
+    reference = db.Column(db.String(128), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    phone_number = db.Column(db.String(32))
+    description = db.Column(db.String(256))
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, completed, failed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    settled_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'provider_transaction_id', name='uq_payment_states_provider_txn'),
+        db.Index('ix_payment_states_reference', 'reference'),
+        db.Index('ix_payment_states_settled_at', 'settled_at'),
+    )
+
+class PaymentCallback(db.Model):
+    __tablename__ = 'payment_callbacks'
+
+    # One row per provider transaction: the first callback claims it, replays hit the unique index
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(32), nullable=False)
+    provider_transaction_id = db.Column(db.String(128), nullable=False)
+    transaction_reference = db.Column(db.String(128), nullable=False)
+    reported_status = db.Column(db.String(32), nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'provider_transaction_id', name='uq_payment_callbacks_provider_txn'),
+    )
+
+class PaymentReconciliation(db.Model):
+    __tablename__ = 'payment_reconciliations'
+
+    # Status checks made for a pending deposit by the payment reconciler; once they
+    # run out (or the deposit can't be checked) it is flagged for manual review
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False, unique=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_check_at = db.Column(db.DateTime)
+    needs_review = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    review_reason = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DepositInitiation(db.Model):
+    __tablename__ = 'deposit_initiations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False, unique=True)
+    phone_number = db.Column(db.String(32))
+    description = db.Column(db.String(256))
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, submitting, submitted, unconfirmed, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(36))
+    claimed_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    submitted_at = db.Column(db.DateTime)
+
+    transaction = db.relationship('Transaction')
+
+    __table_args__ = (
+        db.Index('ix_deposit_initiations_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'transaction_id': self.transaction_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None
+        }
+
+class Payout(db.Model):
+    __tablename__ = 'payouts'
+
+    # Ledger entry for one released transaction; paid out as part of a PayoutTransfer
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False, unique=True)
+    freelancer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, batched, paid, failed
+    transfer_id = db.Column(db.Integer, db.ForeignKey('payout_transfers.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    paid_at = db.Column(db.DateTime)
+
+    transfer = db.relationship('PayoutTransfer')
+
+    __table_args__ = (
+        db.Index('ix_payouts_status_freelancer_id', 'status', 'freelancer_id'),
+        db.Index('ix_payouts_transfer_id', 'transfer_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'transaction_id': self.transaction_id,
+            'freelancer_id': self.freelancer_id,
+            'amount': self.amount,
+            'status': self.status,
+            'transfer': self.transfer.to_dict() if self.transfer else None,
+            'created_at': self.created_at.isoformat(),
+            'paid_at': self.paid_at.isoformat() if self.paid_at else None
+        }
+
+class PayoutTransfer(db.Model):
+    __tablename__ = 'payout_transfers'
+
+    # One provider payout to a freelancer, covering all their payouts pending at batching time
+    id = db.Column(db.Integer, primary_key=True)
+    freelancer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    payout_count = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, submitting, paid, unconfirmed, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(36))
+    claimed_until = db.Column(db.DateTime)
+    provider_reference = db.Column(db.String(128))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    paid_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_payout_transfers_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'amount': self.amount,
+            'payout_count': self.payout_count,
+            'status': self.status,
+            'attempts': self.attempts,
+            'provider_reference': self.provider_reference,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'paid_at': self.paid_at.isoformat() if self.paid_at else None
+        }
+
+class PlatformStatsSnapshot(db.Model):
+    __tablename__ = 'platform_stats_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    total_users = db.Column(db.Integer, nullable=False, default=0)
+    active_profiles = db.Column(db.Integer, nullable=False, default=0)
+    suspended_accounts = db.Column(db.Integer, nullable=False, default=0)
+    disabled_accounts = db.Column(db.Integer, nullable=False, default=0)
+    trial_accounts = db.Column(db.Integer, nullable=False, default=0)
+    active_subscriptions = db.Column(db.Integer, nullable=False, default=0)
+    total_freelancers = db.Column(db.Integer, nullable=False, default=0)
+    total_clients = db.Column(db.Integer, nullable=False, default=0)
+    total_jobs = db.Column(db.Integer, nullable=False, default=0)
+    total_transactions = db.Column(db.Integer, nullable=False, default=0)
+    total_transaction_volume = db.Column(db.Float, nullable=False, default=0.0)
+    total_platform_fees = db.Column(db.Float, nullable=False, default=0.0)
+    total_messages_sent = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    STAT_FIELDS = (
+        'total_users', 'active_profiles', 'suspended_accounts', 'disabled_accounts',
+        'trial_accounts', 'active_subscriptions', 'total_freelancers', 'total_clients',
+        'total_jobs', 'total_transactions', 'total_transaction_volume',
+        'total_platform_fees', 'total_messages_sent'
+    )
+
+    def to_dict(self):
+        stats = {field: getattr(self, field) for field in self.STAT_FIELDS}
+        stats['computed_at'] = self.computed_at.isoformat()
+        return stats
+
+class OutboundEmail(db.Model):
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(256), nullable=False)
+    subject = db.Column(db.String(256), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(36))
+    claimed_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'recipient': self.recipient,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+class JobMatchFanOut(db.Model):
+    __tablename__ = 'job_match_fanouts'
+
+    # Notifies the freelancers matching a posted job, a page at a time; last_user_id
+    # is committed with each page so an interrupted fan-out resumes where it stopped
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), nullable=False, unique=True)
+    skill_ids = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, running, completed, failed
+    last_user_id = db.Column(db.Integer, nullable=False, default=0)
+    notified = db.Column(db.Integer, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(36))
+    claimed_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_match_fanouts_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+def parse_limit(value, default=DEFAULT_PAGE_LIMIT, maximum=MAX_PAGE_LIMIT):
+    """
+    Parse a `limit` query parameter, clamping it to [1, maximum].
+    Raises ValueError for non-integer input.
+    """
+    if value is None or value == '':
+        return default
+    limit = int(value)
+    return max(1, min(limit, maximum))
+
+def encode_cursor(created_at, row_id):
+    """
+    Encode a (created_at, id) keyset position as an opaque URL-safe token.
+    """
+    payload = json.dumps([created_at.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """
+    Decode a cursor produced by encode_cursor().
+    Raises ValueError if the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def _is_date(value):
+    """
+    Whether an ISO-8601 string is a date without a time part
+    """
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+def apply_date_range(query, column, start=None, end=None):
+    """
+    Restrict a query to rows whose `column` lies within [start, end].
+    Both bounds are optional ISO-8601 strings; raises ValueError if malformed.
+    A date-only `end` (2024-05-31) includes the whole of that day.
+    """
+    if start:
+        query = query.filter(column >= datetime.fromisoformat(start))
+    if end:
+        if _is_date(end):
+            query = query.filter(column < datetime.fromisoformat(end) + timedelta(days=1))
+        else:
+            query = query.filter(column <= datetime.fromisoformat(end))
+    return query
+
+def apply_keyset(query, created_at_column, id_column, cursor):
+    """
+    Restrict a query to rows strictly after `cursor` when walking
+    (created_at DESC, id DESC), and apply that ordering.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            created_at_column < created_at,
+            and_(created_at_column == created_at, id_column < row_id)
+        ))
+    return query.order_by(created_at_column.desc(), id_column.desc())
+
+def keyset_page(query, created_at_column, id_column, cursor, limit):
+    """
+    Fetch one page of a keyset-paginated query.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    rows = apply_keyset(query, created_at_column, id_column, cursor).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
@@ -6,6 +6,7 @@ marketplace_bp = Blueprint('marketplace', __name__)
 profiles_bp = Blueprint('profiles', __name__)
 payments_bp = Blueprint('payments', __name__)
 admin_bp = Blueprint('admin', __name__)
+events_bp = Blueprint('events', __name__)
 
 # Import routes after blueprint initialization to avoid circular imports
 import routes.auth
@@ -13,3 +14,4 @@ import routes.marketplace
 import routes.profiles
 import routes.payments
 import routes.admin
+import routes.events
@@ -1,10 +1,20 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload
 
 from routes import admin_bp
-from models import db, User, UserRole, Job, Transaction, Review, Skill, AdminMessage
+from models import (
+    db, User, UserRole, Job, Transaction, TransactionStatus, Review, Skill, AdminMessage, AdminBroadcast,
+    PaymentReconciliation, PayoutTransfer
+)
+from pagination import parse_limit, apply_date_range, keyset_page
+from serializers import parse_fields, serialize_users
 from services.email_service import EmailService
+from services.admin_stats_service import AdminStatsService
+from services import event_stream
+from services.admin_broadcast_service import AdminBroadcastService
+from services import payout_batcher
 
 def require_admin(f):
     """Decorator to enforce admin-only access."""
@@ -28,30 +38,12 @@ def admin_dashboard():
     if user.role != UserRole.ADMIN:
         return jsonify({'error': 'Unauthorized access'}), 403
 
-    all_users = User.query.all()
-    active_users = [u for u in all_users if u.is_active_profile]
-    suspended_users = [u for u in all_users if u.is_suspended]
-    disabled_users = [u for u in all_users if u.is_disabled]
-    trial_users = [u for u in all_users if u.subscription_status == 'TRIAL']
-    active_sub_users = [u for u in all_users if u.subscription_status == 'ACTIVE']
-
-    completed_transactions = Transaction.query.filter_by(status='completed').all()
-
-    stats = {
-        'total_users': len(all_users),
-        'active_profiles': len(active_users),
-        'suspended_accounts': len(suspended_users),
-        'disabled_accounts': len(disabled_users),
-        'trial_accounts': len(trial_users),
-        'active_subscriptions': len(active_sub_users),
-        'total_freelancers': User.query.filter_by(role=UserRole.FREELANCER).count(),
-        'total_clients': User.query.filter_by(role=UserRole.CLIENT).count(),
-        'total_jobs': Job.query.count(),
-        'total_transactions': Transaction.query.count(),
-        'total_transaction_volume': sum([t.amount for t in completed_transactions]),
-        'total_platform_fees': sum([t.platform_fee for t in completed_transactions]),
-        'total_messages_sent': AdminMessage.query.count(),
-    }
+    # Serve from the stats snapshot unless a fresh computation is requested
+    max_age = current_app.config.get('ADMIN_STATS_SNAPSHOT_MAX_AGE', 0)
+    if request.args.get('fresh', 'false').lower() == 'true':
+        max_age = 0
+
+    stats = AdminStatsService.get_dashboard_stats(max_age)
 
     return jsonify(stats), 200
 
@@ -67,6 +59,11 @@ def admin_get_users():
     status = request.args.get('status')
     search = request.args.get('search')
 
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     query = User.query
 
     if role:
@@ -86,20 +83,9 @@ def admin_get_users():
             (User.tracking_id.ilike(search_pattern))
         )
 
-    users = query.all()
+    users = AdminBroadcastService.filter_by_status(query, status).all()
 
-    if status == 'active':
-        users = [u for u in users if u.is_active_profile]
-    elif status == 'suspended':
-        users = [u for u in users if u.is_suspended]
-    elif status == 'disabled':
-        users = [u for u in users if u.is_disabled]
-    elif status == 'trial':
-        users = [u for u in users if u.subscription_status == 'TRIAL']
-    elif status == 'expired':
-        users = [u for u in users if not u.is_active_profile and not u.is_suspended and not u.is_disabled]
-
-    return jsonify({'users': [u.to_dict() for u in users]}), 200
+    return jsonify({'users': serialize_users(users, fields)}), 200
 
 @admin_bp.route('/users/<int:user_id>', methods=['GET'])
 @jwt_required()
@@ -254,19 +240,70 @@ def admin_send_message():
             message=message_text
         )
         db.session.add(msg)
+        db.session.flush()
+        # Event and email notification are committed with the message
+        event_stream.publish_on_commit(recipient.id, 'admin_message', msg.to_dict())
+        EmailService.send_admin_message_email(recipient, subject, message_text)
         db.session.commit()
 
-        # Send email notification
+        return jsonify({'message': 'Message sent successfully', 'admin_message': msg.to_dict()}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/messages/broadcast', methods=['POST'])
+@jwt_required()
+def admin_broadcast_message():
+    current_user_id = get_jwt_identity()
+    admin_user = User.query.get(current_user_id)
+    if admin_user.role != UserRole.ADMIN:
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    data = request.get_json()
+    subject = data.get('subject', '').strip()
+    message_text = data.get('message', '').strip()
+    role = data.get('role')
+    status = data.get('status')
+
+    if not subject or not message_text:
+        return jsonify({'error': 'subject and message are required'}), 400
+
+    if role:
         try:
-            EmailService.send_admin_message_email(recipient, subject, message_text)
-        except Exception as mail_err:
-            print(f"Warning: Admin email notification failed: {mail_err}")
+            role = UserRole(role)
+        except ValueError:
+            return jsonify({'error': 'Invalid role value'}), 400
 
-        return jsonify({'message': 'Message sent successfully', 'admin_message': msg.to_dict()}), 201
+    if status and status not in AdminBroadcastService.USER_STATUSES:
+        return jsonify({'error': 'Invalid status value'}), 400
+
+    try:
+        broadcast = AdminBroadcastService.start_broadcast(
+            current_user_id, subject, message_text, role=role or None, status=status or None)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+    return jsonify({
+        'message': 'Broadcast started',
+        'broadcast': broadcast.to_dict(),
+        'status_url': f"/api/admin/messages/broadcast/{broadcast.id}"
+    }), 202
+
+@admin_bp.route('/messages/broadcast/<int:broadcast_id>', methods=['GET'])
+@jwt_required()
+def admin_get_broadcast(broadcast_id):
+    current_user_id = get_jwt_identity()
+    admin_user = User.query.get(current_user_id)
+    if admin_user.role != UserRole.ADMIN:
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    broadcast = AdminBroadcast.query.get(broadcast_id)
+    if not broadcast:
+        return jsonify({'error': 'Broadcast not found'}), 404
+
+    return jsonify({'broadcast': broadcast.to_dict()}), 200
+
 @admin_bp.route('/messages', methods=['GET'])
 @jwt_required()
 def admin_get_messages():
@@ -276,7 +313,10 @@ def admin_get_messages():
         return jsonify({'error': 'Unauthorized access'}), 403
 
     recipient_id = request.args.get('recipient_id')
-    query = AdminMessage.query
+    query = AdminMessage.query.options(
+        joinedload(AdminMessage.sender).load_only(User.username),
+        joinedload(AdminMessage.recipient).load_only(User.username)
+    )
     if recipient_id:
         query = query.filter_by(recipient_id=int(recipient_id))
     messages = query.order_by(AdminMessage.created_at.desc()).all()
@@ -285,15 +325,40 @@ def admin_get_messages():
 @admin_bp.route('/my-messages', methods=['GET'])
 @jwt_required()
 def get_my_messages():
-    """Get admin messages for the currently logged-in user (non-admin)."""
+    """Get admin messages for the currently logged-in user (non-admin), newest first."""
     current_user_id = get_jwt_identity()
-    messages = AdminMessage.query.filter_by(recipient_id=current_user_id).order_by(AdminMessage.created_at.desc()).all()
-    # Mark as read
-    for m in messages:
-        if not m.is_read:
-            m.is_read = True
-    db.session.commit()
-    return jsonify({'messages': [m.to_dict() for m in messages]}), 200
+    query = AdminMessage.query.filter_by(recipient_id=current_user_id).options(
+        joinedload(AdminMessage.sender).load_only(User.username),
+        joinedload(AdminMessage.recipient).load_only(User.username)
+    )
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        messages, next_cursor = keyset_page(query, AdminMessage.created_at, AdminMessage.id,
+                                            request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+
+    try:
+        # Mark the page as read with one UPDATE; 'evaluate' updates the loaded rows too
+        unread_ids = [m.id for m in messages if not m.is_read]
+        if unread_ids:
+            AdminMessage.query.filter(AdminMessage.id.in_(unread_ids)).update(
+                {'is_read': True}, synchronize_session='evaluate')
+        unread_count = AdminMessage.query.filter_by(recipient_id=current_user_id, is_read=False).count()
+        # Serialize before commit expires the loaded rows
+        results = [m.to_dict() for m in messages]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({
+        'messages': results,
+        'unread_count': unread_count,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    }), 200
 
 @admin_bp.route('/jobs', methods=['GET'])
 @jwt_required()
@@ -319,23 +384,94 @@ def admin_get_transactions():
         return jsonify({'error': 'Unauthorized access'}), 403
 
     status = request.args.get('status')
-    query = Transaction.query
+    query = Transaction.query.options(
+        joinedload(Transaction.payer).load_only(User.username),
+        joinedload(Transaction.payee).load_only(User.username)
+    )
     if status:
-        query = query.filter_by(status=status)
-    transactions = query.order_by(Transaction.created_at.desc()).all()
+        try:
+            query = query.filter_by(status=TransactionStatus(status))
+        except ValueError:
+            return jsonify({'error': 'Invalid status value'}), 400
+    # Pending deposits the payment reconciler could not settle
+    if request.args.get('needs_review') == 'true':
+        query = query.join(PaymentReconciliation, PaymentReconciliation.transaction_id == Transaction.id).filter(
+            PaymentReconciliation.needs_review == True)
+
+    try:
+        query = apply_date_range(query, Transaction.created_at,
+                                 request.args.get('start_date'), request.args.get('end_date'))
+        limit = parse_limit(request.args.get('limit'))
+        transactions, next_cursor = keyset_page(query, Transaction.created_at, Transaction.id,
+                                                request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid date range, cursor or limit'}), 400
 
     return jsonify({'transactions': [{
         'id': t.id,
         'job_id': t.job_id,
-        'payer': User.query.get(t.payer_id).username if User.query.get(t.payer_id) else 'N/A',
-        'payee': User.query.get(t.payee_id).username if User.query.get(t.payee_id) else 'N/A',
+        'payer': t.payer.username if t.payer else 'N/A',
+        'payee': t.payee.username if t.payee else 'N/A',
         'amount': t.amount,
         'platform_fee': t.platform_fee,
         'status': t.status.value,
         'transaction_reference': t.transaction_reference,
         'created_at': t.created_at.isoformat(),
         'updated_at': t.updated_at.isoformat()
-    } for t in transactions]}), 200
+    } for t in transactions], 'next_cursor': next_cursor, 'has_more': next_cursor is not None}), 200
+
+@admin_bp.route('/payouts/transfers', methods=['GET'])
+@jwt_required()
+def admin_get_payout_transfers():
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
+    if user.role != UserRole.ADMIN:
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    query = PayoutTransfer.query
+    status = request.args.get('status')
+    if status:
+        query = query.filter_by(status=status)
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        transfers, next_cursor = keyset_page(query, PayoutTransfer.created_at, PayoutTransfer.id,
+                                             request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+
+    return jsonify({
+        'transfers': [dict(transfer.to_dict(), freelancer_id=transfer.freelancer_id) for transfer in transfers],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    }), 200
+
+@admin_bp.route('/payouts/transfers/<int:transfer_id>/requeue', methods=['POST'])
+@jwt_required()
+def admin_requeue_payout_transfer(transfer_id):
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
+    if user.role != UserRole.ADMIN:
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    transfer = PayoutTransfer.query.get(transfer_id)
+    if not transfer:
+        return jsonify({'error': 'Transfer not found'}), 404
+
+    # Only failed transfers, or unconfirmed ones the provider confirms were not paid
+    if transfer.status not in payout_batcher.REQUEUEABLE_STATUSES:
+        return jsonify({'error': f"Transfer is '{transfer.status}' and can't be requeued"}), 409
+
+    try:
+        requeued = payout_batcher.requeue_transfers([transfer_id])
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    if not requeued:
+        return jsonify({'error': 'Transfer changed status, try again'}), 409
+
+    transfer = PayoutTransfer.query.get(transfer_id)
+    return jsonify({'message': 'Transfer requeued', 'transfer': transfer.to_dict()}), 200
 
 @admin_bp.route('/skills', methods=['GET'])
 @jwt_required()
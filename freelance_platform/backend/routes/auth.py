@@ -48,14 +48,10 @@ def register():
         user.set_password(data['password'])
         
         db.session.add(user)
+        # Confirmation email is queued in the outbox and committed with the user
+        EmailService.send_welcome_email(user)
         db.session.commit()
         
-        # Send confirmation email
-        try:
-            EmailService.send_welcome_email(user)
-        except Exception as mail_err:
-            print(f"Warning: Failed to send confirmation email: {mail_err}")
-        
         # Generate tokens
         access_token = create_access_token(identity=user.id)
         refresh_token = create_refresh_token(identity=user.id)
@@ -0,0 +1,99 @@
+from flask import request, jsonify, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from routes import events_bp
+from services import event_stream
+
+# Longest wait a long-poll request may ask for (seconds)
+MAX_POLL_TIMEOUT = 30
+
+@events_bp.route('/ticket', methods=['POST'])
+@jwt_required()
+def create_stream_ticket():
+    current_user_id = get_jwt_identity()
+
+    if not event_stream.streaming_available(current_app.config):
+        return _streaming_unavailable()
+
+    return jsonify({
+        'ticket': event_stream.issue_ticket(current_app.config, current_user_id),
+        'expires_in': current_app.config.get('EVENT_STREAM_TICKET_SECONDS', 60),
+        'stream_url': '/api/events/stream'
+    }), 201
+
+# EventSource can't send headers, so the stream is opened with ?ticket=<ticket>
+# from POST /ticket rather than the access token (which would end up in access logs)
+@events_bp.route('/stream', methods=['GET'])
+def stream_events():
+    if not event_stream.streaming_available(current_app.config):
+        return _streaming_unavailable()
+
+    current_user_id = event_stream.verify_ticket(current_app.config, request.args.get('ticket', ''))
+    if current_user_id is None:
+        return jsonify({'error': 'Invalid or expired stream ticket'}), 401
+
+    # EventSource resends the last id it saw when it reconnects
+    since = _parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    if since is False:
+        return jsonify({'error': 'Invalid event cursor'}), 400
+    if since is None:
+        since = event_stream.latest_event_id(current_user_id)
+
+    config = current_app.config
+    return Response(
+        event_stream.stream(
+            current_app._get_current_object(), current_user_id, since,
+            heartbeat_seconds=config.get('EVENT_STREAM_HEARTBEAT_SECONDS', 15),
+            max_seconds=config.get('EVENT_STREAM_MAX_SECONDS', 90),
+            poll_seconds=config.get('EVENT_STREAM_POLL_SECONDS', 1)
+        ),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _streaming_unavailable():
+    # Sync workers would each be held by one stream; clients fall back to /poll
+    return jsonify({
+        'error': 'Event streaming is not available on this server',
+        'poll_url': '/api/events/poll'
+    }), 503
+
+def _parse_cursor(value):
+    """
+    Event id cursor from a request, None when absent, False when invalid
+    """
+    if value in (None, ''):
+        return None
+    try:
+        cursor = int(value)
+    except ValueError:
+        return False
+    return cursor if cursor >= 0 else False
+
+# Poll with ?since=<cursor from the previous response>; the first poll (no since)
+# only returns the cursor to start from. Under sync workers the poll answers
+# immediately, under gevent workers it waits up to ?timeout= seconds for an event.
+@events_bp.route('/poll', methods=['GET'])
+@jwt_required()
+def poll_events():
+    current_user_id = get_jwt_identity()
+
+    since = _parse_cursor(request.args.get('since'))
+    if since is False:
+        return jsonify({'error': 'Invalid event cursor'}), 400
+    if since is None:
+        return jsonify({'events': [], 'since': event_stream.latest_event_id(current_user_id)}), 200
+
+    try:
+        timeout = min(float(request.args.get('timeout', 25)), MAX_POLL_TIMEOUT)
+    except ValueError:
+        return jsonify({'error': 'Invalid timeout value'}), 400
+
+    if event_stream.streaming_available(current_app.config) and timeout > 0:
+        events = event_stream.wait(
+            current_user_id, since, timeout, current_app.config.get('EVENT_STREAM_POLL_SECONDS', 1)
+        )
+    else:
+        events = event_stream.fetch_events(current_user_id, since)
+
+    return jsonify({'events': events, 'since': events[-1]['id'] if events else since}), 200
@@ -1,13 +1,43 @@
-from flask import request, jsonify
+from flask import request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
+import json
 
 from routes import marketplace_bp
 from models import db, Job, JobStatus, Proposal, User, Skill, UserRole
+from pagination import parse_limit, apply_keyset, keyset_page
+from serializers import parse_fields, serialize_users
+from services.user_stats_service import UserStatsService
+from services.notification_service import EmailService
+
+# Rows fetched per round trip when streaming the job feed
+STREAM_BATCH_SIZE = 500
+
+def _skills_by_name(skills_list):
+    """
+    Skills named in a request (array of strings or comma-separated string),
+    creating any that don't exist yet
+    """
+    if isinstance(skills_list, str):
+        skills_list = skills_list.split(',')
+    skills = []
+    for skill_name in skills_list:
+        skill_name_clean = skill_name.strip()
+        if not skill_name_clean:
+            continue
+        skill = Skill.query.filter_by(name=skill_name_clean).first()
+        if not skill:
+            skill = Skill(name=skill_name_clean)
+            db.session.add(skill)
+        skills.append(skill)
+    return skills
 
 @marketplace_bp.route('/jobs', methods=['GET'])
 def get_jobs():
     # Get query parameters for filtering
     status = request.args.get('status')
+    cursor = request.args.get('cursor')
+    stream = request.args.get('format') == 'ndjson'
     
     # Base query
     query = Job.query
@@ -20,11 +50,29 @@ def get_jobs():
         except ValueError:
             return jsonify({'error': 'Invalid status value'}), 400
     
-    # Execute query and get results
-    jobs = query.order_by(Job.created_at.desc()).all()
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        if stream:
+            query = apply_keyset(query, Job.created_at, Job.id, cursor)
+        else:
+            jobs, next_cursor = keyset_page(query, Job.created_at, Job.id, cursor, limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    
+    # Stream every matching job as NDJSON from a server-side cursor
+    if stream:
+        statement = query.statement.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+        
+        def generate():
+            for job in db.session.execute(statement).scalars():
+                yield json.dumps(job.to_dict()) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
     
     return jsonify({
-        'jobs': [job.to_dict() for job in jobs]
+        'jobs': [job.to_dict() for job in jobs],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
     }), 200
 
 @marketplace_bp.route('/jobs', methods=['POST'])
@@ -52,15 +100,20 @@ def create_job():
             description=data['description'],
             client_id=current_user_id,
             budget=data['budget'],
-            deadline=data.get('deadline')
+            deadline=data.get('deadline'),
+            skills=_skills_by_name(data.get('skills', []))
         )
         
         db.session.add(job)
-        db.session.commit()
+        UserStatsService.record_job_posted(current_user_id)
+        
+        # Commits the job together with its fan-out to freelancers with matching skills
+        if not EmailService.send_job_posted_notification(job):
+            return jsonify({'error': 'Failed to create job'}), 500
         
         return jsonify({
             'message': 'Job created successfully',
-            'job': job.to_dict()
+            'job': dict(job.to_dict(), skills=[skill.name for skill in job.skills])
         }), 201
         
     except Exception as e:
@@ -74,7 +127,7 @@ def get_job(job_id):
     if not job:
         return jsonify({'error': 'Job not found'}), 404
     
-    return jsonify(job.to_dict()), 200
+    return jsonify(dict(job.to_dict(), skills=[skill.name for skill in job.skills])), 200
 
 @marketplace_bp.route('/jobs/<int:job_id>', methods=['PUT'])
 @jwt_required()
@@ -93,6 +146,7 @@ def update_job(job_id):
     
     # Update job fields
     try:
+        completed = False
         if 'title' in data:
             job.title = data['title']
         if 'description' in data:
@@ -103,11 +157,20 @@ def update_job(job_id):
             job.deadline = data['deadline']
         if 'status' in data:
             try:
-                job.status = JobStatus(data['status'])
+                new_status = JobStatus(data['status'])
             except ValueError:
                 return jsonify({'error': 'Invalid status value'}), 400
+            if new_status == JobStatus.COMPLETED and job.status != JobStatus.COMPLETED and job.freelancer_id:
+                UserStatsService.record_job_completed(job.freelancer_id)
+                completed = True
+            job.status = new_status
         
-        db.session.commit()
+        if completed:
+            # Notify both parties; commits the update together with the notifications
+            if not EmailService.send_job_completed_notification(job):
+                return jsonify({'error': 'Failed to update job'}), 500
+        else:
+            db.session.commit()
         
         return jsonify({
             'message': 'Job updated successfully',
@@ -133,6 +196,7 @@ def delete_job(job_id):
     
     # Delete job
     try:
+        UserStatsService.record_job_deleted(job)
         db.session.delete(job)
         db.session.commit()
         
@@ -157,17 +221,50 @@ def get_job_proposals(job_id):
     if job.client_id != current_user_id:
         return jsonify({'error': 'You do not have permission to view proposals for this job'}), 403
     
-    proposals = Proposal.query.filter_by(job_id=job_id).all()
+    # Sorting (newest first by default)
+    sort_by = request.args.get('sort_by', 'created_at')
+    sort_options = {
+        'created_at': (Proposal.created_at.desc(), Proposal.id.desc()),
+        'created_at_asc': (Proposal.created_at, Proposal.id),
+        'bid_amount_asc': (Proposal.bid_amount, Proposal.id),
+        'bid_amount_desc': (Proposal.bid_amount.desc(), Proposal.id.desc())
+    }
+    if sort_by not in sort_options:
+        return jsonify({'error': 'Invalid sort_by value'}), 400
+    
+    # Load proposals, freelancers and their skills in a fixed number of queries
+    query = Proposal.query.filter_by(job_id=job_id).options(
+        joinedload(Proposal.freelancer).selectinload(User.skills)
+    ).order_by(*sort_options[sort_by])
+    
+    # Pagination
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = parse_limit(request.args.get('per_page'))
+    except ValueError:
+        return jsonify({'error': 'Invalid page or per_page value'}), 400
+    
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    freelancers = serialize_users([proposal.freelancer for proposal in pagination.items], fields)
     
     return jsonify({
         'proposals': [{
             'id': proposal.id,
-            'freelancer': User.query.get(proposal.freelancer_id).to_dict(),
+            'freelancer': freelancer,
             'cover_letter': proposal.cover_letter,
             'bid_amount': proposal.bid_amount,
             'estimated_duration': proposal.estimated_duration,
             'created_at': proposal.created_at.isoformat()
-        } for proposal in proposals]
+        } for proposal, freelancer in zip(pagination.items, freelancers)],
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'page': page,
+        'per_page': per_page
     }), 200
 
 @marketplace_bp.route('/jobs/<int:job_id>/proposals', methods=['POST'])
@@ -212,7 +309,11 @@ def submit_proposal(job_id):
         )
         
         db.session.add(proposal)
-        db.session.commit()
+        db.session.flush()
+        
+        # Notify the client; commits the proposal together with the notification
+        if not EmailService.send_proposal_received_notification(proposal):
+            return jsonify({'error': 'Failed to submit proposal'}), 500
         
         return jsonify({
             'message': 'Proposal submitted successfully',
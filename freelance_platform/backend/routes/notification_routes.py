@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.notification_service import NotificationService, EmailService
-from models import User, db, NotificationType
+from models import User, UserRole, db, NotificationType
 
 notification_routes = Blueprint('notification', __name__)
 
@@ -18,6 +18,16 @@ def get_notifications():
     
     return jsonify({'success': True, 'results': results}), 200
 
+@notification_routes.route('/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_count():
+    user_id = get_jwt_identity()
+    
+    # Served from the counter on users; cheap enough for frequent polling
+    unread_count = NotificationService.get_unread_count(user_id)
+    
+    return jsonify({'success': True, 'unread_count': unread_count}), 200
+
 @notification_routes.route('/<notification_id>/read', methods=['POST'])
 @jwt_required()
 def mark_notification_read(notification_id):
@@ -112,7 +122,7 @@ def get_email_logs():
     # Get user
     user = User.query.get(user_id)
     
-    if not user or user.role != 'ADMIN':
+    if not user or user.role != UserRole.ADMIN:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
     # Get query parameters
@@ -1,12 +1,18 @@
 from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 import uuid
 import json
 
 from routes import payments_bp
-from models import db, Transaction, TransactionStatus, Job, JobStatus, User
+from models import db, Transaction, TransactionStatus, Job, JobStatus, User, PaymentCallback, DepositInitiation, Payout
 from services.orange_money_service import OrangeMoneyService
+from services import deposit_initiation, payout_batcher
 from config import Config
+from pagination import parse_limit, apply_date_range, keyset_page
+from services.user_stats_service import UserStatsService
 
 orange_money_service = OrangeMoneyService()
 
@@ -44,7 +50,7 @@ def initiate_deposit():
     amount = float(data['amount'])
     platform_fee = amount * (Config.PLATFORM_FEE_PERCENTAGE / 100)
     
-    # Create a new transaction
+    # Create the transaction and queue it for submission to Orange Money
     try:
         transaction = Transaction(
             job_id=job_id,
@@ -57,47 +63,62 @@ def initiate_deposit():
         )
         
         db.session.add(transaction)
-        db.session.commit()
-        
-        # Initiate payment with Orange Money
-        payment_response = orange_money_service.initiate_payment(
-            amount=amount,
+        initiation = deposit_initiation.queue_deposit(
+            transaction,
             phone_number=data.get('phone_number', user.phone_number),
-            transaction_reference=transaction_reference,
             description=f"Deposit for job: {job.title}"
         )
-        
-        # Update transaction with Orange Money transaction ID
-        if payment_response['status'] == 'success':
-            transaction.orange_money_transaction_id = payment_response['transaction_id']
-            db.session.commit()
-            
-            return jsonify({
-                'message': 'Deposit initiated successfully',
-                'transaction': {
-                    'id': transaction.id,
-                    'job_id': transaction.job_id,
-                    'amount': transaction.amount,
-                    'platform_fee': transaction.platform_fee,
-                    'status': transaction.status.value,
-                    'transaction_reference': transaction.transaction_reference,
-                    'created_at': transaction.created_at.isoformat()
-                },
-                'payment_details': payment_response
-            }), 200
-        else:
-            # Payment initiation failed
-            transaction.status = TransactionStatus.FAILED
-            db.session.commit()
-            
-            return jsonify({
-                'error': 'Payment initiation failed',
-                'details': payment_response['message']
-            }), 400
-        
+        db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+    
+    # The provider call happens in the background; poll status_url or listen for 'deposit' events
+    deposit_initiation.dispatch(initiation.id)
+    
+    return jsonify({
+        'message': 'Deposit queued',
+        'transaction': {
+            'id': transaction.id,
+            'job_id': transaction.job_id,
+            'amount': transaction.amount,
+            'platform_fee': transaction.platform_fee,
+            'status': transaction.status.value,
+            'transaction_reference': transaction.transaction_reference,
+            'created_at': transaction.created_at.isoformat()
+        },
+        'initiation': initiation.to_dict(),
+        'status_url': f"/api/payments/deposit/{transaction.id}"
+    }), 202
+
+@payments_bp.route('/deposit/<int:transaction_id>', methods=['GET'])
+@jwt_required()
+def get_deposit_status(transaction_id):
+    current_user_id = get_jwt_identity()
+    transaction = Transaction.query.get(transaction_id)
+    
+    if not transaction:
+        return jsonify({'error': 'Transaction not found'}), 404
+    
+    if current_user_id not in (transaction.payer_id, transaction.payee_id):
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    initiation = DepositInitiation.query.filter_by(transaction_id=transaction.id).first()
+    
+    return jsonify({
+        'transaction': {
+            'id': transaction.id,
+            'job_id': transaction.job_id,
+            'amount': transaction.amount,
+            'platform_fee': transaction.platform_fee,
+            'status': transaction.status.value,
+            'transaction_reference': transaction.transaction_reference,
+            'orange_money_transaction_id': transaction.orange_money_transaction_id,
+            'created_at': transaction.created_at.isoformat(),
+            'updated_at': transaction.updated_at.isoformat()
+        },
+        'initiation': initiation.to_dict() if initiation else None
+    }), 200
 
 @payments_bp.route('/callback', methods=['POST'])
 def payment_callback():
@@ -112,36 +133,89 @@ def payment_callback():
     transaction_reference = data['transaction_reference']
     status = data['status']
     orange_money_transaction_id = data['orange_money_transaction_id']
+    provider = OrangeMoneyService.PROVIDER
     
-    # Find the transaction
-    transaction = Transaction.query.filter_by(transaction_reference=transaction_reference).first()
+    # Replayed callback: answer from the dedup row without loading anything
+    processed_status = _processed_callback_status(provider, orange_money_transaction_id)
+    if processed_status is not None:
+        return jsonify({
+            'message': 'Callback already processed',
+            'transaction_status': processed_status.value
+        }), 200
     
-    if not transaction:
-        return jsonify({'error': 'Transaction not found'}), 404
+    new_status = TransactionStatus.COMPLETED if status == 'success' else TransactionStatus.FAILED
     
-    # Update transaction status
     try:
-        if status == 'success':
-            transaction.status = TransactionStatus.COMPLETED
-            
-            # Update job status if not already in progress
-            job = Job.query.get(transaction.job_id)
-            if job.status == JobStatus.OPEN:
-                job.status = JobStatus.IN_PROGRESS
+        # Claim the provider transaction; a concurrent duplicate blocks on the
+        # unique index here and fails once this request commits
+        db.session.execute(insert(PaymentCallback).values(
+            provider=provider,
+            provider_transaction_id=orange_money_transaction_id,
+            transaction_reference=transaction_reference,
+            reported_status=status
+        ))
+        
+        # Only a pending transaction changes state
+        result = db.session.execute(
+            update(Transaction)
+            .where(Transaction.transaction_reference == transaction_reference,
+                   Transaction.status == TransactionStatus.PENDING)
+            .values(status=new_status, orange_money_transaction_id=orange_money_transaction_id)
+            .execution_options(synchronize_session=False)
+        )
+        
+        if result.rowcount == 0:
+            current_status = db.session.execute(
+                select(Transaction.status).where(Transaction.transaction_reference == transaction_reference)
+            ).scalar()
+            if current_status is None:
+                db.session.rollback()
+                return jsonify({'error': 'Transaction not found'}), 404
         else:
-            transaction.status = TransactionStatus.FAILED
+            current_status = new_status
+            if new_status == TransactionStatus.COMPLETED:
+                # Update job status if not already in progress
+                job_id = select(Transaction.job_id).where(
+                    Transaction.transaction_reference == transaction_reference).scalar_subquery()
+                db.session.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JobStatus.OPEN)
+                    .values(status=JobStatus.IN_PROGRESS)
+                    .execution_options(synchronize_session=False)
+                )
         
-        transaction.orange_money_transaction_id = orange_money_transaction_id
         db.session.commit()
-        
+    except IntegrityError:
+        # Lost the race to a concurrent delivery of the same callback
+        db.session.rollback()
+        processed_status = _processed_callback_status(provider, orange_money_transaction_id)
         return jsonify({
-            'message': 'Callback processed successfully',
-            'transaction_status': transaction.status.value
+            'message': 'Callback already processed',
+            'transaction_status': processed_status.value if processed_status else None
         }), 200
-        
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+    
+    if result.rowcount:
+        orange_money_service.states.update_status(
+            provider, orange_money_transaction_id, 'completed' if new_status == TransactionStatus.COMPLETED else 'failed')
+    
+    return jsonify({
+        'message': 'Callback processed successfully',
+        'transaction_status': current_status.value
+    }), 200
+
+def _processed_callback_status(provider, provider_transaction_id):
+    """
+    Current status of the transaction a callback was already recorded for, or None
+    """
+    return db.session.execute(
+        select(Transaction.status)
+        .join(PaymentCallback, PaymentCallback.transaction_reference == Transaction.transaction_reference)
+        .where(PaymentCallback.provider == provider,
+               PaymentCallback.provider_transaction_id == provider_transaction_id)
+    ).scalar()
 
 @payments_bp.route('/transactions', methods=['GET'])
 @jwt_required()
@@ -169,23 +243,39 @@ def get_transactions():
         except ValueError:
             return jsonify({'error': 'Invalid status value'}), 400
     
-    # Execute query and get results
-    transactions = query.order_by(Transaction.created_at.desc()).all()
+    # Resolve payer, payee and job in the same query
+    query = query.options(
+        joinedload(Transaction.job).load_only(Job.title),
+        joinedload(Transaction.payer).load_only(User.username),
+        joinedload(Transaction.payee).load_only(User.username)
+    )
+    
+    # Apply date range and fetch one keyset page
+    try:
+        query = apply_date_range(query, Transaction.created_at,
+                                 request.args.get('start_date'), request.args.get('end_date'))
+        limit = parse_limit(request.args.get('limit'))
+        transactions, next_cursor = keyset_page(query, Transaction.created_at, Transaction.id,
+                                                request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid date range, cursor or limit'}), 400
     
     return jsonify({
         'transactions': [{
             'id': transaction.id,
             'job_id': transaction.job_id,
-            'job_title': Job.query.get(transaction.job_id).title,
-            'payer': User.query.get(transaction.payer_id).username,
-            'payee': User.query.get(transaction.payee_id).username,
+            'job_title': transaction.job.title,
+            'payer': transaction.payer.username,
+            'payee': transaction.payee.username,
             'amount': transaction.amount,
             'platform_fee': transaction.platform_fee,
             'status': transaction.status.value,
             'transaction_reference': transaction.transaction_reference,
             'created_at': transaction.created_at.isoformat(),
             'updated_at': transaction.updated_at.isoformat()
-        } for transaction in transactions]
+        } for transaction in transactions],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
     }), 200
 
 @payments_bp.route('/release/<int:transaction_id>', methods=['POST'])
@@ -207,25 +297,47 @@ def release_payment(transaction_id):
     if transaction.status != TransactionStatus.COMPLETED:
         return jsonify({'error': 'Transaction must be completed before releasing payment'}), 400
     
-    # Update job status
+    if Payout.query.filter_by(transaction_id=transaction.id).first():
+        return jsonify({'error': 'Payment has already been released'}), 400
+    
+    # Complete the job and record the payout; the payout batcher pays it out
     try:
+        if job.status != JobStatus.COMPLETED and job.freelancer_id:
+            UserStatsService.record_job_completed(job.freelancer_id)
         job.status = JobStatus.COMPLETED
+        payout = payout_batcher.record_payout(transaction)
         db.session.commit()
         
-        # Simulate payment release to freelancer
-        # In a real implementation, this would interact with Orange Money API
-        payment_release_response = orange_money_service.release_payment(
-            transaction_id=transaction.orange_money_transaction_id,
-            amount=transaction.amount - transaction.platform_fee,
-            recipient_id=transaction.payee_id
-        )
-        
         return jsonify({
-            'message': 'Payment released successfully',
+            'message': 'Payment release queued',
             'job_status': job.status.value,
-            'release_details': payment_release_response
-        }), 200
+            'payout': payout.to_dict(),
+            'status_url': f"/api/payments/payouts/{payout.id}"
+        }), 202
         
+    except IntegrityError:
+        # A concurrent release recorded the payout first (unique transaction_id)
+        db.session.rollback()
+        return jsonify({'error': 'Payment has already been released'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+@payments_bp.route('/payouts/<int:payout_id>', methods=['GET'])
+@jwt_required()
+def get_payout_status(payout_id):
+    current_user_id = get_jwt_identity()
+    payout = Payout.query.options(joinedload(Payout.transfer)).get(payout_id)
+    
+    if not payout:
+        return jsonify({'error': 'Payout not found'}), 404
+    
+    # Visible to the freelancer being paid and the client who paid
+    if current_user_id != payout.freelancer_id:
+        payer_id = db.session.execute(
+            select(Transaction.payer_id).where(Transaction.id == payout.transaction_id)
+        ).scalar()
+        if current_user_id != payer_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+    
+    return jsonify({'payout': payout.to_dict()}), 200
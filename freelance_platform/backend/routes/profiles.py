@@ -4,8 +4,12 @@ from werkzeug.utils import secure_filename
 import os
 
 from routes import profiles_bp
-from models import db, User, Skill, Review, Job, UserRole
+from models import db, User, Skill, Review, Job, JobStatus, UserRole
 from config import Config
+from pagination import parse_limit
+from serializers import parse_fields, serialize_users
+from sqlalchemy.orm import joinedload
+from services.user_stats_service import UserStatsService
 
 @profiles_bp.route('/users', methods=['GET'])
 def get_users():
@@ -41,15 +45,30 @@ def get_users():
             (User.tracking_id.ilike(search_pattern))
         )
     
-    # Execute query and get results
-    users = query.all()
-    
     # Filter active profiles unless include_all is requested (e.g. for admin view)
     if not include_all:
-        users = [user for user in users if user.is_active_profile]
+        query = query.filter(User.is_active_profile)
+    
+    # Pagination
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = parse_limit(request.args.get('per_page'))
+    except ValueError:
+        return jsonify({'error': 'Invalid page or per_page value'}), 400
+    
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    pagination = query.order_by(User.id).paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'users': [user.to_dict() for user in users]
+        'users': serialize_users(pagination.items, fields),
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'page': page,
+        'per_page': per_page
     }), 200
 
 @profiles_bp.route('/users/<int:user_id>', methods=['GET'])
@@ -180,17 +199,24 @@ def get_user_reviews(user_id):
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    reviews = Review.query.filter_by(reviewee_id=user_id).all()
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Load reviewers with the reviews instead of one query per review
+    reviews = Review.query.filter_by(reviewee_id=user_id).options(joinedload(Review.reviewer)).all()
+    reviewers = serialize_users([review.reviewer for review in reviews], fields)
     
     return jsonify({
         'reviews': [{
             'id': review.id,
             'job_id': review.job_id,
-            'reviewer': User.query.get(review.reviewer_id).to_dict(),
+            'reviewer': reviewer,
             'rating': review.rating,
             'comment': review.comment,
             'created_at': review.created_at.isoformat()
-        } for review in reviews]
+        } for review, reviewer in zip(reviews, reviewers)]
     }), 200
 
 @profiles_bp.route('/jobs/<int:job_id>/review', methods=['POST'])
@@ -247,6 +273,7 @@ def create_review(job_id):
         )
         
         db.session.add(review)
+        UserStatsService.record_review(reviewee_id, review.rating)
         db.session.commit()
         
         return jsonify({
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.search_service import SearchService, SearchType
 
@@ -51,10 +51,18 @@ def search_clients():
 
 @search_routes.route('/filters', methods=['GET'])
 def get_search_filters():
-    # Get available search filters
-    filters = SearchService.get_search_filters()
+    # Answer conditional requests from the version key alone
+    etag = f"filters-{SearchService.get_search_filters_version()}"
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        # Get available search filters
+        filters = SearchService.get_search_filters()
+        response = jsonify({'success': True, 'filters': filters})
     
-    return jsonify({'success': True, 'filters': filters}), 200
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
 
 @search_routes.route('/autocomplete', methods=['GET'])
 def autocomplete():
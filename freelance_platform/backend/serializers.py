@@ -0,0 +1,50 @@
+from datetime import datetime
+from sqlalchemy import inspect, select
+from models import db, Skill, user_skills
+
+USER_FIELD_SETS = ('card', 'full')
+
+def load_skill_names(users):
+    """
+    Get {user_id: [skill names]} for a page of users with a single query.
+    Users whose skills are already loaded are read from memory.
+    """
+    skills = {}
+    missing = []
+    for user in users:
+        if 'skills' in inspect(user).unloaded:
+            missing.append(user.id)
+            skills[user.id] = []
+        else:
+            skills[user.id] = [skill.name for skill in user.skills]
+
+    if missing:
+        rows = db.session.execute(
+            select(user_skills.c.user_id, Skill.name)
+            .join(Skill, Skill.id == user_skills.c.skill_id)
+            .where(user_skills.c.user_id.in_(missing))
+        )
+        for user_id, name in rows:
+            skills[user_id].append(name)
+
+    return skills
+
+def serialize_users(users, fields='full'):
+    """
+    Serialize a page of users with one skills query and one `now`
+    """
+    users = list(users)
+    now = datetime.utcnow()
+    skills = load_skill_names(users)
+    return [user.to_dict(fields=fields, now=now, skills=skills[user.id]) for user in users]
+
+def parse_fields(value, default='full'):
+    """
+    Parse a `fields` query parameter naming a user field set.
+    Raises ValueError for unknown field sets.
+    """
+    if not value:
+        return default
+    if value not in USER_FIELD_SETS:
+        raise ValueError('Invalid fields value')
+    return value
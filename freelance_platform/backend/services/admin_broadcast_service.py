@@ -0,0 +1,251 @@
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, insert, or_, select, update
+from models import db, User, UserRole, AdminMessage, AdminBroadcast
+from services.email_service import EmailService
+from services.email_outbox import enqueue_emails
+from services import event_stream
+
+logger = logging.getLogger(__name__)
+
+# Recipients handled per chunk (one AdminMessage INSERT, one outbox INSERT, one commit)
+BROADCAST_CHUNK_SIZE = 1000
+
+# How long a claimed broadcast is reserved; extended after every chunk, so a
+# broadcast whose worker died is taken over (and resumed) once this has passed
+CLAIM_SECONDS = 300
+
+class AdminBroadcastService:
+    USER_STATUSES = ('active', 'suspended', 'disabled', 'trial', 'expired')
+
+    @staticmethod
+    def filter_by_status(query, status):
+        """
+        Restrict a User query to an account status segment, in SQL
+        """
+        if status == 'active':
+            return query.filter(User.is_active_profile)
+        if status == 'suspended':
+            return query.filter(User.is_suspended == True)
+        if status == 'disabled':
+            return query.filter(User.is_disabled == True)
+        if status == 'trial':
+            return query.filter(User.subscription_status == 'TRIAL')
+        if status == 'expired':
+            # Neither active nor blocked; spelled out so NULL dates count as lapsed
+            now = datetime.utcnow()
+            return query.filter(and_(
+                or_(User.is_disabled.is_(None), User.is_disabled == False),
+                or_(User.is_suspended.is_(None), User.is_suspended == False),
+                or_(User.trial_end_date.is_(None), User.trial_end_date < now),
+                or_(User.subscription_end_date.is_(None), User.subscription_end_date < now),
+                or_(User.subscription_status.is_(None), User.subscription_status != 'ACTIVE')
+            ))
+        return query
+
+    @staticmethod
+    def segment_query(role=None, status=None):
+        query = User.query
+        if role is not None:
+            query = query.filter(User.role == role)
+        return AdminBroadcastService.filter_by_status(query, status)
+
+    @staticmethod
+    def start_broadcast(sender_id, subject, message, role=None, status=None):
+        """
+        Record a broadcast and deliver it from a background thread (resumed by
+        the broadcast worker if interrupted). Returns the AdminBroadcast; poll
+        it for progress.
+        """
+        broadcast = AdminBroadcast(
+            sender_id=sender_id,
+            subject=subject,
+            message=message,
+            role=role,
+            status_filter=status
+        )
+        db.session.add(broadcast)
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        thread = threading.Thread(
+            target=AdminBroadcastWorker(app).run_once,
+            args=([broadcast.id],),
+            name=f'admin-broadcast-{broadcast.id}',
+            daemon=True
+        )
+        thread.start()
+        return broadcast
+
+class AdminBroadcastWorker:
+    """
+    Delivers queued broadcasts a chunk at a time. Each chunk's messages and
+    emails are committed together with the broadcast's last_recipient_id, so
+    a broadcast cut off by a restart resumes after the last recipient served.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.poll_seconds = app.config.get('ADMIN_BROADCAST_POLL_SECONDS', 5)
+        self.stopping = threading.Event()
+
+    def claim(self, ids=None):
+        """
+        Reserve due broadcasts (the given ids, or all), including running ones
+        whose claim has expired. Returns (token, ids).
+        """
+        now = datetime.utcnow()
+        due = or_(
+            AdminBroadcast.status == 'queued',
+            and_(AdminBroadcast.status == 'running', AdminBroadcast.claimed_until < now)
+        )
+        if ids is None:
+            ids = db.session.scalars(select(AdminBroadcast.id).where(due).order_by(AdminBroadcast.id)).all()
+        if not ids:
+            db.session.rollback()
+            return None, []
+
+        token = str(uuid.uuid4())
+        db.session.execute(
+            update(AdminBroadcast)
+            .where(AdminBroadcast.id.in_(ids), due)
+            .values(status='running', claim_token=token, claimed_until=now + timedelta(seconds=CLAIM_SECONDS)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        return token, db.session.scalars(
+            select(AdminBroadcast.id).where(AdminBroadcast.claim_token == token).order_by(AdminBroadcast.id)
+        ).all()
+
+    def _update_claimed(self, broadcast_id, token, **values):
+        """
+        Update a broadcast only while this worker still holds its claim
+        """
+        result = db.session.execute(
+            update(AdminBroadcast)
+            .where(AdminBroadcast.id == broadcast_id, AdminBroadcast.claim_token == token)
+            .values(**values),
+            execution_options={'synchronize_session': False}
+        )
+        return result.rowcount == 1
+
+    def process(self, broadcast_id, token):
+        """
+        Insert one AdminMessage per remaining recipient and queue their emails,
+        a chunk at a time, updating the broadcast's progress after each chunk
+        """
+        broadcast = db.session.get(AdminBroadcast, broadcast_id)
+        sender = db.session.get(User, broadcast.sender_id)
+        sender_id = broadcast.sender_id
+        sender_name = sender.username if sender else 'Admin'
+        subject = broadcast.subject
+        message = broadcast.message
+        last_id = broadcast.last_recipient_id
+        recipients = AdminBroadcastService.segment_query(
+            broadcast.role, broadcast.status_filter).filter(User.id != sender_id)
+
+        if broadcast.started_at is None:
+            broadcast.started_at = datetime.utcnow()
+            broadcast.total_recipients = recipients.count()
+            db.session.commit()
+        else:
+            logger.info(f"Resuming admin broadcast {broadcast_id} after recipient {last_id}")
+
+        while not self.stopping.is_set():
+            users = recipients.with_entities(
+                User.id, User.email, User.username, User.first_name
+            ).filter(User.id > last_id).order_by(User.id).limit(BROADCAST_CHUNK_SIZE).all()
+            if not users:
+                self._update_claimed(broadcast_id, token, status='completed', claim_token=None,
+                                     finished_at=datetime.utcnow())
+                db.session.commit()
+                return
+
+            now = datetime.utcnow()
+            db.session.execute(insert(AdminMessage), [{
+                'sender_id': sender_id,
+                'recipient_id': user.id,
+                'subject': subject,
+                'message': message,
+                'is_read': False,
+                'created_at': now
+            } for user in users])
+
+            emails = []
+            for user in users:
+                email_subject, body = EmailService.build_admin_message_email(user, subject, message)
+                emails.append((user.email, email_subject, body))
+            queued = enqueue_emails(emails)
+
+            if not self._update_claimed(
+                broadcast_id, token,
+                last_recipient_id=users[-1].id,
+                messages_created=AdminBroadcast.messages_created + len(users),
+                emails_queued=AdminBroadcast.emails_queued + queued,
+                claimed_until=datetime.utcnow() + timedelta(seconds=CLAIM_SECONDS)
+            ):
+                # Another worker took the broadcast over; it sends this chunk instead
+                db.session.rollback()
+                logger.warning(f"Admin broadcast {broadcast_id} was claimed by another worker")
+                return
+            for user in users:
+                event_stream.publish_on_commit(user.id, 'admin_message', {
+                    'sender_name': sender_name,
+                    'subject': subject,
+                    'message': message,
+                    'created_at': now.isoformat()
+                })
+            db.session.commit()
+            last_id = users[-1].id
+
+        # Stopping: hand the rest back to the queue
+        self._update_claimed(broadcast_id, token, status='queued', claim_token=None)
+        db.session.commit()
+
+    def run_once(self, ids=None):
+        """
+        Deliver claimed broadcasts. Returns the number processed.
+        """
+        with self.app.app_context():
+            token, broadcast_ids = self.claim(ids)
+            for broadcast_id in broadcast_ids:
+                try:
+                    self.process(broadcast_id, token)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Admin broadcast {broadcast_id} failed: {e}")
+                    self._update_claimed(broadcast_id, token, status='failed', error_message=str(e),
+                                         claim_token=None, finished_at=datetime.utcnow())
+                    db.session.commit()
+            return len(broadcast_ids)
+
+    def run(self):
+        """
+        Poll for queued or abandoned broadcasts until stop() is called
+        """
+        logger.info("Admin broadcast worker started")
+        while not self.stopping.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception(f"Admin broadcast worker error: {e}")
+            self.stopping.wait(self.poll_seconds)
+
+    def stop(self):
+        self.stopping.set()
+
+def init_app(app):
+    """
+    Start the broadcast worker in a background thread when
+    ADMIN_BROADCAST_WORKER_THREAD is set; otherwise run `flask send-broadcasts`
+    (or `flask run-workers`).
+    """
+    if not app.config.get('ADMIN_BROADCAST_WORKER_THREAD'):
+        return
+    worker = AdminBroadcastWorker(app)
+    thread = threading.Thread(target=worker.run, name='admin-broadcasts', daemon=True)
+    thread.start()
+    app.extensions['admin_broadcast_worker'] = worker
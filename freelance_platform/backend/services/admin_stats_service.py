@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, User, UserRole, Job, Transaction, TransactionStatus, AdminMessage, PlatformStatsSnapshot
+
+# Snapshot row is kept as a single upserted record
+SNAPSHOT_ID = 1
+
+class AdminStatsService:
+    @staticmethod
+    def compute_stats():
+        """
+        Compute platform statistics with SQL aggregates (two round trips)
+        """
+        user_row = db.session.execute(select(
+            func.count(User.id),
+            func.count(User.id).filter(User.is_active_profile),
+            func.count(User.id).filter(User.is_suspended == True),
+            func.count(User.id).filter(User.is_disabled == True),
+            func.count(User.id).filter(User.subscription_status == 'TRIAL'),
+            func.count(User.id).filter(User.subscription_status == 'ACTIVE'),
+            func.count(User.id).filter(User.role == UserRole.FREELANCER),
+            func.count(User.id).filter(User.role == UserRole.CLIENT)
+        )).one()
+
+        completed = Transaction.status == TransactionStatus.COMPLETED
+        totals_row = db.session.execute(select(
+            select(func.count(Job.id)).scalar_subquery(),
+            select(func.count(AdminMessage.id)).scalar_subquery(),
+            func.count(Transaction.id),
+            func.coalesce(func.sum(Transaction.amount).filter(completed), 0.0),
+            func.coalesce(func.sum(Transaction.platform_fee).filter(completed), 0.0)
+        ).select_from(Transaction)).one()
+
+        return {
+            'total_users': user_row[0],
+            'active_profiles': user_row[1],
+            'suspended_accounts': user_row[2],
+            'disabled_accounts': user_row[3],
+            'trial_accounts': user_row[4],
+            'active_subscriptions': user_row[5],
+            'total_freelancers': user_row[6],
+            'total_clients': user_row[7],
+            'total_jobs': totals_row[0],
+            'total_messages_sent': totals_row[1],
+            'total_transactions': totals_row[2],
+            'total_transaction_volume': float(totals_row[3]),
+            'total_platform_fees': float(totals_row[4])
+        }
+
+    @staticmethod
+    def refresh_snapshot():
+        """
+        Recompute statistics and store them in the snapshot table
+        """
+        stats = AdminStatsService.compute_stats()
+        stats['computed_at'] = datetime.utcnow()
+
+        # Upsert, so workers refreshing at the same moment don't collide on the INSERT
+        dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(db.session.get_bind().dialect.name)
+        if dialect:
+            statement = dialect.insert(PlatformStatsSnapshot).values(id=SNAPSHOT_ID, **stats)
+            db.session.execute(statement.on_conflict_do_update(index_elements=[PlatformStatsSnapshot.id], set_=stats))
+        else:
+            result = db.session.execute(
+                update(PlatformStatsSnapshot).where(PlatformStatsSnapshot.id == SNAPSHOT_ID).values(**stats)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                db.session.add(PlatformStatsSnapshot(id=SNAPSHOT_ID, **stats))
+
+        db.session.commit()
+        return db.session.get(PlatformStatsSnapshot, SNAPSHOT_ID, populate_existing=True)
+
+    @staticmethod
+    def get_dashboard_stats(max_age_seconds=0):
+        """
+        Get dashboard statistics, served from the snapshot when it is younger
+        than max_age_seconds. A max age of 0 disables the snapshot entirely.
+        """
+        if not max_age_seconds:
+            return AdminStatsService.compute_stats()
+
+        snapshot = db.session.get(PlatformStatsSnapshot, SNAPSHOT_ID)
+        if not snapshot or snapshot.computed_at < datetime.utcnow() - timedelta(seconds=max_age_seconds):
+            snapshot = AdminStatsService.refresh_snapshot()
+
+        return snapshot.to_dict()
@@ -3,10 +3,8 @@ from itsdangerous import URLSafeTimedSerializer
 from datetime import datetime, timedelta
 import jwt
 import uuid
-from models import db, User, EmailLog, Notification, NotificationType
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from models import db, User, Notification, NotificationType
+from services.email_outbox import enqueue_email
 
 class AuthService:
     @staticmethod
@@ -270,50 +268,14 @@ class AuthService:
     @staticmethod
     def send_email(recipient, subject, html_content):
         """
-        Send email and log it
+        Queue an email for delivery by the outbox worker and commit. A failure
+        to queue only undoes the outbox row, not the caller's pending changes.
         """
         try:
-            # Create email message
-            msg = MIMEMultipart()
-            msg['From'] = current_app.config['MAIL_DEFAULT_SENDER']
-            msg['To'] = recipient
-            msg['Subject'] = subject
-            
-            # Add HTML content
-            msg.attach(MIMEText(html_content, 'html'))
-            
-            # Connect to SMTP server
-            server = smtplib.SMTP(current_app.config['MAIL_SERVER'], current_app.config['MAIL_PORT'])
-            server.starttls()
-            server.login(current_app.config['MAIL_USERNAME'], current_app.config['MAIL_PASSWORD'])
-            
-            # Send email
-            server.send_message(msg)
-            server.quit()
-            
-            # Log the email
-            email_log = EmailLog(
-                recipient=recipient,
-                subject=subject,
-                body=html_content,
-                status='sent'
-            )
-            
-            db.session.add(email_log)
-            db.session.commit()
-            
-            return True
+            with db.session.begin_nested():
+                enqueue_email(recipient, subject, html_content)
         except Exception as e:
-            # Log failed email
-            email_log = EmailLog(
-                recipient=recipient,
-                subject=subject,
-                body=html_content,
-                status='failed',
-                error_message=str(e)
-            )
-            
-            db.session.add(email_log)
-            db.session.commit()
-            
+            current_app.logger.error(f"Failed to queue email to {recipient}: {e}")
             return False
+        db.session.commit()
+        return True
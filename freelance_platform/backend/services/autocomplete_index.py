@@ -0,0 +1,258 @@
+import bisect
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect, select
+from models import db, User, UserRole, Job, Skill, user_skills
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# (model, attribute, suggestion type, role the row must have) feeding suggestions
+TRACKED_ATTRIBUTES = (
+    (Skill, 'name', 'freelancer', None),
+    (User, 'title', 'freelancer', UserRole.FREELANCER),
+    (Job, 'title', 'job', None)
+)
+
+def _normalize(value):
+    return ' '.join(value.lower().split())
+
+def _word_keys(term):
+    """
+    Every suffix of the term that starts on a word boundary, so that
+    'Web Development' is found by both 'web' and 'dev'.
+    """
+    words = _normalize(term).split(' ')
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+class SuggestionIndex:
+    """
+    Weighted suggestions per search type, held as a sorted array of
+    (word-prefix key, term) pairs and answered with a bisect range scan.
+    """
+
+    # Cached answers for repeated prefixes, dropped on every write
+    CACHE_SIZE = 4096
+
+    def __init__(self, weights=None):
+        self.weights = {}
+        self.keys = {}
+        self.cache = {}
+        self.lock = threading.Lock()
+        for search_type, terms in (weights or {}).items():
+            self.weights[search_type] = dict(terms)
+            self.keys[search_type] = sorted(
+                (key, term) for term in self.weights[search_type] for key in _word_keys(term)
+            )
+
+    def suggest(self, search_type, prefix, limit=10):
+        prefix = _normalize(prefix)
+        cache_key = (search_type, prefix, limit)
+        with self.lock:
+            if cache_key in self.cache:
+                return self.cache[cache_key]
+            keys = self.keys.get(search_type, [])
+            weights = self.weights.get(search_type, {})
+            start = bisect.bisect_left(keys, (prefix,))
+            end = bisect.bisect_left(keys, (prefix + '\uffff',), start)
+            matches = {term for key, term in keys[start:end]}
+            suggestions = heapq.nlargest(limit, matches, key=lambda term: (weights[term], term))
+            if len(self.cache) >= self.CACHE_SIZE:
+                self.cache.clear()
+            self.cache[cache_key] = suggestions
+            return suggestions
+
+    def add(self, search_type, term, weight=1):
+        if not term:
+            return
+        with self.lock:
+            self.cache.clear()
+            weights = self.weights.setdefault(search_type, {})
+            keys = self.keys.setdefault(search_type, [])
+            if term not in weights:
+                for key in _word_keys(term):
+                    bisect.insort(keys, (key, term))
+                weights[term] = 0
+            weights[term] += weight
+
+    def remove(self, search_type, term, weight=1):
+        with self.lock:
+            weights = self.weights.get(search_type, {})
+            if term not in weights:
+                return
+            self.cache.clear()
+            weights[term] -= weight
+            if weights[term] <= 0:
+                del weights[term]
+                keys = self.keys[search_type]
+                for key in _word_keys(term):
+                    position = bisect.bisect_left(keys, (key, term))
+                    if position < len(keys) and keys[position] == (key, term):
+                        del keys[position]
+
+    def dumps(self):
+        """
+        Serialize to a compact zlib-compressed JSON snapshot
+        """
+        with self.lock:
+            payload = {
+                'version': SNAPSHOT_VERSION,
+                'weights': {search_type: list(terms.items()) for search_type, terms in self.weights.items()}
+            }
+        return zlib.compress(json.dumps(payload, separators=(',', ':')).encode())
+
+    @classmethod
+    def loads(cls, data):
+        payload = json.loads(zlib.decompress(data))
+        if payload.get('version') != SNAPSHOT_VERSION:
+            raise ValueError('Unsupported autocomplete snapshot version')
+        return cls(payload['weights'])
+
+    @classmethod
+    def build(cls):
+        """
+        Build the index from the database with one grouped query per source
+        """
+        weights = {}
+        for model, attribute, search_type, role in TRACKED_ATTRIBUTES:
+            column = getattr(model, attribute)
+            if model is Skill:
+                statement = select(Skill.name, func.count(user_skills.c.user_id)).outerjoin(
+                    user_skills, user_skills.c.skill_id == Skill.id
+                ).group_by(Skill.name)
+            else:
+                statement = select(column, func.count(model.id)).where(column.isnot(None)).group_by(column)
+                if role is not None:
+                    statement = statement.where(model.role == role)
+            terms = weights.setdefault(search_type, {})
+            for term, count in db.session.execute(statement):
+                if term:
+                    terms[term] = terms.get(term, 0) + max(count, 1)
+        return cls(weights)
+
+class AutocompleteService:
+    """
+    Owns the per-process SuggestionIndex and keeps it in step with the
+    snapshot file that all workers share.
+    """
+
+    def __init__(self, snapshot_path, refresh_seconds):
+        self.snapshot_path = snapshot_path
+        self.refresh_seconds = refresh_seconds
+        self.index = SuggestionIndex()
+        self.loaded_at = 0.0
+        self.snapshot_mtime = 0.0
+        self.refresh_lock = threading.Lock()
+
+    def suggest(self, search_type, prefix, limit=10):
+        self.refresh_if_stale()
+        return self.index.suggest(search_type, prefix, limit)
+
+    def refresh_if_stale(self):
+        if time.time() - self.loaded_at < self.refresh_seconds:
+            return
+        if not self.refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self.refresh()
+        finally:
+            self.refresh_lock.release()
+
+    def refresh(self):
+        """
+        Load the shared snapshot if another worker wrote a fresh one,
+        otherwise rebuild from the database and publish a new snapshot.
+        """
+        try:
+            mtime = os.path.getmtime(self.snapshot_path)
+        except OSError:
+            mtime = 0.0
+
+        if mtime and time.time() - mtime < self.refresh_seconds:
+            if mtime != self.snapshot_mtime:
+                with open(self.snapshot_path, 'rb') as snapshot:
+                    self.index = SuggestionIndex.loads(snapshot.read())
+                self.snapshot_mtime = mtime
+        else:
+            self.index = SuggestionIndex.build()
+            self.write_snapshot()
+        self.loaded_at = time.time()
+
+    def write_snapshot(self):
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as snapshot:
+            snapshot.write(self.index.dumps())
+        os.replace(temp_path, self.snapshot_path)
+        self.snapshot_mtime = os.path.getmtime(self.snapshot_path)
+
+def init_app(app):
+    """
+    Create the autocomplete service and build (or load) its index at startup
+    """
+    service = AutocompleteService(
+        app.config.get('AUTOCOMPLETE_SNAPSHOT_PATH'),
+        app.config.get('AUTOCOMPLETE_REFRESH_SECONDS', 600)
+    )
+    with app.app_context():
+        try:
+            service.refresh()
+        except Exception as e:
+            # Tables may not exist yet; the first request retries
+            logger.warning(f"Autocomplete index not built at startup: {e}")
+    app.extensions['autocomplete'] = service
+
+def get_autocomplete_service():
+    return current_app.extensions['autocomplete']
+
+def _track_previous_value(target, value, oldvalue, initiator):
+    return value
+
+# Load the previous value on assignment so renames can retire the old term
+for _model, _attribute, _search_type, _role in TRACKED_ATTRIBUTES:
+    event.listen(getattr(_model, _attribute), 'set', _track_previous_value, active_history=True, retval=True)
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_suggestion_changes(session, flush_context):
+    """
+    Record suggestion terms added/removed by this flush; they are applied to
+    the in-process index only once the transaction commits.
+    """
+    pending = session.info.setdefault('autocomplete_changes', [])
+    for obj in session.new | session.dirty | session.deleted:
+        for model, attribute, search_type, role in TRACKED_ATTRIBUTES:
+            if not isinstance(obj, model):
+                continue
+            if role is not None and obj.role != role:
+                continue
+            if obj in session.deleted:
+                pending.append((search_type, None, getattr(obj, attribute)))
+                continue
+            history = inspect(obj).attrs[attribute].history
+            for old_term in history.deleted or ():
+                pending.append((search_type, None, old_term))
+            for new_term in history.added or ():
+                pending.append((search_type, new_term, None))
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_suggestion_changes(session):
+    pending = session.info.pop('autocomplete_changes', None)
+    if not pending or not has_app_context() or 'autocomplete' not in current_app.extensions:
+        return
+    index = current_app.extensions['autocomplete'].index
+    for search_type, added, removed in pending:
+        if removed:
+            index.remove(search_type, removed)
+        if added:
+            index.add(search_type, added)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_suggestion_changes(session):
+    session.info.pop('autocomplete_changes', None)
@@ -0,0 +1,53 @@
+import logging
+import signal
+import threading
+from services.admin_broadcast_service import AdminBroadcastWorker
+from services.deposit_initiation import DepositInitiationWorker
+from services.email_outbox import EmailOutboxWorker
+from services.event_stream import EventPruner
+from services.job_match_fanout import JobMatchFanOutWorker
+from services.payment_reconciler import create_reconciler
+from services.payout_batcher import PayoutBatcher
+
+logger = logging.getLogger(__name__)
+
+# Background workers run by `flask run-workers`: name -> factory(app) returning
+# an object with run() and stop(), or None when the worker is not needed
+WORKERS = {
+    'email-outbox': EmailOutboxWorker,
+    'job-matches': JobMatchFanOutWorker,
+    'admin-broadcasts': AdminBroadcastWorker,
+    'payment-reconciler': create_reconciler,
+    'deposit-initiation': DepositInitiationWorker,
+    'payouts': PayoutBatcher,
+    'event-pruner': EventPruner,
+}
+
+def run_workers(app, names=None):
+    """
+    Run the named workers (all by default), one thread each, until SIGTERM or SIGINT
+    """
+    running = []
+    for name in names or WORKERS:
+        worker = WORKERS[name](app)
+        if worker is None:
+            logger.info(f"Background worker '{name}' disabled")
+            continue
+        thread = threading.Thread(target=worker.run, name=name, daemon=True)
+        thread.start()
+        running.append((worker, thread))
+        logger.info(f"Background worker '{name}' started")
+
+    stopping = threading.Event()
+
+    def _stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    stopping.wait()
+
+    for worker, thread in running:
+        worker.stop()
+    for worker, thread in running:
+        thread.join(timeout=30)
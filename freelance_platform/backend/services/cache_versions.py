@@ -0,0 +1,75 @@
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, CacheVersion
+
+# Per-process copy of each version: key -> (version, checked_at)
+_local_versions = {}
+_lock = threading.Lock()
+
+def get_version(key):
+    """
+    Get the current version of a cache key. The database row is re-read at
+    most every CACHE_VERSION_CHECK_SECONDS; bumps committed by this process
+    are seen immediately.
+    """
+    max_age = current_app.config.get('CACHE_VERSION_CHECK_SECONDS', 5)
+    with _lock:
+        cached = _local_versions.get(key)
+    if cached and time.time() - cached[1] < max_age:
+        return cached[0]
+
+    version = db.session.execute(
+        select(CacheVersion.version).where(CacheVersion.key == key)
+    ).scalar() or 0
+    with _lock:
+        _local_versions[key] = (version, time.time())
+    return version
+
+def bump_version(connection, key):
+    """
+    Atomically increment a cache key's version on the given connection, so the
+    bump commits or rolls back with the write that caused it.
+    """
+    values = {'key': key, 'version': 1, 'updated_at': datetime.utcnow()}
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+    if dialect:
+        statement = dialect.insert(CacheVersion).values(**values)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[CacheVersion.key],
+            set_={'version': CacheVersion.version + 1, 'updated_at': values['updated_at']}
+        ))
+        return
+
+    result = connection.execute(
+        update(CacheVersion).where(CacheVersion.key == key).values(
+            version=CacheVersion.version + 1, updated_at=values['updated_at'])
+    )
+    if result.rowcount == 0:
+        connection.execute(CacheVersion.__table__.insert().values(**values))
+
+def bump_on_commit(session, key):
+    """
+    Bump `key` in the session's transaction and drop this process's copy once
+    the transaction commits. Safe to call from flush events.
+    """
+    bumped = session.info.setdefault('bumped_cache_versions', set())
+    if key in bumped:
+        return
+    bumped.add(key)
+    bump_version(session.connection(), key)
+
+@event.listens_for(db.session, 'after_commit')
+def _forget_bumped_versions(session):
+    keys = session.info.pop('bumped_cache_versions', None)
+    if keys:
+        with _lock:
+            for key in keys:
+                _local_versions.pop(key, None)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_bumped_versions(session):
+    session.info.pop('bumped_cache_versions', None)
@@ -0,0 +1,197 @@
+import logging
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+import requests
+from flask import current_app
+from sqlalchemy import and_, select, update
+from models import db, DepositInitiation, TransactionStatus
+from services.orange_money_service import OrangeMoneyService
+from services.provider_client import ProviderUnavailable
+from services import event_stream
+
+logger = logging.getLogger(__name__)
+
+# Retry delay after a failure that never reached the provider, doubled per attempt (seconds)
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 300
+
+# How long a claimed initiation is reserved for the worker submitting it
+CLAIM_SECONDS = 120
+
+def queue_deposit(transaction, phone_number, description):
+    """
+    Record a deposit to submit to the provider, in the caller's transaction.
+    Call dispatch() with its id after committing.
+    """
+    initiation = DepositInitiation(transaction=transaction, phone_number=phone_number, description=description)
+    db.session.add(initiation)
+    return initiation
+
+def dispatch(initiation_id):
+    """
+    Submit a committed initiation from a background thread. The worker
+    (`flask run-workers` or `flask initiate-deposits`) picks it up if this
+    thread dies before claiming it, and retries failures that never reached
+    the provider.
+    """
+    app = current_app._get_current_object()
+    thread = threading.Thread(
+        target=DepositInitiationWorker(app).run_once,
+        args=([initiation_id],),
+        name=f'deposit-initiation-{initiation_id}',
+        daemon=True
+    )
+    thread.start()
+
+class DepositInitiationWorker:
+    """
+    Submits queued deposits to Orange Money outside the request. Failures that
+    never reached the provider (open circuit, unreachable, no token) are
+    retried with backoff; a request the provider may have received is marked
+    'unconfirmed' and never resubmitted, so a client is not charged twice.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.provider = OrangeMoneyService()
+        self.batch_size = app.config.get('DEPOSIT_INITIATION_BATCH_SIZE', 20)
+        self.max_attempts = app.config.get('DEPOSIT_INITIATION_MAX_ATTEMPTS', 3)
+        self.poll_seconds = app.config.get('DEPOSIT_INITIATION_POLL_SECONDS', 5)
+        self.stopping = threading.Event()
+
+    def claim(self, ids=None):
+        """
+        Reserve queued initiations (the given ids, or the next due batch) with
+        a conditional UPDATE, so each is submitted by one worker only.
+        """
+        now = datetime.utcnow()
+        due = and_(DepositInitiation.status == 'queued', DepositInitiation.next_attempt_at <= now)
+        if ids is None:
+            ids = db.session.scalars(
+                select(DepositInitiation.id).where(due).order_by(DepositInitiation.id).limit(self.batch_size)
+            ).all()
+        if not ids:
+            db.session.rollback()
+            return []
+
+        token = str(uuid.uuid4())
+        db.session.execute(
+            update(DepositInitiation)
+            .where(DepositInitiation.id.in_(ids), due)
+            .values(status='submitting', claim_token=token, claimed_until=now + timedelta(seconds=CLAIM_SECONDS)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        return DepositInitiation.query.filter_by(
+            claim_token=token, status='submitting'
+        ).order_by(DepositInitiation.id).all()
+
+    def expire_abandoned(self):
+        """
+        A worker that died mid-submit may or may not have reached the provider;
+        leave those deposits to the provider callback instead of resubmitting.
+        """
+        db.session.execute(
+            update(DepositInitiation)
+            .where(DepositInitiation.status == 'submitting', DepositInitiation.claimed_until < datetime.utcnow())
+            .values(status='unconfirmed', last_error='Worker stopped during submission'),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+
+    def retry_delay(self, attempts):
+        delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    def fail(self, initiation, error):
+        initiation.status = 'failed'
+        initiation.last_error = str(error)
+        initiation.transaction.status = TransactionStatus.FAILED
+
+    def submit(self, initiation):
+        transaction = initiation.transaction
+        initiation.attempts += 1
+        initiation.claim_token = None
+        try:
+            response = self.provider.initiate_payment(
+                amount=transaction.amount,
+                phone_number=initiation.phone_number,
+                transaction_reference=transaction.transaction_reference,
+                description=initiation.description
+            )
+        except (ProviderUnavailable, requests.HTTPError) as e:
+            # The payment request was never sent (circuit open, provider unreachable or no token)
+            if initiation.attempts >= self.max_attempts:
+                self.fail(initiation, e)
+            else:
+                initiation.status = 'queued'
+                initiation.last_error = str(e)
+                initiation.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(initiation.attempts))
+        except Exception as e:
+            # The provider may have received the request; the callback settles it
+            logger.warning(f"Deposit {transaction.transaction_reference} unconfirmed: {e}")
+            initiation.status = 'unconfirmed'
+            initiation.last_error = str(e)
+        else:
+            if response.get('status') == 'success':
+                transaction.orange_money_transaction_id = response['transaction_id']
+                initiation.status = 'submitted'
+                initiation.submitted_at = datetime.utcnow()
+                initiation.last_error = None
+            else:
+                self.fail(initiation, response.get('message', 'Payment initiation failed'))
+
+        event_stream.publish_on_commit(transaction.payer_id, 'deposit', {
+            'transaction_id': transaction.id,
+            'initiation_status': initiation.status,
+            'transaction_status': transaction.status.value
+        })
+        db.session.commit()
+
+    def run_once(self, ids=None):
+        """
+        Submit claimed initiations. Returns the number processed.
+        """
+        with self.app.app_context():
+            if ids is None:
+                self.expire_abandoned()
+            initiations = self.claim(ids)
+            for initiation in initiations:
+                try:
+                    self.submit(initiation)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception(f"Deposit initiation {initiation.id} failed: {e}")
+            return len(initiations)
+
+    def run(self):
+        """
+        Poll for queued initiations until stop() is called
+        """
+        logger.info("Deposit initiation worker started")
+        while not self.stopping.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.exception(f"Deposit initiation worker error: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                self.stopping.wait(self.poll_seconds)
+
+    def stop(self):
+        self.stopping.set()
+
+def init_app(app):
+    """
+    Start the initiation worker in a background thread when
+    DEPOSIT_INITIATION_WORKER_THREAD is set; otherwise run
+    `flask run-workers` (or `flask initiate-deposits`) as a separate process.
+    """
+    if not app.config.get('DEPOSIT_INITIATION_WORKER_THREAD'):
+        return
+    worker = DepositInitiationWorker(app)
+    thread = threading.Thread(target=worker.run, name='deposit-initiation', daemon=True)
+    thread.start()
+    app.extensions['deposit_initiation_worker'] = worker
@@ -0,0 +1,236 @@
+import logging
+import random
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from sqlalchemy import insert, or_, update
+from models import db, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Retry delay after the first failure, doubled per attempt up to the cap (seconds)
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# How long a claimed batch is reserved before another worker may take it over
+CLAIM_SECONDS = 300
+
+# Close the SMTP session once the outbox has been empty for this long (seconds)
+SMTP_IDLE_CLOSE_SECONDS = 60
+
+def enqueue_email(recipient, subject, html_content):
+    """
+    Add an email to the outbox in the caller's transaction; it is
+    delivered by the outbox worker once that transaction commits.
+    """
+    email = OutboundEmail(recipient=recipient, subject=subject, body=html_content)
+    db.session.add(email)
+    return email
+
+def enqueue_emails(messages):
+    """
+    Add many (recipient, subject, html_content) emails to the outbox with a
+    single INSERT in the caller's transaction.
+    """
+    rows = [
+        {'recipient': recipient, 'subject': subject, 'body': html_content}
+        for recipient, subject, html_content in messages
+    ]
+    if rows:
+        db.session.execute(insert(OutboundEmail), rows)
+    return len(rows)
+
+class SMTPConnection:
+    """
+    One authenticated SMTP session, opened lazily and reused across
+    messages until the server drops it or it has sat idle too long.
+    """
+
+    # Send NOOP before reusing a session idle for longer than this (seconds)
+    IDLE_CHECK_SECONDS = 30
+
+    # Reconnect after this many messages; many servers cap messages per session
+    MAX_MESSAGES = 100
+
+    def __init__(self, config):
+        self.config = config
+        self.server = None
+        self.sent = 0
+        self.last_used = 0.0
+
+    def connect(self):
+        self.close()
+        server = smtplib.SMTP(self.config['MAIL_SERVER'], self.config['MAIL_PORT'],
+                              timeout=self.config.get('MAIL_TIMEOUT', 30))
+        if self.config.get('MAIL_USE_TLS', True):
+            server.starttls()
+        if self.config.get('MAIL_USERNAME'):
+            server.login(self.config['MAIL_USERNAME'], self.config['MAIL_PASSWORD'])
+        self.server = server
+        self.sent = 0
+
+    def is_alive(self):
+        if self.server is None or self.sent >= self.MAX_MESSAGES:
+            return False
+        if time.time() - self.last_used < self.IDLE_CHECK_SECONDS:
+            return True
+        try:
+            return self.server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def send(self, msg):
+        if not self.is_alive():
+            self.connect()
+        try:
+            self.server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed an idle session; retry once on a fresh one
+            self.connect()
+            self.server.send_message(msg)
+        self.sent += 1
+        self.last_used = time.time()
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+        self.server = None
+
+class EmailOutboxWorker:
+    """
+    Delivers queued emails in batches over a pooled SMTP connection,
+    rescheduling failures with exponential backoff.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.connection = SMTPConnection(app.config)
+        self.batch_size = app.config.get('EMAIL_OUTBOX_BATCH_SIZE', 50)
+        self.max_attempts = app.config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+        self.poll_seconds = app.config.get('EMAIL_OUTBOX_POLL_SECONDS', 5)
+        self.stopping = threading.Event()
+
+    def claim_batch(self):
+        """
+        Reserve up to batch_size due emails for this worker. The conditional
+        UPDATE lets several workers poll the same outbox without double sends.
+        """
+        now = datetime.utcnow()
+        due = or_(
+            (OutboundEmail.status == 'pending') & (OutboundEmail.next_attempt_at <= now),
+            (OutboundEmail.status == 'sending') & (OutboundEmail.claimed_until < now)
+        )
+        ids = db.session.scalars(
+            db.select(OutboundEmail.id).where(due).order_by(OutboundEmail.id).limit(self.batch_size)
+        ).all()
+        if not ids:
+            db.session.rollback()
+            return []
+
+        token = str(uuid.uuid4())
+        db.session.execute(
+            update(OutboundEmail)
+            .where(OutboundEmail.id.in_(ids), due)
+            .values(status='sending', claim_token=token, claimed_until=now + timedelta(seconds=CLAIM_SECONDS)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        return OutboundEmail.query.filter_by(claim_token=token, status='sending').order_by(OutboundEmail.id).all()
+
+    def build_message(self, email):
+        msg = MIMEMultipart()
+        msg['From'] = self.app.config['MAIL_DEFAULT_SENDER']
+        msg['To'] = email.recipient
+        msg['Subject'] = email.subject
+        msg.attach(MIMEText(email.body, 'html'))
+        return msg
+
+    def retry_delay(self, attempts):
+        delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    def record_failure(self, email, error, permanent=False):
+        email.attempts += 1
+        email.last_error = str(error)
+        email.claim_token = None
+        if permanent or email.attempts >= self.max_attempts:
+            email.status = 'failed'
+            logger.error(f"Giving up on email {email.id} to {email.recipient}: {error}")
+        else:
+            email.status = 'pending'
+            email.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(email.attempts))
+            logger.warning(f"Email {email.id} to {email.recipient} failed, retrying: {error}")
+
+    def send_batch(self, emails):
+        for email in emails:
+            try:
+                self.connection.send(self.build_message(email))
+            except smtplib.SMTPRecipientsRefused as e:
+                codes = [code for code, _ in e.recipients.values()]
+                self.record_failure(email, e, permanent=all(code >= 500 for code in codes))
+            except smtplib.SMTPResponseException as e:
+                # 5xx replies are permanent; 4xx are worth retrying
+                self.record_failure(email, e, permanent=500 <= e.smtp_code < 600)
+                self.connection.close()
+            except Exception as e:
+                self.record_failure(email, e)
+                self.connection.close()
+            else:
+                email.attempts += 1
+                email.status = 'sent'
+                email.sent_at = datetime.utcnow()
+                email.claim_token = None
+                email.last_error = None
+        db.session.commit()
+
+    def run_once(self):
+        """
+        Deliver one batch. Returns the number of emails processed.
+        """
+        with self.app.app_context():
+            emails = self.claim_batch()
+            if emails:
+                self.send_batch(emails)
+            return len(emails)
+
+    def run(self):
+        """
+        Poll the outbox until stop() is called, draining full batches back to back
+        """
+        logger.info("Email outbox worker started")
+        while not self.stopping.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.exception(f"Email outbox worker error: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                if time.time() - self.connection.last_used > SMTP_IDLE_CLOSE_SECONDS:
+                    self.connection.close()
+                self.stopping.wait(self.poll_seconds)
+        self.connection.close()
+
+    def stop(self):
+        self.stopping.set()
+
+def init_app(app):
+    """
+    Start the outbox worker in a background thread when EMAIL_OUTBOX_WORKER_THREAD
+    is set; otherwise run `flask send-emails` as a separate process.
+    """
+    if not app.config.get('EMAIL_OUTBOX_WORKER_THREAD'):
+        return
+    worker = EmailOutboxWorker(app)
+    thread = threading.Thread(target=worker.run, name='email-outbox', daemon=True)
+    thread.start()
+    app.extensions['email_outbox_worker'] = worker
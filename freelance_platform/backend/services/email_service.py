@@ -1,14 +1,23 @@
-import os
+import html
 import logging
-from flask import current_app
+from services.email_outbox import enqueue_email
 
 logger = logging.getLogger(__name__)
 
+def as_html(text):
+    """
+    Wrap a plain-text email body for the outbox, which sends HTML
+    """
+    return f'<div style="white-space: pre-wrap">{html.escape(text.strip())}</div>'
+
 class EmailService:
+    # Emails are queued in the outbox in the caller's transaction and
+    # delivered by the outbox worker once the caller commits
+
     @staticmethod
     def send_welcome_email(user):
         """
-        Sends welcome and profile confirmation email to the user upon registration/profile creation.
+        Queues the welcome and profile confirmation email to the user upon registration/profile creation.
         Includes 30-day free trial confirmation and unique tracking ID.
         """
         subject = "Welcome to FreelancePro SL - Your 30-Day Free Trial Has Started!"
@@ -38,15 +47,22 @@ Best regards,
 The FreelancePro SL Team
         """
         
-        # Log email dispatch
-        logger.info(f"[EMAIL SERVICE] Sending confirmation email to {user.email} (Tracking ID: {tracking_id})")
-        print(f"[CONFIRMATION EMAIL SENT TO {user.email}]\nSubject: {subject}\n{body}\n")
-        return True
+        logger.info(f"[EMAIL SERVICE] Queueing confirmation email to {user.email} (Tracking ID: {tracking_id})")
+        return enqueue_email(user.email, subject, as_html(body))
 
     @staticmethod
     def send_admin_message_email(recipient, subject, message_text):
         """
-        Sends an email notification when Admin sends a direct message to a user.
+        Queues an email notification when Admin sends a direct message to a user.
+        """
+        email_subject, body = EmailService.build_admin_message_email(recipient, subject, message_text)
+        logger.info(f"[EMAIL SERVICE] Queueing Admin direct message email to {recipient.email}")
+        return enqueue_email(recipient.email, email_subject, body)
+
+    @staticmethod
+    def build_admin_message_email(recipient, subject, message_text):
+        """
+        Returns (subject, HTML body) of the admin message email for a recipient.
         """
         email_subject = f"[FreelancePro SL Admin Notification] {subject}"
         body = f"""
@@ -65,6 +81,4 @@ Please log into your dashboard to view or respond.
 Best regards,
 FreelancePro SL Admin Team
         """
-        logger.info(f"[EMAIL SERVICE] Sending Admin direct message email to {recipient.email}")
-        print(f"[ADMIN MESSAGE EMAIL SENT TO {recipient.email}]\nSubject: {email_subject}\n{body}\n")
-        return True
+        return email_subject, as_html(body)
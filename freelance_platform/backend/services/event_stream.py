@@ -0,0 +1,184 @@
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import delete, event, func, insert, select
+from models import db, UserEvent
+
+logger = logging.getLogger(__name__)
+
+# Events returned by one poll or stream read
+MAX_EVENTS_PER_READ = 100
+
+# Events are rows in user_events, written in the publishing transaction, so the
+# web workers and `flask run-workers` all publish to and read from one feed.
+# Clients resume from the last event id they saw (their cursor), so nothing
+# published between two polls or stream reconnects is lost.
+
+def latest_event_id(user_id):
+    """
+    Cursor for a client that starts listening now: the user's newest event id
+    """
+    return db.session.scalar(select(func.max(UserEvent.id)).where(UserEvent.user_id == user_id)) or 0
+
+def fetch_events(user_id, since, limit=MAX_EVENTS_PER_READ):
+    """
+    The user's events after cursor `since`, oldest first, as a list of dicts
+    """
+    events = db.session.scalars(
+        select(UserEvent)
+        .where(UserEvent.user_id == user_id, UserEvent.id > since)
+        .order_by(UserEvent.id)
+        .limit(limit)
+    ).all()
+    return [user_event.to_dict() for user_event in events]
+
+def wait(user_id, since, timeout, poll_seconds=1):
+    """
+    Long-poll: check for events after `since` every poll_seconds for up to
+    `timeout` seconds, returning as soon as there are any. Only for gevent
+    workers; the session is closed between checks so no connection is held.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        events = fetch_events(user_id, since)
+        db.session.close()
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        time.sleep(min(poll_seconds, remaining))
+
+def stream(app, user_id, since, heartbeat_seconds=15, max_seconds=90, poll_seconds=1):
+    """
+    Yield Server-Sent Events for `user_id` after cursor `since` until the
+    client disconnects or max_seconds pass (the browser's EventSource then
+    reconnects with Last-Event-ID). Sends a comment line every
+    heartbeat_seconds without events to keep proxies open.
+    """
+    yield "retry: 3000\n\n"
+    deadline = time.monotonic() + max_seconds
+    last_sent = time.monotonic()
+    while True:
+        # A fresh app context per read, so no session is held between reads
+        with app.app_context():
+            events = fetch_events(user_id, since)
+        for user_event in events:
+            since = user_event['id']
+            yield f"id: {since}\nevent: {user_event['event']}\ndata: {json.dumps(user_event['data'])}\n\n"
+
+        now = time.monotonic()
+        if events:
+            last_sent = now
+        elif now - last_sent >= heartbeat_seconds:
+            yield ": keepalive\n\n"
+            last_sent = now
+        if now >= deadline:
+            break
+        if len(events) < MAX_EVENTS_PER_READ:
+            time.sleep(min(poll_seconds, deadline - now))
+
+def streaming_available(config):
+    """
+    Whether this process can hold event streams and long-polls open.
+    EVENT_STREAM_ENABLED is 'true', 'false' or 'auto': only when gevent has
+    patched the process (Gunicorn gevent workers); a sync worker would be tied
+    up by every open request.
+    """
+    enabled = config.get('EVENT_STREAM_ENABLED', 'auto')
+    if enabled != 'auto':
+        return enabled == 'true'
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('socket')
+
+def _ticket_serializer(config):
+    return URLSafeTimedSerializer(config['SECRET_KEY'], salt='event-stream-ticket')
+
+def issue_ticket(config, user_id):
+    """
+    Short-lived ticket that only opens an event stream for `user_id`. EventSource
+    can't send headers, so it goes in the URL instead of the access token.
+    """
+    return _ticket_serializer(config).dumps({'user_id': user_id})
+
+def verify_ticket(config, ticket):
+    """
+    User id of a valid, unexpired ticket, or None
+    """
+    try:
+        data = _ticket_serializer(config).loads(ticket, max_age=config.get('EVENT_STREAM_TICKET_SECONDS', 60))
+    except BadSignature:
+        return None
+    return data.get('user_id')
+
+def publish_on_commit(user_id, event_type, data, session=None):
+    """
+    Publish with the current transaction: the event is written when it
+    commits (dropped on rollback)
+    """
+    session = session or db.session()
+    session.info.setdefault('pending_events', []).append(
+        {'user_id': user_id, 'event_type': event_type, 'data': data}
+    )
+
+def flush_events(session=None):
+    """
+    Write queued events now (executemany) instead of at commit
+    """
+    session = session or db.session()
+    pending = session.info.pop('pending_events', None)
+    if pending:
+        session.execute(insert(UserEvent), pending)
+    return len(pending or ())
+
+def prune_events(max_age_seconds):
+    """
+    Delete events older than max_age_seconds. Returns the number deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    deleted = db.session.execute(delete(UserEvent).where(UserEvent.created_at < cutoff)).rowcount
+    db.session.commit()
+    return deleted
+
+class EventPruner:
+    """
+    Keeps user_events to EVENT_STREAM_RETENTION_SECONDS; a client away for
+    longer reloads its state rather than replaying events
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.retention_seconds = app.config.get('EVENT_STREAM_RETENTION_SECONDS', 86400)
+        self.poll_seconds = app.config.get('EVENT_STREAM_PRUNE_SECONDS', 300)
+        self.stopping = threading.Event()
+
+    def run_once(self):
+        """
+        Prune once. Returns the number of events deleted.
+        """
+        with self.app.app_context():
+            return prune_events(self.retention_seconds)
+
+    def run(self):
+        logger.info("Event pruner started")
+        while not self.stopping.is_set():
+            try:
+                deleted = self.run_once()
+                if deleted:
+                    logger.info(f"Pruned {deleted} user events")
+            except Exception as e:
+                logger.exception(f"Event pruner error: {e}")
+            self.stopping.wait(self.poll_seconds)
+
+    def stop(self):
+        self.stopping.set()
+
+@event.listens_for(db.session, 'before_commit')
+def _write_pending_events(session):
+    flush_events(session)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending_events(session):
+    session.info.pop('pending_events', None)
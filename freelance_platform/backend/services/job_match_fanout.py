@@ -0,0 +1,208 @@
+import logging
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_, select, update
+from models import db, Job, JobMatchFanOut
+
+logger = logging.getLogger(__name__)
+
+# Retry delay after a failed page, doubled per attempt up to the cap (seconds)
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 1800
+
+# How long a claimed fan-out is reserved; extended after every page, so a fan-out
+# whose worker died is taken over (and resumed) once this has passed
+CLAIM_SECONDS = 300
+
+def queue_job_match(job_id, skill_ids):
+    """
+    Record a job-match fan-out in the caller's transaction.
+    Call dispatch() with its id after committing.
+    """
+    fanout = JobMatchFanOut(job_id=job_id, skill_ids=list(skill_ids))
+    db.session.add(fanout)
+    return fanout
+
+def dispatch(fanout_id):
+    """
+    Run a committed fan-out from a background thread. The worker
+    (`flask notify-job-matches`) resumes it if this thread does not finish.
+    """
+    app = current_app._get_current_object()
+    thread = threading.Thread(
+        target=JobMatchFanOutWorker(app).run_once,
+        args=([fanout_id],),
+        name=f'job-match-{fanout_id}',
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+class JobMatchFanOutWorker:
+    """
+    Notifies matching freelancers for queued job-match fan-outs. Each page of
+    notifications and emails is committed together with the fan-out's
+    progress, so a resumed fan-out neither skips nor repeats a freelancer.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.batch_size = app.config.get('JOB_MATCH_BATCH_SIZE', 5)
+        self.max_attempts = app.config.get('JOB_MATCH_MAX_ATTEMPTS', 5)
+        self.poll_seconds = app.config.get('JOB_MATCH_POLL_SECONDS', 5)
+        self.stopping = threading.Event()
+
+    def claim(self, ids=None):
+        """
+        Reserve due fan-outs (the given ids, or the next batch), including
+        running ones whose claim has expired. Returns (token, ids).
+        """
+        now = datetime.utcnow()
+        due = or_(
+            and_(JobMatchFanOut.status == 'queued', JobMatchFanOut.next_attempt_at <= now),
+            and_(JobMatchFanOut.status == 'running', JobMatchFanOut.claimed_until < now)
+        )
+        if ids is None:
+            ids = db.session.scalars(
+                select(JobMatchFanOut.id).where(due).order_by(JobMatchFanOut.id).limit(self.batch_size)
+            ).all()
+        if not ids:
+            db.session.rollback()
+            return None, []
+
+        token = str(uuid.uuid4())
+        db.session.execute(
+            update(JobMatchFanOut)
+            .where(JobMatchFanOut.id.in_(ids), due)
+            .values(status='running', claim_token=token, claimed_until=now + timedelta(seconds=CLAIM_SECONDS)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        return token, db.session.scalars(
+            select(JobMatchFanOut.id).where(JobMatchFanOut.claim_token == token).order_by(JobMatchFanOut.id)
+        ).all()
+
+    def _update_claimed(self, fanout_id, token, **values):
+        """
+        Update a fan-out only while this worker still holds its claim
+        """
+        result = db.session.execute(
+            update(JobMatchFanOut)
+            .where(JobMatchFanOut.id == fanout_id, JobMatchFanOut.claim_token == token)
+            .values(**values),
+            execution_options={'synchronize_session': False}
+        )
+        return result.rowcount == 1
+
+    def retry_delay(self, attempts):
+        delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    def record_failure(self, fanout_id, token, error):
+        fanout = db.session.get(JobMatchFanOut, fanout_id)
+        attempts = fanout.attempts + 1
+        if attempts >= self.max_attempts:
+            values = {'status': 'failed', 'finished_at': datetime.utcnow()}
+            logger.error(f"Giving up on job match fan-out {fanout_id}: {error}")
+        else:
+            values = {
+                'status': 'queued',
+                'next_attempt_at': datetime.utcnow() + timedelta(seconds=self.retry_delay(attempts))
+            }
+            logger.warning(f"Job match fan-out {fanout_id} failed, retrying: {error}")
+        self._update_claimed(fanout_id, token, attempts=attempts, last_error=str(error), claim_token=None, **values)
+        db.session.commit()
+
+    def process(self, fanout_id, token):
+        """
+        Notify the remaining matching freelancers, starting after last_user_id
+        """
+        # Imported here: notification_service queues fan-outs through this module
+        from services.notification_service import EmailService
+
+        fanout = db.session.get(JobMatchFanOut, fanout_id)
+        skill_ids = fanout.skill_ids
+        last_id = fanout.last_user_id
+        job = db.session.get(Job, fanout.job_id)
+        if job is None:
+            self._update_claimed(fanout_id, token, status='failed', last_error='Job not found',
+                                 claim_token=None, finished_at=datetime.utcnow())
+            db.session.commit()
+            return
+        job_id = job.id
+        content = EmailService.job_match_content(job)
+
+        while not self.stopping.is_set():
+            freelancer_ids = EmailService.find_matching_freelancer_ids(skill_ids, after_id=last_id)
+            if not freelancer_ids:
+                self._update_claimed(fanout_id, token, status='completed', claim_token=None,
+                                     finished_at=datetime.utcnow())
+                db.session.commit()
+                logger.info(f"Job match fan-out for job {job_id} completed")
+                return
+
+            notified = EmailService.notify_job_match_page(job_id, content, freelancer_ids)
+            if not self._update_claimed(
+                fanout_id, token,
+                last_user_id=freelancer_ids[-1],
+                notified=JobMatchFanOut.notified + notified,
+                claimed_until=datetime.utcnow() + timedelta(seconds=CLAIM_SECONDS)
+            ):
+                # Another worker took the fan-out over; it sends this page instead
+                db.session.rollback()
+                logger.warning(f"Job match fan-out {fanout_id} was claimed by another worker")
+                return
+            db.session.commit()
+            last_id = freelancer_ids[-1]
+            # Drop the page from the identity map before loading the next one
+            db.session.expunge_all()
+
+        # Stopping: hand the rest back to the queue
+        self._update_claimed(fanout_id, token, status='queued', claim_token=None)
+        db.session.commit()
+
+    def run_once(self, ids=None):
+        """
+        Process claimed fan-outs. Returns the number processed.
+        """
+        with self.app.app_context():
+            token, fanout_ids = self.claim(ids)
+            for fanout_id in fanout_ids:
+                try:
+                    self.process(fanout_id, token)
+                except Exception as e:
+                    db.session.rollback()
+                    self.record_failure(fanout_id, token, e)
+            return len(fanout_ids)
+
+    def run(self):
+        """
+        Poll for queued fan-outs until stop() is called
+        """
+        logger.info("Job match fan-out worker started")
+        while not self.stopping.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.exception(f"Job match fan-out worker error: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                self.stopping.wait(self.poll_seconds)
+
+    def stop(self):
+        self.stopping.set()
+
+def init_app(app):
+    """
+    Start the fan-out worker in a background thread when JOB_MATCH_WORKER_THREAD
+    is set; otherwise run `flask notify-job-matches` (or `flask run-workers`).
+    """
+    if not app.config.get('JOB_MATCH_WORKER_THREAD'):
+        return
+    worker = JobMatchFanOutWorker(app)
+    thread = threading.Thread(target=worker.run, name='job-match-fanout', daemon=True)
+    thread.start()
+    app.extensions['job_match_worker'] = worker
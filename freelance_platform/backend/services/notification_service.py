@@ -1,9 +1,119 @@
 from flask import current_app
 from datetime import datetime
-from models import db, Notification, EmailLog, User, NotificationType
-from services.auth_service import AuthService
+from sqlalchemy import case, event, func, insert, select, update
+from sqlalchemy.orm import load_only
+import logging
+from collections import Counter, defaultdict
+from models import db, Notification, OutboundEmail, User, UserRole, NotificationType, user_skills
+from services.email_outbox import enqueue_email, enqueue_emails
+from services import event_stream, job_match_fanout
+
+logger = logging.getLogger(__name__)
+
+# Matching freelancers handled per page (one notification INSERT and one email INSERT each)
+JOB_MATCH_PAGE_SIZE = 500
+
+def _pending_notifications(session):
+    return session.info.setdefault('pending_notifications', [])
 
 class NotificationService:
+    @staticmethod
+    def add_notification(user_id, notification_type, message, reference_id=None, reference_type=None):
+        """
+        Queue a notification in the current unit of work. Queued notifications
+        are written with one INSERT when the caller commits.
+        """
+        _pending_notifications(db.session()).append({
+            'user_id': user_id,
+            'type': notification_type,
+            'message': message,
+            'reference_id': reference_id,
+            'reference_type': reference_type
+        })
+    
+    @staticmethod
+    def emit_many(user_ids, notification_type, message, reference_id=None, reference_type=None, commit=True):
+        """
+        Send the same notification to many users with a single INSERT
+        """
+        for user_id in user_ids:
+            NotificationService.add_notification(user_id, notification_type, message, reference_id, reference_type)
+        
+        if not commit:
+            return {'success': True, 'message': 'Notifications queued', 'count': len(user_ids)}
+        
+        try:
+            db.session.commit()
+            return {'success': True, 'message': 'Notifications created successfully', 'count': len(user_ids)}
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'message': f'Error creating notifications: {str(e)}'}
+    
+    @staticmethod
+    def flush_notifications(session=None):
+        """
+        Write queued notifications now (executemany) instead of at commit
+        """
+        session = session or db.session()
+        pending = session.info.pop('pending_notifications', None)
+        if pending:
+            session.execute(insert(Notification), pending)
+            NotificationService.adjust_unread_counts(
+                Counter(row['user_id'] for row in pending), session=session
+            )
+            # Push to the users' event streams with the same transaction
+            for row in pending:
+                event_stream.publish_on_commit(row['user_id'], 'notification', {
+                    'type': row['type'].value,
+                    'message': row['message'],
+                    'reference_id': row['reference_id'],
+                    'reference_type': row['reference_type']
+                }, session=session)
+            event_stream.flush_events(session)
+        return len(pending or ())
+    
+    @staticmethod
+    def adjust_unread_counts(deltas, session=None):
+        """
+        Apply {user_id: delta} to the users' unread notification counters,
+        one UPDATE per distinct delta, never going below zero
+        """
+        session = session or db.session()
+        users_by_delta = defaultdict(list)
+        for user_id, delta in deltas.items():
+            if delta:
+                users_by_delta[delta].append(user_id)
+        
+        for delta, user_ids in users_by_delta.items():
+            count = User.unread_notifications + delta
+            session.execute(
+                update(User).where(User.id.in_(user_ids))
+                .values(unread_notifications=case((count > 0, count), else_=0))
+                .execution_options(synchronize_session=False)
+            )
+    
+    @staticmethod
+    def get_unread_count(user_id):
+        """
+        Get the user's unread notification count from the counter on users
+        """
+        count = db.session.scalar(select(User.unread_notifications).where(User.id == user_id))
+        return count or 0
+    
+    @staticmethod
+    def recompute_unread_counts():
+        """
+        Rebuild every unread counter from the notifications table (repairs drift)
+        """
+        db.session.execute(
+            update(User).values(
+                unread_notifications=select(func.count(Notification.id)).where(
+                    Notification.user_id == User.id, Notification.is_read == False
+                ).scalar_subquery()
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    
     @staticmethod
     def create_notification(user_id, notification_type, message, reference_id=None, reference_type=None):
         """
@@ -19,6 +129,9 @@ class NotificationService:
             )
             
             db.session.add(notification)
+            NotificationService.adjust_unread_counts({user_id: 1})
+            db.session.flush()
+            event_stream.publish_on_commit(user_id, 'notification', notification.to_dict())
             db.session.commit()
             
             return {
@@ -59,8 +172,8 @@ class NotificationService:
         
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        # Count unread notifications
-        unread_count = Notification.query.filter_by(user_id=user_id, is_read=False).count()
+        # Unread count comes from the counter on users, not a COUNT over notifications
+        unread_count = NotificationService.get_unread_count(user_id)
         
         results = {
             'notifications': [notification.to_dict() for notification in pagination.items],
@@ -83,8 +196,13 @@ class NotificationService:
         if not notification:
             return {'success': False, 'message': 'Notification not found'}
         
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
+        # Conditional update so a repeated or concurrent request only decrements once
+        updated = Notification.query.filter_by(id=notification.id, is_read=False).update({
+            'is_read': True,
+            'read_at': datetime.utcnow()
+        }, synchronize_session='fetch')
+        if updated:
+            NotificationService.adjust_unread_counts({user_id: -1})
         
         db.session.commit()
         
@@ -101,6 +219,10 @@ class NotificationService:
                 'is_read': True,
                 'read_at': datetime.utcnow()
             })
+            db.session.execute(
+                update(User).where(User.id == user_id).values(unread_notifications=0)
+                .execution_options(synchronize_session=False)
+            )
             
             db.session.commit()
             
@@ -119,12 +241,37 @@ class NotificationService:
         if not notification:
             return {'success': False, 'message': 'Notification not found'}
         
+        if not notification.is_read:
+            NotificationService.adjust_unread_counts({user_id: -1})
         db.session.delete(notification)
         db.session.commit()
         
         return {'success': True, 'message': 'Notification deleted successfully'}
 
+@event.listens_for(db.session, 'before_commit')
+def _write_pending_notifications(session):
+    NotificationService.flush_notifications(session)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending_notifications(session):
+    session.info.pop('pending_notifications', None)
+
 class EmailService:
+    # Every sender queues its notifications and emails in the caller's session
+    # and commits them (with any pending changes of the caller) before returning
+    @staticmethod
+    def _commit_notifications(description):
+        """
+        Commit queued notifications and emails; returns False if that failed
+        """
+        try:
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to send {description}: {e}")
+            return False
+    
     @staticmethod
     def send_welcome_email(user):
         """
@@ -145,61 +292,107 @@ class EmailService:
         <p>Thank you,<br>The FreelancePro SL Team</p>
         """
         
+        # Create notification; it is committed together with the queued email
+        NotificationService.add_notification(
+            user.id,
+            NotificationType.WELCOME,
+            "Welcome to FreelancePro SL! We're excited to have you join our community."
+        )
+        
         # Send email
-        sent = AuthService.send_email(user.email, email_subject, email_body)
-        
-        if sent:
-            # Create notification
-            NotificationService.create_notification(
-                user.id,
-                NotificationType.WELCOME,
-                "Welcome to FreelancePro SL! We're excited to have you join our community."
-            )
+        enqueue_email(user.email, email_subject, email_body)
         
-        return sent
+        return EmailService._commit_notifications(f"welcome notification for user {user.id}")
     
     @staticmethod
     def send_job_posted_notification(job):
         """
-        Send notification to relevant freelancers when a new job is posted
+        Notify the freelancers whose skills match a new job. The fan-out is
+        recorded and committed with the caller's pending changes (the job
+        itself), then run from a background thread (resumed by the job match
+        worker if interrupted), so posting a job never waits on it.
         """
-        # Find freelancers with matching skills
         skill_ids = [skill.id for skill in job.skills]
+        fanout = None
+        if skill_ids:
+            db.session.flush()
+            fanout = job_match_fanout.queue_job_match(job.id, skill_ids)
+        
+        if not EmailService._commit_notifications(f"job match fan-out for job {job.title!r}"):
+            return False
+        if fanout is not None:
+            job_match_fanout.dispatch(fanout.id)
+        return True
+    
+    @staticmethod
+    def find_matching_freelancer_ids(skill_ids, after_id=0, limit=JOB_MATCH_PAGE_SIZE):
+        """
+        Get the next page of ids of active freelancers having any of `skill_ids`,
+        in id order. Driven by the (skill_id, user_id) index on user_skills.
+        """
+        statement = select(user_skills.c.user_id).distinct().join(
+            User, User.id == user_skills.c.user_id
+        ).where(
+            user_skills.c.skill_id.in_(skill_ids),
+            user_skills.c.user_id > after_id,
+            User.role == UserRole.FREELANCER,
+            User.is_active_profile
+        ).order_by(user_skills.c.user_id).limit(limit)
+        
+        return db.session.scalars(statement).all()
+    
+    @staticmethod
+    def job_match_content(job):
+        """
+        Read everything a job-match page needs from the job once
+        """
+        return {
+            'message': f"New job match: {job.title}",
+            'email_subject': f"New Job Match on FreelancePro SL: {job.title}",
+            'job_title': job.title,
+            'job_summary': job.description[:200],
+            'job_budget': job.budget,
+            'job_url': f"{current_app.config['FRONTEND_URL']}/#/jobs/{job.id}"
+        }
+    
+    @staticmethod
+    def notify_job_match_page(job_id, content, freelancer_ids):
+        """
+        Notify one page of matching freelancers in the caller's transaction: one
+        bulk INSERT of notifications, one bulk INSERT into the email outbox.
+        Returns the number of freelancers notified.
+        """
+        freelancers = User.query.options(load_only(
+            User.id, User.email, User.username, User.first_name, User.notification_preferences
+        )).filter(User.id.in_(freelancer_ids)).all()
+        
+        NotificationService.emit_many(
+            [freelancer.id for freelancer in freelancers],
+            NotificationType.NEW_JOB_MATCH,
+            content['message'],
+            reference_id=job_id,
+            reference_type='job',
+            commit=False
+        )
         
-        # Get freelancers with matching skills
-        freelancers = User.query.filter(
-            User.role == 'FREELANCER',
-            User.is_active == True,
-            User.email_verified == True,
-            User.skills.any(db.and_(db.in_(skill_ids)))
-        ).limit(50).all()  # Limit to 50 freelancers to avoid excessive emails
-        
-        for freelancer in freelancers:
-            # Create notification
-            NotificationService.create_notification(
-                freelancer.id,
-                NotificationType.NEW_JOB_MATCH,
-                f"New job match: {job.title}",
-                reference_id=job.id,
-                reference_type='job'
-            )
-            
-            # Send email if user has enabled job notifications
-            if freelancer.notification_preferences.get('job_matches', True):
-                email_subject = f"New Job Match on FreelancePro SL: {job.title}"
-                email_body = f"""
+        # Email only users who have job notifications enabled
+        enqueue_emails([(
+            freelancer.email,
+            content['email_subject'],
+            f"""
                 <h2>New Job Matching Your Skills</h2>
                 <p>Hi {freelancer.first_name or freelancer.username},</p>
                 <p>A new job has been posted that matches your skills:</p>
-                <p><strong>{job.title}</strong></p>
-                <p>{job.description[:200]}...</p>
-                <p>Budget: {job.budget} {job.currency}</p>
-                <p><a href="{current_app.config['FRONTEND_URL']}/#/jobs/{job.id}">View Job Details</a></p>
+                <p><strong>{content['job_title']}</strong></p>
+                <p>{content['job_summary']}...</p>
+                <p>Budget: {content['job_budget']}</p>
+                <p><a href="{content['job_url']}">View Job Details</a></p>
                 <p>Don't miss this opportunity! Submit your proposal today.</p>
                 <p>Thank you,<br>The FreelancePro SL Team</p>
                 """
-                
-                AuthService.send_email(freelancer.email, email_subject, email_body)
+        ) for freelancer in freelancers if (freelancer.notification_preferences or {}).get('job_matches', True)])
+        
+        return len(freelancers)
     
     @staticmethod
     def send_proposal_received_notification(proposal):
@@ -211,7 +404,7 @@ class EmailService:
         freelancer = proposal.freelancer
         
         # Create notification for client
-        NotificationService.create_notification(
+        NotificationService.add_notification(
             client.id,
             NotificationType.NEW_PROPOSAL,
             f"New proposal received for: {job.title}",
@@ -226,12 +419,14 @@ class EmailService:
         <p>Hi {client.first_name or client.username},</p>
         <p>You've received a new proposal for your job <strong>"{job.title}"</strong> from {freelancer.first_name} {freelancer.last_name}.</p>
         <p>Freelancer: {freelancer.first_name} {freelancer.last_name}</p>
-        <p>Bid Amount: {proposal.bid_amount} {job.currency}</p>
+        <p>Bid Amount: {proposal.bid_amount}</p>
         <p><a href="{current_app.config['FRONTEND_URL']}/#/jobs/{job.id}/proposals">View All Proposals</a></p>
         <p>Thank you,<br>The FreelancePro SL Team</p>
         """
         
-        AuthService.send_email(client.email, email_subject, email_body)
+        enqueue_email(client.email, email_subject, email_body)
+        
+        return EmailService._commit_notifications(f"proposal notification for proposal {proposal.id}")
     
     @staticmethod
     def send_message_notification(message):
@@ -242,7 +437,7 @@ class EmailService:
         recipient = message.recipient
         
         # Create notification
-        NotificationService.create_notification(
+        NotificationService.add_notification(
             recipient.id,
             NotificationType.NEW_MESSAGE,
             f"New message from {sender.first_name or sender.username}",
@@ -264,7 +459,10 @@ class EmailService:
             <p>Thank you,<br>The FreelancePro SL Team</p>
             """
             
-            AuthService.send_email(recipient.email, email_subject, email_body)
+            enqueue_email(recipient.email, email_subject, email_body)
+        
+        # Committed whether or not an email was queued
+        return EmailService._commit_notifications(f"message notification for user {recipient.id}")
     
     @staticmethod
     def send_review_notification(review):
@@ -275,7 +473,7 @@ class EmailService:
         reviewed = review.reviewed
         
         # Create notification
-        NotificationService.create_notification(
+        NotificationService.add_notification(
             reviewed.id,
             NotificationType.NEW_REVIEW,
             f"New review from {reviewer.first_name or reviewer.username}",
@@ -296,7 +494,9 @@ class EmailService:
         <p>Thank you,<br>The FreelancePro SL Team</p>
         """
         
-        AuthService.send_email(reviewed.email, email_subject, email_body)
+        enqueue_email(reviewed.email, email_subject, email_body)
+        
+        return EmailService._commit_notifications(f"review notification for review {review.id}")
     
     @staticmethod
     def send_job_completed_notification(job):
@@ -306,22 +506,14 @@ class EmailService:
         client = job.client
         freelancer = job.freelancer
         
-        # Create notification for client
-        NotificationService.create_notification(
-            client.id,
+        # Notify both parties; written together with the emails below in one commit
+        NotificationService.emit_many(
+            [client.id, freelancer.id],
             NotificationType.JOB_COMPLETED,
             f"Job completed: {job.title}",
             reference_id=job.id,
-            reference_type='job'
-        )
-        
-        # Create notification for freelancer
-        NotificationService.create_notification(
-            freelancer.id,
-            NotificationType.JOB_COMPLETED,
-            f"Job completed: {job.title}",
-            reference_id=job.id,
-            reference_type='job'
+            reference_type='job',
+            commit=False
         )
         
         # Send email to client
@@ -329,26 +521,28 @@ class EmailService:
         client_email_body = f"""
         <h2>Job Completed</h2>
         <p>Hi {client.first_name or client.username},</p>
-        <p>The job <strong>"{job.title}"</strong> has been marked as completed by {freelancer.first_name or freelancer.username}.</p>
-        <p>Please review the work and leave a review for the freelancer.</p>
+        <p>The job <strong>"{job.title}"</strong> with {freelancer.first_name or freelancer.username} has been marked as completed.</p>
+        <p>Please leave a review for the freelancer.</p>
         <p><a href="{current_app.config['FRONTEND_URL']}/#/jobs/{job.id}">View Job</a></p>
         <p>Thank you,<br>The FreelancePro SL Team</p>
         """
         
-        AuthService.send_email(client.email, client_email_subject, client_email_body)
+        enqueue_email(client.email, client_email_subject, client_email_body)
         
         # Send email to freelancer
         freelancer_email_subject = f"Job Completed: {job.title}"
         freelancer_email_body = f"""
         <h2>Job Completed</h2>
         <p>Hi {freelancer.first_name or freelancer.username},</p>
-        <p>You have marked the job <strong>"{job.title}"</strong> as completed.</p>
+        <p>{client.first_name or client.username} has marked the job <strong>"{job.title}"</strong> as completed.</p>
         <p>The client will now review your work.</p>
         <p><a href="{current_app.config['FRONTEND_URL']}/#/jobs/{job.id}">View Job</a></p>
         <p>Thank you,<br>The FreelancePro SL Team</p>
         """
         
-        AuthService.send_email(freelancer.email, freelancer_email_subject, freelancer_email_body)
+        enqueue_email(freelancer.email, freelancer_email_subject, freelancer_email_body)
+        
+        return EmailService._commit_notifications(f"job completed notifications for job {job.id}")
     
     @staticmethod
     def get_email_logs(query_params=None):
@@ -359,12 +553,12 @@ class EmailService:
         if query_params is None:
             query_params = {}
             
-        # Base query for email logs
-        query = EmailLog.query
+        # Email logs are the outbox rows (status, attempts and last error per email)
+        query = OutboundEmail.query
         
         # Filter by recipient
         if 'recipient' in query_params and query_params['recipient']:
-            query = query.filter(EmailLog.recipient.ilike(f"%{query_params['recipient']}%"))
+            query = query.filter(OutboundEmail.recipient.ilike(f"%{query_params['recipient']}%"))
         
         # Filter by status
         if 'status' in query_params and query_params['status']:
@@ -372,13 +566,13 @@ class EmailService:
         
         # Filter by date range
         if 'start_date' in query_params and query_params['start_date']:
-            query = query.filter(EmailLog.created_at >= query_params['start_date'])
+            query = query.filter(OutboundEmail.created_at >= query_params['start_date'])
         
         if 'end_date' in query_params and query_params['end_date']:
-            query = query.filter(EmailLog.created_at <= query_params['end_date'])
+            query = query.filter(OutboundEmail.created_at <= query_params['end_date'])
         
         # Sorting (newest first by default)
-        query = query.order_by(EmailLog.created_at.desc())
+        query = query.order_by(OutboundEmail.created_at.desc())
         
         # Pagination
         page = int(query_params.get('page', 1))
@@ -2,74 +2,106 @@ from flask import current_app
 import requests
 import json
 import uuid
-from datetime import datetime
+from services.provider_client import ProviderUnavailable, get_provider_client
+from services.provider_tokens import get_token_manager
+from services.payment_state_store import get_payment_state_store
 
 class OrangeMoneyService:
     """
     Service for handling Orange Money API integrations.
     
-    This is a mock implementation for development purposes.
-    In a production environment, this would make actual API calls to Orange Money.
+    Runs as a mock for development unless ORANGE_MONEY_LIVE is set, in which
+    case calls go to ORANGE_MONEY_API_URL through the shared provider client.
+    Initiated payments are recorded in the payment state store, so any worker
+    can look them up.
     """
     
+    PROVIDER = 'orange_money'
+    
     def __init__(self):
         self.base_url = "https://api.orange.com/orange-money-webpay"
-        self.transactions = {}  # Mock storage for transactions
+    
+    @property
+    def states(self):
+        return get_payment_state_store()
+    
+    @property
+    def live(self):
+        return current_app.config.get('ORANGE_MONEY_LIVE', False)
+    
+    @property
+    def client(self):
+        # Pooled per process, so calls reuse open connections
+        return get_provider_client('orange_money', current_app.config.get('ORANGE_MONEY_API_URL', self.base_url))
+    
+    @property
+    def tokens(self):
+        # Shared by all workers through the provider_tokens table
+        return get_token_manager('orange_money', self.fetch_auth_token)
+    
+    def fetch_auth_token(self):
+        """
+        Request a new access token. Returns (access_token, expires_in seconds).
+        """
+        response = self.client.post(
+            "/token",
+            auth=(current_app.config['ORANGE_MONEY_API_KEY'], current_app.config['ORANGE_MONEY_API_SECRET']),
+            data={"grant_type": "client_credentials"}
+        )
+        if not response.ok:
+            # No token means the call it was for never reached the provider
+            raise ProviderUnavailable(f"Orange Money token request failed with HTTP {response.status_code}")
+        data = response.json()
+        return data["access_token"], data.get("expires_in", 3600)
     
     def get_auth_token(self):
         """
-        Get an authentication token from Orange Money API.
-        
-        In a production environment, this would make a real API call.
+        Get an authentication token from Orange Money API (cached until shortly before expiry).
         """
-        # In production, this would be:
-        # response = requests.post(
-        #     f"{self.base_url}/token",
-        #     headers={
-        #         "Authorization": f"Basic {current_app.config['ORANGE_MONEY_API_KEY']}:{current_app.config['ORANGE_MONEY_API_SECRET']}"
-        #     }
-        # )
-        # return response.json()["access_token"]
+        if self.live:
+            return self.tokens.get_token()
         
         # For development, return a mock token
         return "mock_orange_money_token_" + str(uuid.uuid4())
     
+    def authorized_request(self, method, path, **kwargs):
+        """
+        Call the API with the cached token; if the provider rejects it, fetch a
+        new one and retry once (a 401 means the request was not processed).
+        """
+        token = self.get_auth_token()
+        response = self.client.request(method, path, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        if response.status_code == 401:
+            self.tokens.invalidate(token)
+            token = self.get_auth_token()
+            response = self.client.request(method, path, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        return response
+    
     def initiate_payment(self, amount, phone_number, transaction_reference, description):
         """
         Initiate a payment with Orange Money.
-        
-        In a production environment, this would make a real API call.
         """
-        # In production, this would be:
-        # token = self.get_auth_token()
-        # response = requests.post(
-        #     f"{self.base_url}/payments",
-        #     headers={
-        #         "Authorization": f"Bearer {token}",
-        #         "Content-Type": "application/json"
-        #     },
-        #     json={
-        #         "merchant_id": current_app.config['ORANGE_MONEY_MERCHANT_ID'],
-        #         "amount": amount,
-        #         "phone_number": phone_number,
-        #         "reference": transaction_reference,
-        #         "description": description
-        #     }
-        # )
-        # return response.json()
+        if self.live:
+            response = self.authorized_request(
+                "POST",
+                "/payments",
+                json={
+                    "merchant_id": current_app.config['ORANGE_MONEY_MERCHANT_ID'],
+                    "amount": amount,
+                    "phone_number": phone_number,
+                    "reference": transaction_reference,
+                    "description": description
+                }
+            )
+            data = response.json()
+            if data.get("transaction_id"):
+                self.states.put(self.PROVIDER, data["transaction_id"], transaction_reference,
+                                amount, phone_number, description)
+            return data
         
         # For development, return a mock response
         transaction_id = f"OM_{str(uuid.uuid4())[:8]}"
-        
-        # Store transaction in mock storage
-        self.transactions[transaction_id] = {
-            "amount": amount,
-            "phone_number": phone_number,
-            "reference": transaction_reference,
-            "description": description,
-            "status": "pending",
-            "created_at": datetime.utcnow().isoformat()
-        }
+        self.states.put(self.PROVIDER, transaction_id, transaction_reference, amount, phone_number, description)
         
         return {
             "status": "success",
@@ -83,35 +115,31 @@ class OrangeMoneyService:
     def check_payment_status(self, transaction_id):
         """
         Check the status of a payment with Orange Money.
-        
-        In a production environment, this would make a real API call.
         """
-        # In production, this would be:
-        # token = self.get_auth_token()
-        # response = requests.get(
-        #     f"{self.base_url}/payments/{transaction_id}",
-        #     headers={
-        #         "Authorization": f"Bearer {token}"
-        #     }
-        # )
-        # return response.json()
+        if self.live:
+            response = self.authorized_request("GET", f"/payments/{transaction_id}")
+            data = response.json()
+            if data.get("payment_status") in ("completed", "failed"):
+                self.states.update_status(self.PROVIDER, transaction_id, data["payment_status"])
+            return data
         
         # For development, return a mock response
-        if transaction_id not in self.transactions:
+        state = self.states.get(self.PROVIDER, transaction_id)
+        if state is None:
             return {
                 "status": "error",
                 "message": "Transaction not found"
             }
         
         # For demo purposes, consider all transactions successful
-        self.transactions[transaction_id]["status"] = "completed"
+        self.states.update_status(self.PROVIDER, transaction_id, "completed")
         
         return {
             "status": "success",
             "transaction_id": transaction_id,
             "payment_status": "completed",
-            "reference": self.transactions[transaction_id]["reference"],
-            "amount": self.transactions[transaction_id]["amount"]
+            "reference": state["reference"],
+            "amount": state["amount"]
         }
     
     def release_payment(self, transaction_id, amount, recipient_id):
@@ -129,3 +157,31 @@ class OrangeMoneyService:
             "amount": amount,
             "recipient_id": recipient_id
         }
+    
+    def release_payments(self, payouts):
+        """
+        Release several payouts in one call. `payouts` is a list of dicts with
+        reference, recipient_id, phone_number and amount; returns one result
+        per payout with its reference, status and transaction_id. Payouts
+        missing from the results may or may not have been made.
+        """
+        if self.live:
+            response = self.authorized_request(
+                "POST",
+                "/payouts/bulk",
+                json={
+                    "merchant_id": current_app.config['ORANGE_MONEY_MERCHANT_ID'],
+                    "payouts": payouts
+                }
+            )
+            if 400 <= response.status_code < 500:
+                # Rejected outright, nothing was paid
+                response.raise_for_status()
+            return response.json().get("results", []) if response.ok else []
+        
+        # For development, return a mock response
+        return [{
+            "reference": payout["reference"],
+            "status": "success",
+            "transaction_id": f"OMP_{str(uuid.uuid4())[:8]}"
+        } for payout in payouts]
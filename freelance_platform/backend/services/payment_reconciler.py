@@ -0,0 +1,220 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import and_, exists, or_, select, update
+from models import db, Transaction, TransactionStatus, Job, JobStatus, DepositInitiation, PaymentReconciliation
+from services.orange_money_service import OrangeMoneyService
+
+logger = logging.getLogger(__name__)
+
+# Provider payment statuses that settle a transaction
+SETTLED_STATUSES = {
+    'completed': TransactionStatus.COMPLETED,
+    'failed': TransactionStatus.FAILED
+}
+
+class PaymentReconciler:
+    """
+    Settles pending deposits whose callback never arrived by asking the
+    provider for their status. Pending transactions are scanned in id order
+    from a high-water mark, a batch at a time; each batch is checked over a
+    bounded thread pool and applied with one UPDATE per resulting status.
+
+    A deposit the provider has not settled is checked again with backoff and
+    flagged for manual review after PAYMENT_RECONCILE_MAX_ATTEMPTS checks or
+    PAYMENT_RECONCILE_MAX_AGE_SECONDS. Deposits whose submission was left
+    'unconfirmed' have no provider id to check and are flagged straight away.
+    Only runs against the live provider: the mock reports every payment completed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.batch_size = app.config.get('PAYMENT_RECONCILE_BATCH_SIZE', 100)
+        self.concurrency = app.config.get('PAYMENT_RECONCILE_CONCURRENCY', 8)
+        self.min_age_seconds = app.config.get('PAYMENT_RECONCILE_MIN_AGE_SECONDS', 120)
+        self.interval_seconds = app.config.get('PAYMENT_RECONCILE_INTERVAL_SECONDS', 60)
+        self.max_attempts = app.config.get('PAYMENT_RECONCILE_MAX_ATTEMPTS', 10)
+        self.max_age_seconds = app.config.get('PAYMENT_RECONCILE_MAX_AGE_SECONDS', 2 * 24 * 3600)
+        self.max_backoff_seconds = app.config.get('PAYMENT_RECONCILE_MAX_BACKOFF_SECONDS', 3600)
+        self.provider = OrangeMoneyService()
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='payment-reconcile')
+        self.last_id = 0  # high-water mark within the current pass
+        self.stopping = threading.Event()
+
+    @property
+    def live(self):
+        return bool(self.app.config.get('ORANGE_MONEY_LIVE'))
+
+    def pending_batch(self):
+        """
+        Next batch of pending deposits past the callback grace period that are
+        due a check: (id, provider transaction id, created_at)
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.min_age_seconds)
+        unconfirmed = exists().where(
+            DepositInitiation.transaction_id == Transaction.id,
+            DepositInitiation.status == 'unconfirmed'
+        )
+        return db.session.execute(
+            select(Transaction.id, Transaction.orange_money_transaction_id, Transaction.created_at)
+            .outerjoin(PaymentReconciliation, PaymentReconciliation.transaction_id == Transaction.id)
+            .where(Transaction.status == TransactionStatus.PENDING,
+                   or_(Transaction.orange_money_transaction_id.isnot(None), unconfirmed),
+                   Transaction.created_at <= cutoff,
+                   Transaction.id > self.last_id,
+                   or_(PaymentReconciliation.id.is_(None),
+                       and_(PaymentReconciliation.needs_review == False,
+                            PaymentReconciliation.next_check_at <= now)))
+            .order_by(Transaction.id)
+            .limit(self.batch_size)
+        ).all()
+
+    def fetch_status(self, provider_transaction_id):
+        """
+        (settled TransactionStatus or None, note on why it is not settled)
+        """
+        if provider_transaction_id is None:
+            return None, 'Submission unconfirmed and no provider transaction id to check'
+        with self.app.app_context():
+            try:
+                response = self.provider.check_payment_status(provider_transaction_id)
+            except Exception as e:
+                logger.warning(f"Status check for {provider_transaction_id} failed: {e}")
+                return None, f'Status check failed: {e}'
+            status = response.get('payment_status')
+            return SETTLED_STATUSES.get(status), f"Provider reports '{status}'"
+
+    def backoff(self, attempts):
+        return min(self.interval_seconds * 2 ** (attempts - 1), self.max_backoff_seconds)
+
+    def record_unsettled(self, rows):
+        """
+        Count a check against each unsettled deposit: schedule the next one with
+        backoff, or flag it for manual review. Returns the number flagged.
+        """
+        now = datetime.utcnow()
+        existing = {
+            reconciliation.transaction_id: reconciliation
+            for reconciliation in PaymentReconciliation.query.filter(
+                PaymentReconciliation.transaction_id.in_([row.id for row, note in rows])
+            )
+        }
+        flagged = 0
+        for row, note in rows:
+            reconciliation = existing.get(row.id)
+            if reconciliation is None:
+                reconciliation = PaymentReconciliation(transaction_id=row.id, attempts=0)
+                db.session.add(reconciliation)
+            reconciliation.attempts += 1
+            age = (now - row.created_at).total_seconds()
+            if row.orange_money_transaction_id is not None:
+                if reconciliation.attempts < self.max_attempts and age < self.max_age_seconds:
+                    reconciliation.next_check_at = now + timedelta(seconds=self.backoff(reconciliation.attempts))
+                    reconciliation.review_reason = note
+                    continue
+                note = f"{note} after {reconciliation.attempts} checks"
+            reconciliation.needs_review = True
+            reconciliation.review_reason = note
+            flagged += 1
+            logger.error(f"Pending payment {row.id} needs manual review: {note}")
+        return flagged
+
+    def apply(self, results):
+        """
+        Write settled statuses, one conditional UPDATE per status so a callback
+        that got there first is left alone, and record the checks of the rest.
+        Returns the number of transactions settled.
+        """
+        settled = 0
+        for status in SETTLED_STATUSES.values():
+            ids = [row.id for row, result, note in results if result == status]
+            if not ids:
+                continue
+            result = db.session.execute(
+                update(Transaction)
+                .where(Transaction.id.in_(ids), Transaction.status == TransactionStatus.PENDING)
+                .values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+            settled += result.rowcount
+            if status == TransactionStatus.COMPLETED:
+                job_ids = select(Transaction.job_id).where(Transaction.id.in_(ids))
+                db.session.execute(
+                    update(Job)
+                    .where(Job.id.in_(job_ids), Job.status == JobStatus.OPEN)
+                    .values(status=JobStatus.IN_PROGRESS)
+                    .execution_options(synchronize_session=False)
+                )
+        unsettled = [(row, note) for row, result, note in results if result is None]
+        if unsettled:
+            self.record_unsettled(unsettled)
+        db.session.commit()
+        return settled
+
+    def run_once(self):
+        """
+        Reconcile one batch. Returns (checked, settled); the pass restarts
+        from the lowest pending id once a short batch is reached.
+        """
+        if not self.live:
+            self.last_id = 0
+            return 0, 0
+
+        with self.app.app_context():
+            batch = self.pending_batch()
+            db.session.rollback()
+            if len(batch) < self.batch_size:
+                self.last_id = 0
+            else:
+                self.last_id = batch[-1].id
+            if not batch:
+                return 0, 0
+
+            checks = self.executor.map(self.fetch_status, [row.orange_money_transaction_id for row in batch])
+            results = [(row, status, note) for row, (status, note) in zip(batch, checks)]
+            settled = self.apply(results)
+            logger.info(f"Reconciled {len(batch)} pending payments, {settled} settled")
+            return len(batch), settled
+
+    def run(self):
+        """
+        Reconcile until stop() is called, resting between passes
+        """
+        logger.info("Payment reconciler started")
+        while not self.stopping.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception(f"Payment reconciler error: {e}")
+                self.last_id = 0
+            if self.last_id == 0:
+                self.stopping.wait(self.interval_seconds)
+        self.executor.shutdown(wait=False)
+
+    def stop(self):
+        self.stopping.set()
+
+def create_reconciler(app):
+    """
+    PaymentReconciler for the live provider, or None when ORANGE_MONEY_LIVE is
+    off (the mock would report every pending payment as completed)
+    """
+    if not app.config.get('ORANGE_MONEY_LIVE'):
+        return None
+    return PaymentReconciler(app)
+
+def init_app(app):
+    """
+    Start the reconciler in a background thread when PAYMENT_RECONCILER_THREAD
+    is set; otherwise run `flask reconcile-payments` as a separate process.
+    """
+    if not app.config.get('PAYMENT_RECONCILER_THREAD'):
+        return
+    reconciler = create_reconciler(app)
+    if reconciler is None:
+        return
+    thread = threading.Thread(target=reconciler.run, name='payment-reconciler', daemon=True)
+    thread.start()
+    app.extensions['payment_reconciler'] = reconciler
@@ -6,6 +6,7 @@ import json
 from models import db, User, Transaction, Job, Proposal, Notification, NotificationType
 from enum import Enum
 from services.auth_service import AuthService
+from services.provider_client import get_provider_client, ProviderUnavailable
 
 class PaymentMethod(Enum):
     MOBILE_MONEY = 'mobile_money'
@@ -98,8 +99,21 @@ class PaymentService:
                 'Content-Type': 'application/json'
             }
             
-            # Call the mobile money API
-            response = requests.post(api_url, json=payload, headers=headers)
+            # Call the mobile money API over the provider's pooled, timeout-bounded client
+            try:
+                response = get_provider_client(provider, api_url).post(api_url, json=payload, headers=headers)
+            except ProviderUnavailable as e:
+                # Never reached the provider (circuit open or unreachable), so nothing was charged
+                transaction.status = TransactionStatus.FAILED.value
+                transaction.error_message = str(e)
+                db.session.commit()
+                return {'success': False, 'message': f'Payment provider {provider} is not responding, please try again shortly'}
+            except requests.RequestException as e:
+                # The provider may have received it; leave the transaction pending
+                # for the callback or a status check to settle
+                transaction.error_message = str(e)
+                db.session.commit()
+                return {'success': False, 'message': f'Payment provider {provider} did not confirm the payment, please check its status shortly'}
             response_data = response.json()
             
             # Update transaction with provider response
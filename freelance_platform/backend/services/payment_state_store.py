@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import create_engine, select, update
+from db_profiles import apply_sqlite_pragmas
+from models import db, PaymentState
+
+logger = logging.getLogger(__name__)
+
+SETTLED_STATUSES = ('completed', 'failed')
+
+class PaymentStateStore:
+    """
+    Provider-side payment state (what we asked the provider to collect and
+    what it last reported), keyed by (provider, provider transaction id) and
+    looked up by our transaction reference. Every worker sees the same rows.
+
+    Settled entries are deleted once older than `ttl_seconds`; put() does this
+    at most every EVICT_INTERVAL_SECONDS, and `flask evict-payment-states`
+    can run it from cron.
+    """
+
+    EVICT_INTERVAL_SECONDS = 300
+
+    def __init__(self, engine, ttl_seconds):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.table = PaymentState.__table__
+        self.last_evicted = 0.0
+        self.evict_lock = threading.Lock()
+
+    def put(self, provider, provider_transaction_id, reference, amount, phone_number=None,
+            description=None, status='pending'):
+        now = datetime.utcnow()
+        with self.engine.begin() as connection:
+            connection.execute(self.table.insert().values(
+                provider=provider,
+                provider_transaction_id=provider_transaction_id,
+                reference=reference,
+                amount=amount,
+                phone_number=phone_number,
+                description=description,
+                status=status,
+                created_at=now,
+                updated_at=now,
+                settled_at=now if status in SETTLED_STATUSES else None
+            ))
+        self.evict_if_due()
+
+    def get(self, provider, provider_transaction_id):
+        with self.engine.connect() as connection:
+            row = connection.execute(select(self.table).where(
+                self.table.c.provider == provider,
+                self.table.c.provider_transaction_id == provider_transaction_id
+            )).mappings().first()
+        return dict(row) if row else None
+
+    def get_by_reference(self, reference):
+        with self.engine.connect() as connection:
+            row = connection.execute(select(self.table).where(
+                self.table.c.reference == reference
+            ).order_by(self.table.c.id.desc())).mappings().first()
+        return dict(row) if row else None
+
+    def update_status(self, provider, provider_transaction_id, status):
+        """
+        Record the provider's latest status. Returns False if the entry is unknown.
+        """
+        now = datetime.utcnow()
+        with self.engine.begin() as connection:
+            result = connection.execute(update(self.table).where(
+                self.table.c.provider == provider,
+                self.table.c.provider_transaction_id == provider_transaction_id
+            ).values(
+                status=status,
+                updated_at=now,
+                settled_at=now if status in SETTLED_STATUSES else None
+            ))
+        return result.rowcount > 0
+
+    def evict_settled(self):
+        """
+        Delete settled entries older than the TTL. Returns the number removed.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        with self.engine.begin() as connection:
+            result = connection.execute(self.table.delete().where(
+                self.table.c.settled_at.isnot(None),
+                self.table.c.settled_at < cutoff
+            ))
+        return result.rowcount
+
+    def evict_if_due(self):
+        if time.time() - self.last_evicted < self.EVICT_INTERVAL_SECONDS:
+            return
+        if not self.evict_lock.acquire(blocking=False):
+            return
+        try:
+            self.last_evicted = time.time()
+            removed = self.evict_settled()
+            if removed:
+                logger.info(f"Evicted {removed} settled payment states")
+        except Exception as e:
+            logger.warning(f"Payment state eviction failed: {e}")
+        finally:
+            self.evict_lock.release()
+
+def _sqlite_engine(path, config):
+    """
+    Engine for a local SQLite file shared by the workers on one host, with
+    the SQLite profile's pragmas (WAL so readers don't block the writer, mmap reads).
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    engine = create_engine(f"sqlite:///{path}")
+    apply_sqlite_pragmas(engine, config)
+    PaymentState.__table__.create(engine, checkfirst=True)
+    return engine
+
+def init_app(app):
+    """
+    Create the payment state store. PAYMENT_STATE_BACKEND is 'sql' (the
+    application database) or 'sqlite' (a local file at PAYMENT_STATE_SQLITE_PATH).
+    """
+    backend = app.config.get('PAYMENT_STATE_BACKEND', 'sql')
+    ttl_seconds = app.config.get('PAYMENT_STATE_TTL_SECONDS', 7 * 24 * 3600)
+
+    if backend == 'sqlite':
+        engine = _sqlite_engine(app.config['PAYMENT_STATE_SQLITE_PATH'], app.config)
+    elif backend == 'sql':
+        with app.app_context():
+            engine = db.engine
+    else:
+        raise ValueError(f"Unknown PAYMENT_STATE_BACKEND '{backend}'")
+
+    app.extensions['payment_state_store'] = PaymentStateStore(engine, ttl_seconds)
+
+def get_payment_state_store():
+    return current_app.extensions['payment_state_store']
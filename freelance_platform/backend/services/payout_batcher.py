@@ -0,0 +1,322 @@
+import logging
+import random
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+import requests
+from sqlalchemy import and_, select, update
+from models import db, User, Payout, PayoutTransfer
+from services.orange_money_service import OrangeMoneyService
+from services.provider_client import ProviderUnavailable
+from services import event_stream
+
+logger = logging.getLogger(__name__)
+
+# Retry delay after a failure that never reached the provider, doubled per attempt (seconds)
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+
+# How long claimed transfers are reserved for the worker submitting them
+CLAIM_SECONDS = 300
+
+# Pending payouts coalesced per run
+COALESCE_LIMIT = 10000
+
+# Provider rejections that only mean "not now" (request timeout, rate limited); any
+# other 4xx is a definitive rejection and fails the transfers
+RETRY_HTTP_STATUSES = (408, 429)
+
+# Transfer statuses an admin can send back to the queue
+REQUEUEABLE_STATUSES = ('failed', 'unconfirmed')
+
+def record_payout(transaction):
+    """
+    Add the ledger entry for a released transaction in the caller's
+    transaction; the payout batcher pays it out.
+    """
+    payout = Payout(
+        transaction_id=transaction.id,
+        freelancer_id=transaction.payee_id,
+        amount=transaction.amount - transaction.platform_fee
+    )
+    db.session.add(payout)
+    return payout
+
+class PayoutBatcher:
+    """
+    Pays out released transactions. Each run coalesces every pending payout of
+    a freelancer into one PayoutTransfer, then submits queued transfers to the
+    provider's bulk payout API, PAYOUT_PROVIDER_BATCH_SIZE per call.
+
+    Failures that never reached the provider (and timeout or rate-limit
+    rejections) are retried with backoff; any other rejection fails the
+    transfers. A transfer the provider may have made is marked 'unconfirmed'
+    and never resubmitted, so a freelancer is not paid twice.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.provider = OrangeMoneyService()
+        self.provider_batch_size = app.config.get('PAYOUT_PROVIDER_BATCH_SIZE', 100)
+        self.max_attempts = app.config.get('PAYOUT_MAX_ATTEMPTS', 5)
+        self.interval_seconds = app.config.get('PAYOUT_BATCH_INTERVAL_SECONDS', 300)
+        self.stopping = threading.Event()
+
+    def coalesce(self):
+        """
+        Group pending payouts into one transfer per freelancer. Returns the
+        number of payouts batched.
+        """
+        rows = db.session.execute(
+            select(Payout.id, Payout.freelancer_id, Payout.amount)
+            .where(Payout.status == 'pending')
+            .order_by(Payout.id)
+            .limit(COALESCE_LIMIT)
+        ).all()
+        if not rows:
+            db.session.rollback()
+            return 0
+
+        by_freelancer = defaultdict(list)
+        for row in rows:
+            by_freelancer[row.freelancer_id].append(row)
+
+        transfers = {
+            freelancer_id: PayoutTransfer(
+                freelancer_id=freelancer_id,
+                amount=round(sum(row.amount for row in payouts), 2),
+                payout_count=len(payouts)
+            )
+            for freelancer_id, payouts in by_freelancer.items()
+        }
+        db.session.add_all(transfers.values())
+        db.session.flush()
+
+        for freelancer_id, payouts in by_freelancer.items():
+            ids = [row.id for row in payouts]
+            result = db.session.execute(
+                update(Payout)
+                .where(Payout.id.in_(ids), Payout.status == 'pending')
+                .values(status='batched', transfer_id=transfers[freelancer_id].id),
+                execution_options={'synchronize_session': False}
+            )
+            if result.rowcount != len(ids):
+                # Another batcher got there first; leave this run to it
+                db.session.rollback()
+                return 0
+
+        db.session.commit()
+        return len(rows)
+
+    def claim(self):
+        """
+        Reserve the next provider batch of due transfers with a conditional UPDATE
+        """
+        now = datetime.utcnow()
+        due = and_(PayoutTransfer.status == 'queued', PayoutTransfer.next_attempt_at <= now)
+        ids = db.session.scalars(
+            select(PayoutTransfer.id).where(due).order_by(PayoutTransfer.id).limit(self.provider_batch_size)
+        ).all()
+        if not ids:
+            db.session.rollback()
+            return []
+
+        token = str(uuid.uuid4())
+        db.session.execute(
+            update(PayoutTransfer)
+            .where(PayoutTransfer.id.in_(ids), due)
+            .values(status='submitting', claim_token=token, claimed_until=now + timedelta(seconds=CLAIM_SECONDS)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        return PayoutTransfer.query.filter_by(
+            claim_token=token, status='submitting'
+        ).order_by(PayoutTransfer.id).all()
+
+    def expire_abandoned(self):
+        """
+        A worker that died mid-submit may have been paid out; don't resubmit those
+        """
+        db.session.execute(
+            update(PayoutTransfer)
+            .where(PayoutTransfer.status == 'submitting', PayoutTransfer.claimed_until < datetime.utcnow())
+            .values(status='unconfirmed', last_error='Worker stopped during submission'),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+
+    def retry_delay(self, attempts):
+        delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    def retry_or_fail(self, transfer, error):
+        transfer.last_error = str(error)
+        if transfer.attempts >= self.max_attempts:
+            transfer.status = 'failed'
+            logger.error(f"Giving up on payout transfer {transfer.id}: {error}")
+        else:
+            transfer.status = 'queued'
+            transfer.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(transfer.attempts))
+
+    def submit(self, transfers):
+        """
+        Pay out one batch of transfers with a single provider call and settle
+        their payouts with one UPDATE per outcome
+        """
+        phone_numbers = dict(db.session.execute(
+            select(User.id, User.phone_number).where(User.id.in_({t.freelancer_id for t in transfers}))
+        ).all())
+        for transfer in transfers:
+            transfer.attempts += 1
+            transfer.claim_token = None
+
+        try:
+            results = self.provider.release_payments([{
+                'reference': f"PAYOUT-{transfer.id}",
+                'recipient_id': transfer.freelancer_id,
+                'phone_number': phone_numbers.get(transfer.freelancer_id),
+                'amount': transfer.amount
+            } for transfer in transfers])
+        except ProviderUnavailable as e:
+            # Never reached the provider (circuit open or unreachable)
+            for transfer in transfers:
+                self.retry_or_fail(transfer, e)
+            results = []
+        except requests.HTTPError as e:
+            # Rejected by the provider, so nothing was paid
+            status_code = e.response.status_code if e.response is not None else None
+            for transfer in transfers:
+                if status_code in RETRY_HTTP_STATUSES:
+                    self.retry_or_fail(transfer, e)
+                else:
+                    transfer.status = 'failed'
+                    transfer.last_error = str(e)
+            if status_code not in RETRY_HTTP_STATUSES:
+                logger.error(f"Payout batch of {len(transfers)} rejected by the provider: {e}")
+            results = []
+        except Exception as e:
+            logger.warning(f"Payout batch of {len(transfers)} unconfirmed: {e}")
+            for transfer in transfers:
+                transfer.status = 'unconfirmed'
+                transfer.last_error = str(e)
+            results = []
+
+        now = datetime.utcnow()
+        by_reference = {result.get('reference'): result for result in results}
+        for transfer in transfers:
+            if transfer.status != 'submitting':
+                continue
+            result = by_reference.get(f"PAYOUT-{transfer.id}")
+            if result is None:
+                transfer.status = 'unconfirmed'
+                transfer.last_error = 'No result from provider'
+            elif result.get('status') == 'success':
+                transfer.status = 'paid'
+                transfer.provider_reference = result.get('transaction_id')
+                transfer.paid_at = now
+                transfer.last_error = None
+            else:
+                transfer.status = 'failed'
+                transfer.last_error = result.get('message', 'Payout rejected by provider')
+
+        for status in ('paid', 'failed'):
+            ids = [transfer.id for transfer in transfers if transfer.status == status]
+            if ids:
+                db.session.execute(
+                    update(Payout)
+                    .where(Payout.transfer_id.in_(ids))
+                    .values(status=status, paid_at=now if status == 'paid' else None),
+                    execution_options={'synchronize_session': False}
+                )
+
+        for transfer in transfers:
+            event_stream.publish_on_commit(transfer.freelancer_id, 'payout', {
+                'transfer_id': transfer.id,
+                'amount': transfer.amount,
+                'status': transfer.status
+            })
+        db.session.commit()
+
+    def run_once(self):
+        """
+        Coalesce pending payouts and submit every due transfer.
+        Returns (payouts batched, transfers submitted).
+        """
+        with self.app.app_context():
+            self.expire_abandoned()
+            batched = self.coalesce()
+            submitted = 0
+            while True:
+                transfers = self.claim()
+                if not transfers:
+                    break
+                try:
+                    self.submit(transfers)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception(f"Payout batch failed: {e}")
+                    break
+                submitted += len(transfers)
+            if batched or submitted:
+                logger.info(f"Batched {batched} payouts, submitted {submitted} transfers")
+            return batched, submitted
+
+    def run(self):
+        """
+        Run every PAYOUT_BATCH_INTERVAL_SECONDS until stop() is called; payouts
+        released in between are coalesced into one transfer per freelancer
+        """
+        logger.info("Payout batcher started")
+        while not self.stopping.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception(f"Payout batcher error: {e}")
+            self.stopping.wait(self.interval_seconds)
+
+    def stop(self):
+        self.stopping.set()
+
+def requeue_transfers(transfer_ids):
+    """
+    Send failed or unconfirmed transfers back to the queue with a fresh attempt
+    budget, e.g. once an admin has confirmed with the provider that an
+    unconfirmed transfer was not paid. Returns the ids requeued.
+    """
+    requeueable = and_(PayoutTransfer.id.in_(transfer_ids), PayoutTransfer.status.in_(REQUEUEABLE_STATUSES))
+    ids = db.session.scalars(select(PayoutTransfer.id).where(requeueable)).all()
+    if not ids:
+        db.session.rollback()
+        return []
+
+    db.session.execute(
+        update(PayoutTransfer)
+        .where(PayoutTransfer.id.in_(ids), requeueable)
+        .values(status='queued', attempts=0, next_attempt_at=datetime.utcnow(), claim_token=None),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.execute(
+        update(Payout)
+        .where(Payout.transfer_id.in_(
+            select(PayoutTransfer.id).where(PayoutTransfer.id.in_(ids), PayoutTransfer.status == 'queued')
+        ), Payout.status == 'failed')
+        .values(status='batched'),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    logger.info(f"Requeued payout transfers {ids}")
+    return ids
+
+def init_app(app):
+    """
+    Start the payout batcher in a background thread when PAYOUT_WORKER_THREAD
+    is set; otherwise run `flask run-workers` (or `flask process-payouts`) as a
+    separate process.
+    """
+    if not app.config.get('PAYOUT_WORKER_THREAD'):
+        return
+    batcher = PayoutBatcher(app)
+    thread = threading.Thread(target=batcher.run, name='payout-batcher', daemon=True)
+    thread.start()
+    app.extensions['payout_batcher'] = batcher
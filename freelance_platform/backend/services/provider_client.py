@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ProtocolError, ReadTimeoutError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+class ProviderUnavailable(Exception):
+    """Raised without calling the provider while its circuit is open."""
+
+class ProviderUnreachable(ProviderUnavailable):
+    """
+    The request never reached the provider (connection refused, DNS failure,
+    connect timeout), so it is safe to send again.
+    """
+
+def _request_not_sent(error):
+    """
+    Whether a requests.ConnectionError happened before the request was sent.
+    A connection dropped while waiting for the response ('Connection aborted')
+    is as ambiguous as a read timeout.
+    """
+    cause = error.args[0] if error.args else None
+    if isinstance(cause, MaxRetryError):
+        cause = cause.reason
+    return not isinstance(cause, (ProtocolError, ReadTimeoutError))
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_seconds`; then lets one trial call through (half-open) and
+    closes again on its success.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class ProviderClient:
+    """
+    HTTP client for one payment provider: a pooled requests.Session (keep-alive,
+    so TLS is negotiated once per connection, not per call), connect/read
+    timeouts on every request, retries with jittered backoff and a circuit breaker.
+
+    Only connection failures are retried for POST; reads and 5xx responses are
+    retried for idempotent methods only, so a payment is never submitted twice.
+    """
+
+    # Responses treated as provider failures (retried for idempotent methods)
+    RETRY_STATUSES = (429, 502, 503, 504)
+
+    def __init__(self, name, base_url=None, connect_timeout=3.05, read_timeout=10,
+                 max_retries=2, backoff_factor=0.3, pool_size=10,
+                 failure_threshold=5, reset_seconds=30):
+        self.name = name
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_factor,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def url(self, path):
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name} is unavailable (circuit open)")
+
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except requests.ConnectionError as e:
+            self.breaker.record_failure()
+            if _request_not_sent(e):
+                raise ProviderUnreachable(f"{self.name} is unreachable: {e}") from e
+            raise
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_provider_client(name, base_url=None):
+    """
+    Get this process's client for provider `name` (e.g. 'orange'), creating it
+    from the PROVIDER_HTTP_* settings on first use. `base_url` defaults to
+    the provider's <NAME>_API_URL setting.
+    """
+    key = name.lower()
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    config = current_app.config
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = ProviderClient(
+                key,
+                base_url=base_url or config.get(f'{key.upper()}_API_URL'),
+                connect_timeout=config.get('PROVIDER_HTTP_CONNECT_TIMEOUT', 3.05),
+                read_timeout=config.get('PROVIDER_HTTP_READ_TIMEOUT', 10),
+                max_retries=config.get('PROVIDER_HTTP_MAX_RETRIES', 2),
+                pool_size=config.get('PROVIDER_HTTP_POOL_SIZE', 10),
+                failure_threshold=config.get('PROVIDER_CIRCUIT_FAILURE_THRESHOLD', 5),
+                reset_seconds=config.get('PROVIDER_CIRCUIT_RESET_SECONDS', 30)
+            )
+            _clients[key] = client
+    return client
@@ -0,0 +1,103 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, ProviderToken
+
+logger = logging.getLogger(__name__)
+
+class ProviderTokenManager:
+    """
+    Caches one provider's OAuth access token in process and in the
+    provider_tokens row shared by all workers, refreshing it shortly
+    before it expires.
+
+    `fetch` is called with no arguments and returns (access_token, expires_in
+    seconds). Concurrent refreshes in a process wait on one lock; across
+    workers the row is locked (SELECT ... FOR UPDATE where supported) while
+    one of them fetches.
+    """
+
+    def __init__(self, provider, fetch):
+        self.provider = provider
+        self.fetch = fetch
+        self.token = None
+        self.expires_at = None
+        self.lock = threading.Lock()
+
+    def is_fresh(self, expires_at):
+        margin = current_app.config.get('PROVIDER_TOKEN_REFRESH_MARGIN', 60)
+        return expires_at is not None and expires_at - timedelta(seconds=margin) > datetime.utcnow()
+
+    def get_token(self):
+        if self.is_fresh(self.expires_at):
+            return self.token
+        with self.lock:
+            # Another thread may have refreshed while we waited
+            if not self.is_fresh(self.expires_at):
+                self.token, self.expires_at = self.load_or_refresh()
+            return self.token
+
+    def invalidate(self, token=None):
+        """
+        Drop the cached token (e.g. after the provider rejected it with a 401).
+        Pass the rejected token so a newer one fetched meanwhile is kept.
+        """
+        with self.lock:
+            if token is not None and token != self.token:
+                return
+            self.token = None
+            self.expires_at = None
+            with db.engine.begin() as connection:
+                connection.execute(
+                    ProviderToken.__table__.delete().where(ProviderToken.provider == self.provider)
+                )
+
+    def load_or_refresh(self):
+        # Own connection and transaction, independent of the request's session
+        with db.engine.begin() as connection:
+            row = connection.execute(
+                select(ProviderToken.access_token, ProviderToken.expires_at)
+                .where(ProviderToken.provider == self.provider).with_for_update()
+            ).first()
+            if row and self.is_fresh(row.expires_at):
+                return row.access_token, row.expires_at
+
+            token, expires_in = self.fetch()
+            expires_at = datetime.utcnow() + timedelta(seconds=int(expires_in))
+            self.store(connection, token, expires_at)
+            logger.info(f"Refreshed {self.provider} access token, valid until {expires_at.isoformat()}")
+            return token, expires_at
+
+    def store(self, connection, token, expires_at):
+        values = {'provider': self.provider, 'access_token': token,
+                  'expires_at': expires_at, 'updated_at': datetime.utcnow()}
+        dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+        if dialect:
+            statement = dialect.insert(ProviderToken).values(**values)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[ProviderToken.provider],
+                set_={'access_token': token, 'expires_at': expires_at, 'updated_at': values['updated_at']}
+            ))
+            return
+
+        result = connection.execute(
+            ProviderToken.__table__.update().where(ProviderToken.provider == self.provider).values(**values)
+        )
+        if result.rowcount == 0:
+            connection.execute(ProviderToken.__table__.insert().values(**values))
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_token_manager(provider, fetch):
+    """
+    Get this process's token manager for `provider`, created on first use
+    """
+    manager = _managers.get(provider)
+    if manager is None:
+        with _managers_lock:
+            manager = _managers.setdefault(provider, ProviderTokenManager(provider, fetch))
+    return manager
@@ -0,0 +1,274 @@
+import logging
+import re
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, event, func, literal_column, or_, select, text
+from models import db, User, Job
+
+logger = logging.getLogger(__name__)
+
+# Fields matched by the LIKE fallback, per indexed model
+LIKE_FIELDS = {
+    'users': ('username', 'first_name', 'last_name', 'title', 'bio', 'location'),
+    'jobs': ('title', 'description')
+}
+
+INDEXED_MODELS = (User, Job)
+
+def _search_tokens(term):
+    return re.findall(r'\w+', term.lower())
+
+class SearchIndex:
+    """
+    Fallback index: no stored documents, matches with ILIKE and has no ranking.
+    Subclasses keep a per-dialect full-text document up to date on writes.
+    """
+    name = 'like'
+    maintains_documents = False
+
+    def ensure_schema(self, connection):
+        pass
+
+    def backfill(self, connection):
+        """
+        Index rows that have no document yet (e.g. existing data on first deploy)
+        """
+        pass
+
+    def reindex(self, connection, table, ids=None):
+        pass
+
+    def delete(self, connection, table, ids):
+        pass
+
+    def search(self, query, model, term):
+        """
+        Restrict `query` to rows of `model` matching `term`.
+        Returns (query, order_by clause or None).
+        """
+        pattern = f"%{term}%"
+        columns = [getattr(model, field) for field in LIKE_FIELDS[model.__tablename__]]
+        return query.filter(or_(*[column.ilike(pattern) for column in columns])), None
+
+class PostgresSearchIndex(SearchIndex):
+    """
+    Maintains the weighted `search_vector` TSVECTOR column (GIN indexed) on
+    users and jobs, and ranks matches with ts_rank.
+    """
+    name = 'postgresql'
+    maintains_documents = True
+    text_config = 'english'
+
+    DOCUMENTS = {
+        'users': """
+            setweight(to_tsvector('{config}', coalesce(users.username, '') || ' ' || coalesce(users.first_name, '') || ' '
+                || coalesce(users.last_name, '') || ' ' || coalesce(users.title, '')), 'A')
+            || setweight(to_tsvector('{config}', coalesce((
+                SELECT string_agg(skills.name, ' ') FROM skills
+                JOIN user_skills ON user_skills.skill_id = skills.id
+                WHERE user_skills.user_id = users.id), '')), 'B')
+            || setweight(to_tsvector('{config}', coalesce(users.bio, '') || ' ' || coalesce(users.location, '')), 'C')
+        """,
+        'jobs': """
+            setweight(to_tsvector('{config}', coalesce(jobs.title, '')), 'A')
+            || setweight(to_tsvector('{config}', coalesce(jobs.description, '')), 'B')
+        """
+    }
+
+    def ensure_schema(self, connection):
+        # The columns and GIN indexes are created by a migration (`flask db upgrade`)
+        missing = [table for table in self.DOCUMENTS if not connection.execute(text(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = :table AND column_name = 'search_vector'"
+        ), {'table': table}).first()]
+        if missing:
+            raise RuntimeError(f"search_vector missing on {', '.join(missing)}; run `flask db upgrade`")
+
+    def backfill(self, connection):
+        for table in self.DOCUMENTS:
+            document = self.DOCUMENTS[table].format(config=self.text_config)
+            result = connection.execute(text(f"UPDATE {table} SET search_vector = {document} WHERE search_vector IS NULL"))
+            if result.rowcount:
+                logger.info(f"Indexed {result.rowcount} {table} for search")
+
+    def reindex(self, connection, table, ids=None):
+        document = self.DOCUMENTS[table].format(config=self.text_config)
+        statement = f"UPDATE {table} SET search_vector = {document}"
+        if ids is None:
+            connection.execute(text(statement))
+        else:
+            connection.execute(
+                text(statement + f" WHERE {table}.id IN :ids").bindparams(bindparam('ids', expanding=True)),
+                {'ids': list(ids)}
+            )
+
+    def delete(self, connection, table, ids):
+        # The document lives on the row itself and goes away with it
+        pass
+
+    def search(self, query, model, term):
+        tokens = _search_tokens(term)
+        if not tokens:
+            return query, None
+        ts_query = func.to_tsquery(self.text_config, ' & '.join(f"{token}:*" for token in tokens))
+        vector = literal_column(f"{model.__tablename__}.search_vector")
+        query = query.filter(vector.op('@@')(ts_query))
+        return query, func.ts_rank(vector, ts_query).desc()
+
+class SQLiteSearchIndex(SearchIndex):
+    """
+    Maintains FTS5 shadow tables (users_fts, jobs_fts) keyed by the source
+    row id, and ranks matches with bm25.
+    """
+    name = 'sqlite'
+    maintains_documents = True
+
+    COLUMNS = {
+        'users': ('name', 'skills', 'details'),
+        'jobs': ('title', 'description')
+    }
+
+    # bm25 weights, one per column above
+    WEIGHTS = {
+        'users': (10.0, 5.0, 1.0),
+        'jobs': (10.0, 2.0)
+    }
+
+    DOCUMENTS = {
+        'users': """
+            SELECT users.id,
+                coalesce(users.username, '') || ' ' || coalesce(users.first_name, '') || ' '
+                    || coalesce(users.last_name, '') || ' ' || coalesce(users.title, ''),
+                coalesce((SELECT group_concat(skills.name, ' ') FROM skills
+                    JOIN user_skills ON user_skills.skill_id = skills.id
+                    WHERE user_skills.user_id = users.id), ''),
+                coalesce(users.bio, '') || ' ' || coalesce(users.location, '')
+            FROM users
+        """,
+        'jobs': """
+            SELECT jobs.id, coalesce(jobs.title, ''), coalesce(jobs.description, '')
+            FROM jobs
+        """
+    }
+
+    def ensure_schema(self, connection):
+        for table, columns in self.COLUMNS.items():
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({', '.join(columns)}, tokenize='unicode61')"
+            ))
+
+    def backfill(self, connection):
+        for table in self.COLUMNS:
+            indexed = connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table}_fts)")).scalar()
+            if not indexed and connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table})")).scalar():
+                self.reindex(connection, table)
+                logger.info(f"Built the {table} search index")
+
+    def reindex(self, connection, table, ids=None):
+        columns = ', '.join(('rowid',) + self.COLUMNS[table])
+        insert = f"INSERT INTO {table}_fts ({columns}) {self.DOCUMENTS[table]}"
+        if ids is None:
+            connection.execute(text(f"DELETE FROM {table}_fts"))
+            connection.execute(text(insert))
+        else:
+            ids = list(ids)
+            self.delete(connection, table, ids)
+            connection.execute(
+                text(insert + f" WHERE {table}.id IN :ids").bindparams(bindparam('ids', expanding=True)),
+                {'ids': ids}
+            )
+
+    def delete(self, connection, table, ids):
+        connection.execute(
+            text(f"DELETE FROM {table}_fts WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True)),
+            {'ids': list(ids)}
+        )
+
+    def search(self, query, model, term):
+        tokens = _search_tokens(term)
+        if not tokens:
+            return query, None
+        table = model.__tablename__
+        # Quote every token so user input can't inject FTS5 query syntax
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(weight) for weight in self.WEIGHTS[table])
+        matches = select(
+            literal_column('rowid').label('rowid'),
+            literal_column(f"bm25({table}_fts, {weights})").label('rank')
+        ).select_from(text(f"{table}_fts")).where(
+            text(f"{table}_fts MATCH :match").bindparams(match=match)
+        ).subquery()
+        query = query.join(matches, matches.c.rowid == model.id)
+        return query, matches.c.rank.asc()
+
+BACKENDS = {
+    'postgresql': PostgresSearchIndex,
+    'sqlite': SQLiteSearchIndex,
+    'like': SearchIndex
+}
+
+def init_app(app):
+    """
+    Pick the search index backend for the configured database, make sure its
+    schema exists, index rows that have no document yet and start maintaining
+    documents on user and job writes.
+    SEARCH_INDEX_BACKEND may be 'auto' (match the database dialect), or any
+    key of BACKENDS.
+    """
+    backend = app.config.get('SEARCH_INDEX_BACKEND', 'auto')
+
+    with app.app_context():
+        if backend == 'auto':
+            backend = db.engine.dialect.name if db.engine.dialect.name in BACKENDS else 'like'
+        index = BACKENDS[backend]()
+
+        try:
+            with db.engine.begin() as connection:
+                index.ensure_schema(connection)
+                index.backfill(connection)
+        except Exception as e:
+            logger.warning(f"Search index '{index.name}' unavailable, falling back to LIKE search: {e}")
+            index = SearchIndex()
+
+    app.extensions['search_index'] = index
+
+def get_search_index():
+    """
+    Get the search index for the current app (LIKE fallback if not initialized)
+    """
+    return current_app.extensions.get('search_index') or SearchIndex()
+
+def rebuild_search_index():
+    """
+    Rebuild every indexed document from scratch (repairs drift)
+    """
+    index = get_search_index()
+    connection = db.session.connection()
+    for model in INDEXED_MODELS:
+        index.reindex(connection, model.__tablename__)
+    db.session.commit()
+
+@event.listens_for(db.session, 'after_flush')
+def _update_search_documents(session, flush_context):
+    """
+    Re-index users and jobs written in this flush, inside the same transaction
+    """
+    if not has_app_context() or 'search_index' not in current_app.extensions:
+        return
+    index = current_app.extensions['search_index']
+    if not index.maintains_documents:
+        return
+
+    changed = {model.__tablename__: set() for model in INDEXED_MODELS}
+    deleted = {model.__tablename__: set() for model in INDEXED_MODELS}
+    for obj in session.new | session.dirty:
+        if isinstance(obj, INDEXED_MODELS):
+            changed[obj.__tablename__].add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, INDEXED_MODELS):
+            deleted[obj.__tablename__].add(obj.id)
+
+    connection = session.connection()
+    for table in changed:
+        if deleted[table]:
+            index.delete(connection, table, deleted[table])
+        if changed[table] - deleted[table]:
+            index.reindex(connection, table, changed[table] - deleted[table])
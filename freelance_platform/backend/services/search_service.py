@@ -1,8 +1,23 @@
 from flask import current_app
-from sqlalchemy import or_, desc, func, text
-from models import db, User, Job, Skill, Proposal, Review
+from sqlalchemy import or_, desc, event, func, inspect, text
+from models import db, User, UserRole, Job, JobStatus, Skill, Proposal, Review
+from services.search_index import get_search_index
+from services.autocomplete_index import get_autocomplete_service
+from services.cache_versions import get_version, bump_on_commit
+from serializers import USER_FIELD_SETS, serialize_users
 from enum import Enum
 
+# Version key for the search filter metadata returned by get_search_filters
+FILTERS_CACHE_KEY = 'search_filters'
+
+# Columns whose values feed the filter metadata (skills are tracked as whole rows)
+FILTER_SOURCE_ATTRIBUTES = {
+    User: ('location', 'pricing_type')
+}
+
+# Per-process filter metadata: version -> filters
+_filters_cache = {}
+
 class SearchType(Enum):
     FREELANCER = 'freelancer'
     JOB = 'job'
@@ -14,30 +29,26 @@ class SearchService:
         """
         Search for freelancers based on various criteria
         """
-        # Base query for freelancers
-        query = User.query.filter_by(role='FREELANCER', is_active=True, email_verified=True)
+        # Base query for freelancers with an active profile
+        query = User.query.filter(User.role == UserRole.FREELANCER, User.is_active_profile)
         
-        # Text search (skills, name, etc.)
+        # Full-text search (skills, name, etc.) ranked by relevance
+        relevance = None
         if 'q' in query_params and query_params['q']:
-            search_term = f"%{query_params['q']}%"
-            query = query.filter(
-                or_(
-                    User.first_name.ilike(search_term),
-                    User.last_name.ilike(search_term),
-                    User.bio.ilike(search_term),
-                    User.title.ilike(search_term),
-                    User.skills_text.ilike(search_term)
-                )
-            )
+            query, relevance = get_search_index().search(query, User, query_params['q'])
         
         # Filter by skill
         if 'skill_id' in query_params and query_params['skill_id']:
             skill_ids = query_params['skill_id'] if isinstance(query_params['skill_id'], list) else [query_params['skill_id']]
             query = query.filter(User.skills.any(Skill.id.in_(skill_ids)))
         
-        # Filter by experience level
-        if 'experience_level' in query_params and query_params['experience_level']:
-            query = query.filter(User.experience_level == query_params['experience_level'])
+        # Filter by skill category
+        if 'category' in query_params and query_params['category']:
+            query = query.filter(User.skills.any(Skill.category == query_params['category']))
+        
+        # Filter by pricing type
+        if 'pricing_type' in query_params and query_params['pricing_type']:
+            query = query.filter(User.pricing_type == query_params['pricing_type'])
         
         # Filter by hourly rate range
         if 'min_rate' in query_params and query_params['min_rate']:
@@ -50,13 +61,11 @@ class SearchService:
         if 'location' in query_params and query_params['location']:
             query = query.filter(User.location.ilike(f"%{query_params['location']}%"))
         
-        # Filter by availability
-        if 'available' in query_params and query_params['available'] == 'true':
-            query = query.filter(User.is_available == True)
-        
-        # Sorting
-        sort_by = query_params.get('sort_by', 'rating')
-        if sort_by == 'rating':
+        # Sorting (most relevant first when searching by text)
+        sort_by = query_params.get('sort_by', 'relevance' if relevance is not None else 'rating')
+        if sort_by == 'relevance' and relevance is not None:
+            query = query.order_by(relevance)
+        elif sort_by == 'rating':
             query = query.order_by(desc(User.avg_rating))
         elif sort_by == 'hourly_rate_asc':
             query = query.order_by(User.hourly_rate)
@@ -74,8 +83,13 @@ class SearchService:
         
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
+        # 'card' returns the lean field set used by result lists
+        fields = query_params.get('fields')
+        if fields not in USER_FIELD_SETS:
+            fields = 'full'
+        
         results = {
-            'freelancers': [user.to_dict() for user in pagination.items],
+            'freelancers': serialize_users(pagination.items, fields),
             'total': pagination.total,
             'pages': pagination.pages,
             'page': page,
@@ -89,27 +103,17 @@ class SearchService:
         """
         Search for jobs based on various criteria
         """
-        # Base query for active jobs
-        query = Job.query.filter_by(status='ACTIVE')
+        # Base query for jobs open to proposals
+        query = Job.query.filter(Job.status == JobStatus.OPEN)
         
-        # Text search
+        # Full-text search ranked by relevance
+        relevance = None
         if 'q' in query_params and query_params['q']:
-            search_term = f"%{query_params['q']}%"
-            query = query.filter(
-                or_(
-                    Job.title.ilike(search_term),
-                    Job.description.ilike(search_term),
-                    Job.skills_required.ilike(search_term)
-                )
-            )
-        
-        # Filter by category
-        if 'category' in query_params and query_params['category']:
-            query = query.filter(Job.category == query_params['category'])
+            query, relevance = get_search_index().search(query, Job, query_params['q'])
         
-        # Filter by job type
-        if 'job_type' in query_params and query_params['job_type']:
-            query = query.filter(Job.job_type == query_params['job_type'])
+        # Filter by skill category
+        if 'category' in query_params and query_params['category']:
+            query = query.filter(Job.skills.any(Skill.category == query_params['category']))
         
         # Filter by skill
         if 'skill_id' in query_params and query_params['skill_id']:
@@ -123,13 +127,11 @@ class SearchService:
         if 'max_budget' in query_params and query_params['max_budget']:
             query = query.filter(Job.budget <= float(query_params['max_budget']))
         
-        # Filter by duration
-        if 'duration' in query_params and query_params['duration']:
-            query = query.filter(Job.duration == query_params['duration'])
-        
-        # Sorting
-        sort_by = query_params.get('sort_by', 'created_at')
-        if sort_by == 'created_at':
+        # Sorting (most relevant first when searching by text)
+        sort_by = query_params.get('sort_by', 'relevance' if relevance is not None else 'created_at')
+        if sort_by == 'relevance' and relevance is not None:
+            query = query.order_by(relevance)
+        elif sort_by == 'created_at':
             query = query.order_by(desc(Job.created_at))
         elif sort_by == 'budget_asc':
             query = query.order_by(Job.budget)
@@ -160,28 +162,23 @@ class SearchService:
         """
         Search for clients based on various criteria
         """
-        # Base query for clients
-        query = User.query.filter_by(role='CLIENT', is_active=True, email_verified=True)
+        # Base query for clients with an active profile
+        query = User.query.filter(User.role == UserRole.CLIENT, User.is_active_profile)
         
-        # Text search (name, company, etc.)
+        # Full-text search (name, bio, etc.) ranked by relevance
+        relevance = None
         if 'q' in query_params and query_params['q']:
-            search_term = f"%{query_params['q']}%"
-            query = query.filter(
-                or_(
-                    User.first_name.ilike(search_term),
-                    User.last_name.ilike(search_term),
-                    User.company_name.ilike(search_term),
-                    User.bio.ilike(search_term)
-                )
-            )
+            query, relevance = get_search_index().search(query, User, query_params['q'])
         
         # Filter by location
         if 'location' in query_params and query_params['location']:
             query = query.filter(User.location.ilike(f"%{query_params['location']}%"))
         
-        # Sorting
-        sort_by = query_params.get('sort_by', 'jobs_posted')
-        if sort_by == 'jobs_posted':
+        # Sorting (most relevant first when searching by text)
+        sort_by = query_params.get('sort_by', 'relevance' if relevance is not None else 'jobs_posted')
+        if sort_by == 'relevance' and relevance is not None:
+            query = query.order_by(relevance)
+        elif sort_by == 'jobs_posted':
             query = query.order_by(desc(User.jobs_posted))
         elif sort_by == 'rating':
             query = query.order_by(desc(User.avg_rating))
@@ -195,8 +192,13 @@ class SearchService:
         
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
+        # 'card' returns the lean field set used by result lists
+        fields = query_params.get('fields')
+        if fields not in USER_FIELD_SETS:
+            fields = 'full'
+        
         results = {
-            'clients': [user.to_dict() for user in pagination.items],
+            'clients': serialize_users(pagination.items, fields),
             'total': pagination.total,
             'pages': pagination.pages,
             'page': page,
@@ -205,26 +207,42 @@ class SearchService:
         
         return results
     
+    @staticmethod
+    def get_search_filters_version():
+        """
+        Get the version of the search filter metadata, bumped whenever
+        skills or user locations/pricing types change
+        """
+        return get_version(FILTERS_CACHE_KEY)
+    
     @staticmethod
     def get_search_filters():
+        """
+        Get available search filters and options, cached per version
+        """
+        version = SearchService.get_search_filters_version()
+        filters = _filters_cache.get(version)
+        if filters is None:
+            filters = SearchService._compute_search_filters()
+            _filters_cache.clear()
+            _filters_cache[version] = filters
+        return filters
+    
+    @staticmethod
+    def _compute_search_filters():
         """
         Get available search filters and options
         """
         # Get all skills
-        skills = Skill.query.all()
-        skill_options = [{'id': skill.id, 'name': skill.name} for skill in skills]
-        
-        # Job categories
-        job_categories = db.session.query(Job.category).distinct().all()
-        category_options = [category[0] for category in job_categories if category[0]]
+        skills = Skill.query.order_by(Skill.name).all()
+        skill_options = [{'id': skill.id, 'name': skill.name, 'category': skill.category} for skill in skills]
         
-        # Job types
-        job_types = db.session.query(Job.job_type).distinct().all()
-        job_type_options = [job_type[0] for job_type in job_types if job_type[0]]
+        # Skill categories (the 'category' filter for freelancers and jobs)
+        category_options = sorted({skill.category for skill in skills if skill.category})
         
-        # Experience levels
-        experience_levels = db.session.query(User.experience_level).filter(User.experience_level.isnot(None)).distinct().all()
-        experience_options = [level[0] for level in experience_levels if level[0]]
+        # Freelancer pricing types
+        pricing_types = db.session.query(User.pricing_type).filter(User.role == UserRole.FREELANCER).distinct().all()
+        pricing_type_options = sorted(pricing_type[0] for pricing_type in pricing_types if pricing_type[0])
         
         # Locations (top locations)
         locations = db.session.query(User.location, func.count(User.id).label('count')).filter(User.location.isnot(None)).group_by(User.location).order_by(text('count DESC')).limit(20).all()
@@ -232,9 +250,8 @@ class SearchService:
         
         return {
             'skills': skill_options,
-            'job_categories': category_options,
-            'job_types': job_type_options,
-            'experience_levels': experience_options,
+            'categories': category_options,
+            'pricing_types': pricing_type_options,
             'locations': location_options
         }
     
@@ -249,45 +266,30 @@ class SearchService:
         if not q or len(q) < 2:
             return {'suggestions': []}
         
-        search_term = f"%{q}%"
         limit = int(query_params.get('limit', 10))
         
-        suggestions = []
-        
-        if search_type == SearchType.FREELANCER.value:
-            # Skill name suggestions
-            skill_results = Skill.query.filter(Skill.name.ilike(search_term)).limit(limit).all()
-            suggestions.extend([skill.name for skill in skill_results])
-            
-            # Freelancer title suggestions
-            title_results = db.session.query(User.title).filter(
-                User.role == 'FREELANCER',
-                User.title.ilike(search_term)
-            ).distinct().limit(limit).all()
-            suggestions.extend([title[0] for title in title_results if title[0]])
-            
-        elif search_type == SearchType.JOB.value:
-            # Job title suggestions
-            job_results = db.session.query(Job.title).filter(
-                Job.title.ilike(search_term)
-            ).distinct().limit(limit).all()
-            suggestions.extend([title[0] for title in job_results if title[0]])
-            
-            # Job category suggestions
-            category_results = db.session.query(Job.category).filter(
-                Job.category.ilike(search_term)
-            ).distinct().limit(limit).all()
-            suggestions.extend([category[0] for category in category_results if category[0]])
-            
-        elif search_type == SearchType.CLIENT.value:
-            # Company name suggestions
-            company_results = db.session.query(User.company_name).filter(
-                User.role == 'CLIENT',
-                User.company_name.ilike(search_term)
-            ).distinct().limit(limit).all()
-            suggestions.extend([company[0] for company in company_results if company[0]])
-        
-        # Remove duplicates and limit results
-        suggestions = list(dict.fromkeys(suggestions))[:limit]
+        # Answered from the in-process suggestion index, without touching the database
+        suggestions = get_autocomplete_service().suggest(search_type, q, limit)
         
         return {'suggestions': suggestions}
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_filters_version(session, flush_context):
+    """
+    Bump the filter metadata version when a flush touches any of its sources
+    """
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Skill):
+            changed = obj in session.new or obj in session.deleted or session.is_modified(obj)
+        elif type(obj) in FILTER_SOURCE_ATTRIBUTES:
+            attributes = FILTER_SOURCE_ATTRIBUTES[type(obj)]
+            if obj in session.new or obj in session.deleted:
+                changed = any(getattr(obj, a) is not None for a in attributes)
+            else:
+                state = inspect(obj)
+                changed = any(state.attrs[a].history.has_changes() for a in attributes)
+        else:
+            continue
+        if changed:
+            bump_on_commit(session, FILTERS_CACHE_KEY)
+            return
@@ -0,0 +1,65 @@
+from sqlalchemy import case, func, select, update
+from models import db, User, Job, JobStatus, Review
+
+class UserStatsService:
+    """
+    Keeps the denormalized User counters (avg_rating, rating_count,
+    jobs_posted, jobs_completed) in step with reviews and jobs. Each method
+    issues one atomic UPDATE in the caller's transaction; the caller commits.
+    """
+
+    @staticmethod
+    def record_job_posted(client_id):
+        UserStatsService._update(client_id, {
+            User.jobs_posted: func.coalesce(User.jobs_posted, 0) + 1
+        })
+
+    @staticmethod
+    def record_job_deleted(job):
+        UserStatsService._update(job.client_id, {
+            User.jobs_posted: case((User.jobs_posted > 0, User.jobs_posted - 1), else_=0)
+        })
+        if job.status == JobStatus.COMPLETED and job.freelancer_id:
+            UserStatsService._update(job.freelancer_id, {
+                User.jobs_completed: case((User.jobs_completed > 0, User.jobs_completed - 1), else_=0)
+            })
+
+    @staticmethod
+    def record_job_completed(freelancer_id):
+        UserStatsService._update(freelancer_id, {
+            User.jobs_completed: func.coalesce(User.jobs_completed, 0) + 1
+        })
+
+    @staticmethod
+    def record_review(reviewee_id, rating):
+        # Both SET expressions read the pre-update row, so the running average stays exact
+        count = func.coalesce(User.rating_count, 0)
+        UserStatsService._update(reviewee_id, {
+            User.avg_rating: (func.coalesce(User.avg_rating, 0.0) * count + float(rating)) / (count + 1),
+            User.rating_count: count + 1
+        })
+
+    @staticmethod
+    def recompute_all():
+        """
+        Rebuild every counter from reviews and jobs in one set-based UPDATE
+        """
+        db.session.execute(
+            update(User).values(
+                avg_rating=select(func.avg(Review.rating)).where(
+                    Review.reviewee_id == User.id).scalar_subquery(),
+                rating_count=select(func.count(Review.id)).where(
+                    Review.reviewee_id == User.id).scalar_subquery(),
+                jobs_posted=select(func.count(Job.id)).where(
+                    Job.client_id == User.id).scalar_subquery(),
+                jobs_completed=select(func.count(Job.id)).where(
+                    Job.freelancer_id == User.id, Job.status == JobStatus.COMPLETED).scalar_subquery()
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    @staticmethod
+    def _update(user_id, values):
+        db.session.execute(
+            update(User).where(User.id == user_id).values(values).execution_options(synchronize_session=False)
+        )
@@ -0,0 +1,139 @@
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from flask_jwt_extended import create_access_token
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app import create_app
+from models import db, User, UserRole, Job, Transaction, TransactionStatus
+from services import provider_client, provider_tokens
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    MAIL_SERVER = '127.0.0.1'
+    MAIL_USE_TLS = False
+    MAIL_USERNAME = None
+    EMAIL_OUTBOX_WORKER_THREAD = False
+
+
+@pytest.fixture
+def app(tmp_path):
+    config = type('Config', (TestConfig,), {'AUTOCOMPLETE_SNAPSHOT_PATH': str(tmp_path / 'autocomplete.snapshot')})
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def make_user(app):
+    """
+    Factory adding a user to the session; `fields` override the model columns
+    """
+    def make(username, role=UserRole.FREELANCER, **fields):
+        user = User(username=username, email=f'{username}@example.com', role=role, **fields)
+        user.set_password('password')
+        db.session.add(user)
+        return user
+    return make
+
+
+@pytest.fixture
+def make_transaction(make_user):
+    """
+    Factory adding a client, a freelancer, a job and a transaction between them
+    to the session (flushed, not committed); returns the transaction
+    """
+    counter = itertools.count(1)
+
+    def make(status=TransactionStatus.PENDING, amount=100, platform_fee=10):
+        n = next(counter)
+        client = make_user(f'client{n}', UserRole.CLIENT)
+        freelancer = make_user(f'freelancer{n}', UserRole.FREELANCER)
+        job = Job(title='Logo', description='Design a logo', budget=amount, client=client)
+        transaction = Transaction(
+            job=job, payer=client, payee=freelancer, amount=amount, platform_fee=platform_fee,
+            status=status, transaction_reference=f'FPSL-TEST-{n}'
+        )
+        db.session.add(transaction)
+        db.session.flush()
+        return transaction
+    return make
+
+
+@pytest.fixture
+def auth_headers(app):
+    """
+    Factory for the Authorization header of a committed user
+    """
+    def make(user):
+        return {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+    return make
+
+
+class MockProvider(BaseHTTPRequestHandler):
+    """
+    Local payment provider stand-in. `mode` is 'ok', 'slow' (answers after
+    the client's read timeout), 'drop' (closes the connection unanswered) or
+    'reject' (answers with `reject_status`).
+    """
+    protocol_version = 'HTTP/1.1'
+    mode = 'ok'
+    reject_status = 400
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path == '/token':
+            return self._reply(200, {'access_token': 'test-token', 'expires_in': 3600})
+        MockProvider.requests.append(self.path)
+        if self.mode == 'slow':
+            time.sleep(0.5)
+        if self.mode == 'drop':
+            self.close_connection = True
+            return
+        if self.mode == 'reject':
+            return self._reply(self.reject_status, {'error': 'Rejected'})
+        self._reply(200, {'status': 'success', 'transaction_id': f'OM_{len(MockProvider.requests)}'})
+
+
+@pytest.fixture
+def provider(app, monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(MockProvider, 'mode', 'ok')
+    monkeypatch.setattr(MockProvider, 'reject_status', 400)
+    monkeypatch.setattr(MockProvider, 'requests', [])
+    # Clients and token managers are cached per process; start each test fresh
+    monkeypatch.setattr(provider_client, '_clients', {})
+    monkeypatch.setattr(provider_tokens, '_managers', {})
+    app.config.update(
+        ORANGE_MONEY_LIVE=True,
+        ORANGE_MONEY_API_URL=f'http://127.0.0.1:{server.server_port}',
+        PROVIDER_HTTP_READ_TIMEOUT=0.2
+    )
+    yield MockProvider
+    server.shutdown()
+    server.server_close()
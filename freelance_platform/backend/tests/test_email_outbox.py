@@ -0,0 +1,146 @@
+import socket
+from datetime import datetime, timedelta
+import pytest
+
+from models import db, OutboundEmail
+from services.email_outbox import EmailOutboxWorker, enqueue_email
+
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+
+
+class RecordingHandler:
+    """
+    Local SMTP stand-in: records delivered messages and refuses recipients
+    listed in `refuse` with the given reply.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.refuse = {}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuse:
+            return self.refuse[address]
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.content))
+        self.sessions.add(id(session))
+        return '250 Message accepted for delivery'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(app):
+    handler = RecordingHandler()
+    port = _free_port()
+    controller = aiosmtpd_controller.Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    app.config['MAIL_PORT'] = port
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def worker(app, smtp):
+    worker = EmailOutboxWorker(app)
+    yield worker
+    worker.connection.close()
+
+
+def _queue(*recipients):
+    emails = [enqueue_email(recipient, 'Hello', '<p>Hi</p>') for recipient in recipients]
+    db.session.commit()
+    return [email.id for email in emails]
+
+
+def test_claim_does_not_hand_out_claimed_emails(app, worker):
+    _queue('a@example.com', 'b@example.com')
+
+    claimed = worker.claim_batch()
+    assert [email.status for email in claimed] == ['sending', 'sending']
+    assert len({email.claim_token for email in claimed}) == 1
+
+    assert EmailOutboxWorker(app).claim_batch() == []
+
+
+def test_expired_claim_is_taken_over(app, worker):
+    ids = _queue('a@example.com')
+    claimed = worker.claim_batch()
+    first_token = claimed[0].claim_token
+    claimed[0].claimed_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    reclaimed = EmailOutboxWorker(app).claim_batch()
+    assert [email.id for email in reclaimed] == ids
+    assert reclaimed[0].claim_token != first_token
+
+
+def test_send_delivers_batch_over_one_session(app, worker, smtp):
+    ids = _queue('a@example.com', 'b@example.com', 'c@example.com')
+
+    assert worker.run_once() == 3
+
+    assert [rcpt for rcpt, _ in smtp.messages] == [['a@example.com'], ['b@example.com'], ['c@example.com']]
+    assert len(smtp.sessions) == 1
+    for email_id in ids:
+        email = db.session.get(OutboundEmail, email_id)
+        assert email.status == 'sent'
+        assert email.sent_at is not None
+        assert email.claim_token is None
+    assert worker.run_once() == 0
+
+
+def test_temporary_refusal_is_retried_with_backoff(app, worker, smtp):
+    smtp.refuse['a@example.com'] = '451 Try again later'
+    [email_id] = _queue('a@example.com')
+
+    worker.run_once()
+
+    email = db.session.get(OutboundEmail, email_id)
+    assert email.status == 'pending'
+    assert email.attempts == 1
+    assert email.next_attempt_at > datetime.utcnow()
+    assert '451' in email.last_error
+    # Not due yet
+    assert worker.run_once() == 0
+
+    del smtp.refuse['a@example.com']
+    email.next_attempt_at = datetime.utcnow()
+    db.session.commit()
+    assert worker.run_once() == 1
+    assert db.session.get(OutboundEmail, email_id).status == 'sent'
+    assert len(smtp.messages) == 1
+
+
+def test_permanent_refusal_fails_without_retry(app, worker, smtp):
+    smtp.refuse['gone@example.com'] = '550 No such user'
+    [failed_id, sent_id] = _queue('gone@example.com', 'b@example.com')
+
+    worker.run_once()
+
+    assert db.session.get(OutboundEmail, failed_id).status == 'failed'
+    assert db.session.get(OutboundEmail, sent_id).status == 'sent'
+
+
+def test_gives_up_after_max_attempts(app, worker, smtp):
+    smtp.refuse['a@example.com'] = '451 Try again later'
+    worker.max_attempts = 2
+    [email_id] = _queue('a@example.com')
+
+    for _ in range(2):
+        email = db.session.get(OutboundEmail, email_id)
+        email.next_attempt_at = datetime.utcnow()
+        db.session.commit()
+        worker.run_once()
+
+    email = db.session.get(OutboundEmail, email_id)
+    assert email.status == 'failed'
+    assert email.attempts == 2
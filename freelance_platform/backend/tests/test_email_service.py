@@ -0,0 +1,28 @@
+from models import db, UserRole, OutboundEmail
+
+
+def test_registration_queues_welcome_email(app):
+    response = app.test_client().post('/api/auth/register', json={
+        'username': 'aminata', 'email': 'aminata@example.com', 'password': 'password', 'role': 'freelancer'
+    })
+
+    assert response.status_code == 201
+    email = OutboundEmail.query.one()
+    assert (email.recipient, email.status) == ('aminata@example.com', 'pending')
+    assert 'FreelancePro SL' in email.subject
+
+
+def test_admin_message_queues_email(app, make_user, auth_headers):
+    admin = make_user('admin', UserRole.ADMIN)
+    recipient = make_user('kadiatu')
+    db.session.commit()
+
+    response = app.test_client().post('/api/admin/messages', headers=auth_headers(admin), json={
+        'recipient_id': recipient.id, 'subject': 'Profile review', 'message': 'Please add a <portfolio>.'
+    })
+
+    assert response.status_code == 201
+    email = OutboundEmail.query.one()
+    assert email.recipient == 'kadiatu@example.com'
+    assert 'Profile review' in email.subject
+    assert '&lt;portfolio&gt;' in email.body
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from models import db, UserRole, UserEvent
+from services import event_stream
+
+
+def _poll(client, headers, since=None):
+    query = '' if since is None else f'?since={since}&timeout=30'
+    response = client.get(f'/api/events/poll{query}', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_poll_resumes_from_cursor(app, make_user, auth_headers):
+    admin = make_user('admin', UserRole.ADMIN)
+    user = make_user('fatmata')
+    db.session.commit()
+    client, headers = app.test_client(), auth_headers(user)
+
+    since = _poll(client, headers)['since']
+    response = client.post('/api/admin/messages', headers=auth_headers(admin), json={
+        'recipient_id': user.id, 'subject': 'Welcome', 'message': 'Hello'
+    })
+    assert response.status_code == 201
+
+    # Sync workers answer at once rather than waiting out the timeout
+    polled = _poll(client, headers, since)
+    assert [event['event'] for event in polled['events']] == ['admin_message']
+    assert polled['events'][0]['data']['subject'] == 'Welcome'
+    assert _poll(client, headers, polled['since']) == {'events': [], 'since': polled['since']}
+
+
+def test_event_written_with_transaction(app, make_user):
+    user = make_user('fatmata')
+    db.session.commit()
+
+    event_stream.publish_on_commit(user.id, 'payout', {'status': 'paid'})
+    db.session.rollback()
+    assert UserEvent.query.count() == 0
+
+    event_stream.publish_on_commit(user.id, 'payout', {'status': 'paid'})
+    db.session.commit()
+    assert event_stream.fetch_events(user.id, 0) == [
+        {'id': UserEvent.query.one().id, 'event': 'payout', 'data': {'status': 'paid'}}
+    ]
+
+
+def test_stream_sends_events_after_cursor(app, make_user):
+    user = make_user('fatmata')
+    db.session.commit()
+    for status in ('batched', 'paid'):
+        event_stream.publish_on_commit(user.id, 'payout', {'status': status})
+    db.session.commit()
+    first, second = UserEvent.query.order_by(UserEvent.id).all()
+
+    chunks = list(event_stream.stream(app, user.id, first.id, max_seconds=0))
+
+    assert chunks == ['retry: 3000\n\n', f'id: {second.id}\nevent: payout\ndata: {{"status": "paid"}}\n\n']
+
+
+def test_prune_events(app, make_user):
+    user = make_user('fatmata')
+    db.session.flush()
+    db.session.add_all([
+        UserEvent(user_id=user.id, event_type='payout', data={}, created_at=datetime.utcnow() - timedelta(days=2)),
+        UserEvent(user_id=user.id, event_type='payout', data={}),
+    ])
+    db.session.commit()
+
+    assert event_stream.prune_events(86400) == 1
+    assert UserEvent.query.count() == 1
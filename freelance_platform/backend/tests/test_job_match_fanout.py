@@ -0,0 +1,60 @@
+import pytest
+
+from models import db, User, Skill, UserRole, JobMatchFanOut, Notification, OutboundEmail
+from services import job_match_fanout
+from services.job_match_fanout import JobMatchFanOutWorker
+
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    """
+    Fan-outs handed to a background thread; the tests run them inline instead
+    """
+    ids = []
+    monkeypatch.setattr(job_match_fanout, 'dispatch', ids.append)
+    return ids
+
+
+@pytest.fixture
+def client_headers(make_user, auth_headers):
+    python, design = Skill(name='Python'), Skill(name='Design')
+    make_user('match', skills=[python])
+    make_user('muted', skills=[python, design], notification_preferences={'job_matches': False})
+    make_user('disabled', skills=[python], is_disabled=True)
+    make_user('designer', skills=[design])
+    client = make_user('client', UserRole.CLIENT, skills=[python])
+    db.session.commit()
+    return auth_headers(client)
+
+
+def _post_job(app, headers, skills):
+    response = app.test_client().post('/api/marketplace/jobs', json={
+        'title': 'API', 'description': 'Build an API', 'budget': 500, 'skills': skills
+    }, headers=headers)
+    assert response.status_code == 201
+    return response.json['job']
+
+
+def test_posting_a_job_notifies_matching_freelancers(app, client_headers, dispatched):
+    job = _post_job(app, client_headers, ['Python'])
+
+    fanout = JobMatchFanOut.query.one()
+    assert job['skills'] == ['Python']
+    assert dispatched == [fanout.id]
+
+    JobMatchFanOutWorker(app).run_once(dispatched)
+
+    db.session.expire_all()
+    fanout = db.session.get(JobMatchFanOut, fanout.id)
+    assert (fanout.status, fanout.notified) == ('completed', 2)
+    notified = {n.user_id for n in Notification.query.filter_by(reference_id=job['id'])}
+    assert notified == {user.id for user in User.query.filter(User.username.in_(['match', 'muted']))}
+    assert [email.recipient for email in OutboundEmail.query] == ['match@example.com']
+
+
+def test_job_without_skills_has_no_fan_out(app, client_headers, dispatched):
+    _post_job(app, client_headers, [])
+
+    assert JobMatchFanOut.query.count() == 0
+    assert dispatched == []
+
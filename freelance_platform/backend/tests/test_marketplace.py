@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import event
+
+from models import db, User, UserRole, Job, JobStatus, Notification, NotificationType, OutboundEmail
+
+
+@pytest.fixture
+def job(make_user):
+    client = make_user('client', UserRole.CLIENT)
+    make_user('freelancer')
+    job = Job(title='Logo', description='Design a logo', budget=100, client=client)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+@pytest.fixture
+def notification_inserts(app):
+    """
+    Number of INSERT statements executed against the notifications table
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO notifications'):
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _user(username):
+    return User.query.filter_by(username=username).one()
+
+
+def test_proposal_notifies_the_client(app, job, auth_headers):
+    response = app.test_client().post(f'/api/marketplace/jobs/{job.id}/proposals', json={
+        'cover_letter': 'I can do this', 'bid_amount': 90
+    }, headers=auth_headers(_user('freelancer')))
+
+    assert response.status_code == 201
+    notification = Notification.query.one()
+    assert (notification.user_id, notification.type) == (job.client_id, NotificationType.NEW_PROPOSAL)
+    assert notification.reference_id == response.json['proposal']['id']
+    assert _user('client').unread_notifications == 1
+    assert [email.recipient for email in OutboundEmail.query] == ['client@example.com']
+
+
+def test_completing_a_job_notifies_both_parties_in_one_insert(app, job, auth_headers, notification_inserts):
+    job.freelancer_id = _user('freelancer').id
+    job.status = JobStatus.IN_PROGRESS
+    db.session.commit()
+
+    response = app.test_client().put(f'/api/marketplace/jobs/{job.id}', json={'status': 'completed'},
+                                     headers=auth_headers(_user('client')))
+
+    assert response.status_code == 200
+    assert len(notification_inserts) == 1
+    assert sorted(n.user_id for n in Notification.query) == sorted([job.client_id, job.freelancer_id])
+    assert {email.recipient for email in OutboundEmail.query} == {'client@example.com', 'freelancer@example.com'}
+
+    # Saving the completed job again sends nothing more
+    app.test_client().put(f'/api/marketplace/jobs/{job.id}', json={'status': 'completed'},
+                          headers=auth_headers(_user('client')))
+    assert Notification.query.count() == 2
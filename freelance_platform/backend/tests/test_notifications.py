@@ -0,0 +1,77 @@
+import pytest
+
+from models import db, NotificationType, Notification
+from services.notification_service import NotificationService
+
+
+@pytest.fixture
+def user(make_user):
+    user = make_user('freelancer')
+    db.session.commit()
+    return user
+
+
+def _unread(app, headers):
+    response = app.test_client().get('/api/v2/notifications/unread-count', headers=headers)
+    assert response.status_code == 200
+    return response.json['unread_count']
+
+
+def _notify(user, count):
+    for n in range(count):
+        NotificationService.add_notification(user.id, NotificationType.NEW_JOB_MATCH, f'Job {n}')
+    db.session.commit()
+
+
+def test_queued_notifications_are_written_and_counted_on_commit(app, user, auth_headers):
+    _notify(user, 3)
+
+    assert Notification.query.filter_by(user_id=user.id).count() == 3
+    assert _unread(app, auth_headers(user)) == 3
+
+
+def test_rollback_discards_queued_notifications(app, user, auth_headers):
+    NotificationService.add_notification(user.id, NotificationType.WELCOME, 'Welcome')
+    db.session.rollback()
+    db.session.commit()
+
+    assert Notification.query.count() == 0
+    assert _unread(app, auth_headers(user)) == 0
+
+
+def test_reading_and_deleting_update_the_counter(app, user, auth_headers):
+    _notify(user, 3)
+    headers = auth_headers(user)
+    client = app.test_client()
+    first, second, third = Notification.query.order_by(Notification.id).all()
+
+    assert client.post(f'/api/v2/notifications/{first.id}/read', headers=headers).status_code == 200
+    # Reading it again does not decrement twice
+    assert client.post(f'/api/v2/notifications/{first.id}/read', headers=headers).status_code == 200
+    assert _unread(app, headers) == 2
+
+    assert client.delete(f'/api/v2/notifications/{second.id}', headers=headers).status_code == 200
+    assert _unread(app, headers) == 1
+
+    assert client.post('/api/v2/notifications/read-all', headers=headers).status_code == 200
+    assert _unread(app, headers) == 0
+
+
+def test_recompute_repairs_drift(app, user):
+    _notify(user, 2)
+    user.unread_notifications = 7
+    db.session.commit()
+
+    NotificationService.recompute_unread_counts()
+
+    assert NotificationService.get_unread_count(user.id) == 2
+
+
+def test_list_reports_the_unread_count(app, user, auth_headers):
+    _notify(user, 2)
+
+    response = app.test_client().get('/api/v2/notifications?read=false', headers=auth_headers(user))
+
+    results = response.json['results']
+    assert results['unread_count'] == 2
+    assert [n['type'] for n in results['notifications']] == ['NEW_JOB_MATCH', 'NEW_JOB_MATCH']
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from models import db, Transaction
+from pagination import apply_date_range
+
+
+def _created(make_transaction, *timestamps):
+    for timestamp in timestamps:
+        make_transaction().created_at = datetime.fromisoformat(timestamp)
+    db.session.commit()
+
+
+def _in_range(start=None, end=None):
+    query = apply_date_range(Transaction.query, Transaction.created_at, start, end)
+    return sorted(t.created_at.isoformat() for t in query)
+
+
+def test_date_only_end_includes_the_whole_day(make_transaction):
+    _created(make_transaction, '2024-05-31T00:00:00', '2024-05-31T23:59:59', '2024-06-01T00:00:00')
+
+    assert _in_range(end='2024-05-31') == ['2024-05-31T00:00:00', '2024-05-31T23:59:59']
+
+
+def test_end_with_time_is_inclusive(make_transaction):
+    _created(make_transaction, '2024-05-31T12:00:00', '2024-05-31T12:00:01')
+
+    assert _in_range(start='2024-05-31', end='2024-05-31T12:00:00') == ['2024-05-31T12:00:00']
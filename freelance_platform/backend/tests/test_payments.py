@@ -0,0 +1,38 @@
+from sqlalchemy import insert
+
+from models import db, TransactionStatus, Payout
+from services import payout_batcher
+
+
+def _release(app, transaction, headers):
+    return app.test_client().post(f'/api/payments/release/{transaction.id}', headers=headers)
+
+
+def test_release_records_one_payout(app, make_transaction, auth_headers):
+    transaction = make_transaction(TransactionStatus.COMPLETED)
+    db.session.commit()
+    headers = auth_headers(transaction.payer)
+
+    assert _release(app, transaction, headers).status_code == 202
+    assert _release(app, transaction, headers).status_code == 400
+    assert Payout.query.count() == 1
+
+
+def test_concurrent_release_is_a_conflict(app, make_transaction, auth_headers, monkeypatch):
+    transaction = make_transaction(TransactionStatus.COMPLETED)
+    db.session.commit()
+    headers = auth_headers(transaction.payer)
+    record_payout = payout_batcher.record_payout
+
+    def record_after_concurrent_release(transaction):
+        # Another request records the payout between the check and the insert
+        db.session.execute(insert(Payout).values(
+            transaction_id=transaction.id, freelancer_id=transaction.payee_id, amount=90
+        ))
+        return record_payout(transaction)
+
+    monkeypatch.setattr(payout_batcher, 'record_payout', record_after_concurrent_release)
+    response = _release(app, transaction, headers)
+
+    assert response.status_code == 409
+    assert Payout.query.count() == 0
@@ -0,0 +1,69 @@
+import pytest
+
+from models import db, TransactionStatus, Payout, PayoutTransfer
+from services.payout_batcher import PayoutBatcher, record_payout, requeue_transfers
+
+
+@pytest.fixture
+def transfer_id(app, make_transaction):
+    record_payout(make_transaction(TransactionStatus.COMPLETED))
+    db.session.commit()
+
+    assert PayoutBatcher(app).coalesce() == 1
+    return PayoutTransfer.query.one().id
+
+
+def test_transfer_claimed_by_one_worker(app, transfer_id):
+    first, second = PayoutBatcher(app), PayoutBatcher(app)
+
+    assert [transfer.id for transfer in first.claim()] == [transfer_id]
+    assert second.claim() == []
+
+
+@pytest.mark.parametrize('status', ['failed', 'unconfirmed'])
+def test_requeue_transfer(app, transfer_id, status):
+    transfer = db.session.get(PayoutTransfer, transfer_id)
+    transfer.status = status
+    transfer.attempts = 5
+    Payout.query.update({'status': 'failed' if status == 'failed' else 'batched'})
+    db.session.commit()
+
+    assert requeue_transfers([transfer_id]) == [transfer_id]
+    db.session.expire_all()
+    transfer = db.session.get(PayoutTransfer, transfer_id)
+    assert (transfer.status, transfer.attempts) == ('queued', 0)
+    assert Payout.query.one().status == 'batched'
+    assert [t.id for t in PayoutBatcher(app).claim()] == [transfer_id]
+
+
+def test_requeue_ignores_paid_transfer(app, transfer_id):
+    db.session.get(PayoutTransfer, transfer_id).status = 'paid'
+    db.session.commit()
+
+    assert requeue_transfers([transfer_id]) == []
+    db.session.expire_all()
+    assert db.session.get(PayoutTransfer, transfer_id).status == 'paid'
+
+
+def _submit(app, transfer_id):
+    PayoutBatcher(app).run_once()
+    db.session.expire_all()
+    return db.session.get(PayoutTransfer, transfer_id)
+
+
+def test_rejected_transfer_fails(app, provider, transfer_id):
+    provider.mode = 'reject'
+    transfer = _submit(app, transfer_id)
+
+    assert (transfer.status, transfer.attempts) == ('failed', 1)
+    assert Payout.query.one().status == 'failed'
+    assert provider.requests == ['/payouts/bulk']
+
+
+def test_rate_limited_transfer_is_retried(app, provider, transfer_id):
+    provider.mode = 'reject'
+    provider.reject_status = 429
+    transfer = _submit(app, transfer_id)
+
+    assert (transfer.status, transfer.attempts) == ('queued', 1)
+    assert Payout.query.one().status == 'batched'
@@ -0,0 +1,84 @@
+import socket
+
+import pytest
+import requests
+
+from models import db, TransactionStatus, DepositInitiation
+from services.deposit_initiation import DepositInitiationWorker, queue_deposit
+from services.provider_client import ProviderClient, ProviderUnreachable
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _client(base_url):
+    return ProviderClient('test', base_url, connect_timeout=0.5, read_timeout=0.2, backoff_factor=0)
+
+
+def test_connection_refused_is_unreachable():
+    client = _client(f'http://127.0.0.1:{_free_port()}')
+    with pytest.raises(ProviderUnreachable):
+        client.post('/payments', json={})
+
+
+def test_read_timeout_is_not_unreachable(app, provider):
+    provider.mode = 'slow'
+    with pytest.raises(requests.ReadTimeout):
+        _client(app.config['ORANGE_MONEY_API_URL']).post('/payments', json={})
+    # A POST is never retried once sent
+    assert provider.requests == ['/payments']
+
+
+def test_dropped_connection_is_not_unreachable(app, provider):
+    provider.mode = 'drop'
+    with pytest.raises(requests.ConnectionError) as excinfo:
+        _client(app.config['ORANGE_MONEY_API_URL']).post('/payments', json={})
+    assert not isinstance(excinfo.value, ProviderUnreachable)
+    assert provider.requests == ['/payments']
+
+
+def _queue_deposit(make_transaction):
+    initiation = queue_deposit(make_transaction(), '+23276000000', 'Logo')
+    db.session.commit()
+    return initiation.id
+
+
+def _submit(app, initiation_id):
+    DepositInitiationWorker(app).run_once([initiation_id])
+    db.session.expire_all()
+    return db.session.get(DepositInitiation, initiation_id)
+
+
+def test_deposit_submitted(app, provider, make_transaction):
+    initiation = _submit(app, _queue_deposit(make_transaction))
+    assert initiation.status == 'submitted'
+    assert initiation.transaction.orange_money_transaction_id == 'OM_1'
+
+
+def test_deposit_retried_when_provider_unreachable(app, provider, make_transaction):
+    app.config['ORANGE_MONEY_API_URL'] = f'http://127.0.0.1:{_free_port()}'
+    initiation = _submit(app, _queue_deposit(make_transaction))
+    assert initiation.status == 'queued'
+    assert initiation.attempts == 1
+    assert 'unreachable' in initiation.last_error
+    assert initiation.transaction.status == TransactionStatus.PENDING
+
+
+def test_deposit_unconfirmed_after_read_timeout(app, provider, make_transaction):
+    provider.mode = 'slow'
+    initiation = _submit(app, _queue_deposit(make_transaction))
+    assert initiation.status == 'unconfirmed'
+    assert provider.requests == ['/payments']
+
+
+def test_deposit_claimed_by_one_worker(app, provider, make_transaction):
+    initiation_id = _queue_deposit(make_transaction)
+    first, second = DepositInitiationWorker(app), DepositInitiationWorker(app)
+
+    claimed = first.claim()
+    assert [initiation.id for initiation in claimed] == [initiation_id]
+    assert second.claim() == []
+    assert second.claim([initiation_id]) == []
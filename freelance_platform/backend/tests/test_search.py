@@ -0,0 +1,86 @@
+import pytest
+
+from models import db, UserRole, Job, JobStatus, Skill
+from services.search_service import SearchService
+
+
+@pytest.fixture
+def people(make_user):
+    design = Skill(name='Logo Design', category='Design')
+    make_user('aminata', title='Designer', skills=[design])
+    make_user('ibrahim', is_suspended=True)
+    make_user('mariama', UserRole.CLIENT)
+    make_user('sorie', UserRole.CLIENT, is_disabled=True)
+    db.session.commit()
+    return design
+
+
+def test_search_freelancers_lists_active_profiles(people):
+    results = SearchService.search_freelancers({})
+    assert [user['username'] for user in results['freelancers']] == ['aminata']
+
+    assert SearchService.search_freelancers({'category': 'Design'})['total'] == 1
+    assert SearchService.search_freelancers({'category': 'Writing'})['total'] == 0
+
+
+def test_search_clients_lists_active_profiles(people):
+    results = SearchService.search_clients({})
+    assert [user['username'] for user in results['clients']] == ['mariama']
+
+
+def test_search_jobs_lists_open_jobs(people, make_user):
+    client = make_user('kadiatu', UserRole.CLIENT)
+    for title, status in (('Logo', JobStatus.OPEN), ('Flyer', JobStatus.COMPLETED)):
+        db.session.add(Job(title=title, description='Design work', budget=50, client=client,
+                           status=status, skills=[people]))
+    db.session.commit()
+
+    results = SearchService.search_jobs({'category': 'Design'})
+    assert [job['title'] for job in results['jobs']] == ['Logo']
+
+
+def test_autocomplete_suggests_committed_terms(app, people, make_user):
+    db.session.add(Job(title='Logo refresh', description='Design work', budget=50,
+                       client=make_user('kadiatu', UserRole.CLIENT)))
+    db.session.commit()
+    client = app.test_client()
+
+    def suggest(q, search_type):
+        response = client.get(f'/api/v2/search/autocomplete?q={q}&type={search_type}')
+        assert response.status_code == 200
+        return response.get_json()['suggestions']['suggestions']
+
+    assert suggest('log', 'freelancer') == ['Logo Design']
+    assert suggest('log', 'job') == ['Logo refresh']
+    assert suggest('des', 'freelancer') == ['Logo Design', 'Designer']
+
+
+def test_filters_answer_304_until_a_source_changes(app, people, make_user):
+    client = app.test_client()
+    response = client.get('/api/v2/search/filters')
+    assert response.status_code == 200
+    assert response.get_json()['filters']['categories'] == ['Design']
+    etag = response.headers['ETag']
+
+    assert client.get('/api/v2/search/filters', headers={'If-None-Match': etag}).status_code == 304
+
+    # Columns outside the filter metadata leave the version alone
+    musa = make_user('musa')
+    db.session.commit()
+    etag = client.get('/api/v2/search/filters').headers['ETag']
+    musa.bio = 'Brand designer'
+    db.session.commit()
+    assert client.get('/api/v2/search/filters', headers={'If-None-Match': etag}).status_code == 304
+
+    db.session.add(Skill(name='Copywriting', category='Writing'))
+    db.session.commit()
+    response = client.get('/api/v2/search/filters', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['filters']['categories'] == ['Design', 'Writing']
+    etag = response.headers['ETag']
+
+    musa.location = 'Bo'
+    db.session.commit()
+    response = client.get('/api/v2/search/filters', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'Bo' in response.get_json()['filters']['locations']
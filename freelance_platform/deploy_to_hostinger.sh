@@ -187,10 +187,30 @@ ExecStop=/bin/kill -s TERM \$MAINPID
 WantedBy=multi-user.target
 EOF
 
+# Background workers (email delivery and other queued jobs) run beside Gunicorn
+cat > ~/freelanceprosl-workers.service << EOF
+[Unit]
+Description=FreelancePro SL background workers
+After=network.target
+
+[Service]
+User=$SSH_USER
+Group=$SSH_USER
+WorkingDirectory=/home/$SSH_USER/freelanceprosl
+Environment=FLASK_APP=wsgi.py
+ExecStart=/home/$SSH_USER/freelanceprosl/venv/bin/flask run-workers
+ExecStop=/bin/kill -s TERM \$MAINPID
+Restart=always
+RestartSec=5
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
 echo "Backend setup completed."
 echo "To start the backend service:"
-echo "1. For systemd (if supported): sudo cp ~/freelanceprosl.service /etc/systemd/system/ && sudo systemctl enable freelanceprosl && sudo systemctl start freelanceprosl"
-echo "2. Without systemd: nohup venv/bin/gunicorn -c gunicorn_config.py wsgi:app &"
+echo "1. For systemd (if supported): sudo cp ~/freelanceprosl.service ~/freelanceprosl-workers.service /etc/systemd/system/ && sudo systemctl enable freelanceprosl freelanceprosl-workers && sudo systemctl start freelanceprosl freelanceprosl-workers"
+echo "2. Without systemd: nohup venv/bin/gunicorn -c gunicorn_config.py wsgi:app & nohup env FLASK_APP=wsgi.py venv/bin/flask run-workers >> ~/logs/workers.log 2>&1 &"
 EOL
 
 # Create .htaccess for frontend
@@ -1,9 +1,23 @@
 # Gunicorn configuration for FreelancePro SL backend
 # Place this file in your Hostinger server directory
 
+import os
+
 bind = "0.0.0.0:5000"  # Bind to all network interfaces on port 5000
-workers = 3  # Number of worker processes (2 * num_cores + 1 is recommended)
+workers = int(os.environ.get("GUNICORN_WORKERS", 3))  # Worker processes (2 * num_cores + 1 is recommended)
+# The backend sizes each worker's database pool from this file (DATABASE_PROFILE in config.py)
 timeout = 120  # Timeout in seconds
+
+# Event streams (/api/events/stream) hold a connection open per client, so the
+# backend only serves them (and waiting long-polls) under gevent workers; with the
+# default sync workers the stream answers 503 and /api/events/poll answers at once,
+# so clients poll it on an interval. Events are read from the database, so any
+# number of workers of either class see every event.
+# Set GUNICORN_WORKER_CLASS=gevent (gevent is in requirements.txt) to enable streaming.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+if worker_class == "gevent":
+    workers = int(os.environ.get("GUNICORN_WORKERS", 1))
+    worker_connections = 1000  # Concurrent connections (open streams) per gevent worker
 accesslog = "/home/username/logs/gunicorn-access.log"  # Replace username with your Hostinger username
 errorlog = "/home/username/logs/gunicorn-error.log"    # Replace username with your Hostinger username
 capture_output = True
@@ -4,4 +4,8 @@ python3 -m venv venv || true
 source venv/bin/activate
 pip3 install -r requirements.txt
 cd backend
+# Background workers (email delivery and other queued jobs); stopped with the server
+python3 -m flask run-workers &
+WORKERS_PID=$!
+trap "kill $WORKERS_PID" EXIT
 python3 -m flask run --port=5002